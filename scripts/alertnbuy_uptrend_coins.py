@@ -1,11 +1,15 @@
 import asyncio
 import asyncpg
+import json
 import time
 import httpx
 import os
+import websockets
 import ccxt.async_support as ccxt
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
+from bar_aggregator import INTERVAL_MS, BarAggregator
+from indicator_state import IndicatorState, load_states, save_states
 
 # Load environment variables from the .env file in the same directory as this script
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -20,12 +24,19 @@ SIGNAL_NEAR_ATH = 'near_ath'
 NORMAL_INTERVAL = 300  # 5 minutes for standard monitoring
 FAST_INTERVAL = 60     # 1 minute for continuous high-frequency breakout monitoring
 
+# Timeframe stage -> bar interval built by the aggregator
+STAGE_INTERVALS = {'1D': '1d', '4H': '4h', '1H': '1h', '5m': '5m'}
+SEED_KLINES = 3             # Klines fetched per interval on init (last one is the forming bar)
+STREAM_STALE_SECONDS = 30   # Fall back to REST prices when no trade was streamed for this long
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443/stream?streams="
+HIGH_52W_BARS = 365         # 52-week window of daily bars (fetched only while no indicator state exists)
+
 class CoinState:
     def __init__(self, symbol, breakout_price):
         self.symbol = symbol
         self.breakout_price = breakout_price
         self.timeframe = '1D'               # Timeframe stages: '1D' -> '4H' -> '1H' -> '5m'
-        self.previous_price = None          # Last interval price in current timeframe stage
+        self.previous_price = None          # Close of the last evaluated bar in current timeframe stage
         self.highest_price = 0.0            # Peak observed price since tracking started/reset
         self.highest_price_above_breakout = 0.0 # Peak price observed above breakout level
         self.consecutive_increases = 0      # Count of consecutive price increases in current stage
@@ -39,6 +50,8 @@ class CoinState:
 breakout_prices = {}     # Caches breakout level for each symbol: { 'BTCUSDT': price }
 coin_states = {}         # Maps symbol to its CoinState object: { 'BTCUSDT': CoinState }
 triggered_symbols = set() # Set of symbols already traded to avoid double entry
+bar_aggregator = BarAggregator(intervals=tuple(STAGE_INTERVALS.values()))  # OHLCV bars per symbol/interval
+indicator_states = load_states()  # Shared EMA / 52W high state with the scanners: { 'BTCUSDT:1d': IndicatorState }
 
 # Global HTTP client to reuse connections and prevent IP blocks
 http_client = httpx.AsyncClient(
@@ -95,20 +108,28 @@ async def fetch_coingecko_ath(base_symbol):
 
 
 async def fetch_52w_high(symbol):
-    """Fetch 52-week high from Binance klines or fallback to MEXC daily OHLCV."""
+    """
+    Fetch 52-week high from the shared indicator state, catching it up with only the
+    Binance daily klines it is missing, or fallback to MEXC daily OHLCV.
+    """
     try:
+        key = f"{symbol}:1d"
+        state = indicator_states.get(key) or IndicatorState(symbol, '1d', extrema_window=HIGH_52W_BARS)
+        now_ms = int(time.time() * 1000)
         url = "https://api.binance.com/api/v3/klines"
         params = {
             "symbol": symbol,
             "interval": "1d",
-            "limit": 365
+            "limit": state.bars_to_fetch(now_ms, HIGH_52W_BARS)
         }
         res = await http_client.get(url, params=params)
         if res.status_code == 200:
             klines = res.json()
             if klines:
-                highs = [float(k[2]) for k in klines]
-                return max(highs)
+                view = state.sync_klines(klines, now_ms)
+                indicator_states[key] = state
+                save_states({key: state})
+                return view["high"]
         
         # Fallback to MEXC using ccxt
         print(f"⚠️ Binance klines failed for {symbol}, trying MEXC via CCXT...")
@@ -249,6 +270,104 @@ async def query_individual_price(symbol):
     return None
 
 
+async def seed_bars(symbol):
+    """Seed the bar aggregator with the latest klines of every stage interval."""
+    for interval in STAGE_INTERVALS.values():
+        try:
+            url = "https://api.binance.com/api/v3/klines"
+            params = {"symbol": symbol, "interval": interval, "limit": SEED_KLINES}
+            res = await http_client.get(url, params=params)
+            if res.status_code == 200:
+                bar_aggregator.seed(symbol, interval, res.json())
+        except Exception as e:
+            print(f"⚠️ Error seeding {interval} bars for {symbol}: {e}")
+
+
+async def promote_timeframe(state):
+    """Move to the next smaller timeframe after 2 consecutive higher closes above breakout."""
+    if state.consecutive_increases < 2:
+        return
+    next_tf = {'1D': '4H', '4H': '1H', '1H': '5m'}.get(state.timeframe)
+    if not next_tf:
+        return
+    old_tf = state.timeframe
+    state.timeframe = next_tf
+    state.consecutive_increases = 0
+    state.previous_price = None  # require new history for next stage
+    msg_tf = f"⚡ [Timeframe Promotion] {state.symbol} closed above breakout 2 times consecutively! Moving from {old_tf} -> {next_tf} timeframe."
+    await send_custom_slack_message(msg_tf)
+
+
+async def on_bar_close(symbol, interval, bar):
+    """Evaluate consecutive increases when a bar of the coin's current stage closes."""
+    # Keep the shared indicator state current with streamed closes (only the next adjacent bar)
+    indicators = indicator_states.get(f"{symbol}:{interval}")
+    if indicators is not None and indicators.last_bar_time is not None \
+            and bar.open_time == indicators.last_bar_time + INTERVAL_MS[interval]:
+        indicators.update(bar.close, bar.high, bar.low, bar.open_time)
+        save_states({indicators.key: indicators})
+
+    state = coin_states.get(symbol)
+    if not state or symbol in triggered_symbols:
+        return
+    if STAGE_INTERVALS[state.timeframe] != interval:
+        return
+
+    close = bar.close
+    if close > state.breakout_price:
+        state.has_broken_out = True  # Record that price has broken out
+        if state.previous_price is not None:
+            if close > state.previous_price:
+                state.consecutive_increases += 1
+                print(f"📈 [Increase & Above Breakout] {symbol} {state.timeframe} close rose: {state.previous_price:.6f} -> {close:.6f} ({state.consecutive_increases}/2 consecutive in {state.timeframe})")
+            else:
+                state.consecutive_increases = 0
+                print(f"➖ [No Increase] {symbol} {state.timeframe} close did not rise: {state.previous_price:.6f} -> {close:.6f} (Resetting consecutive counter in {state.timeframe})")
+        else:
+            print(f"📊 [First Bar Close] {symbol} closes at {close:.6f} (above breakout) in timeframe {state.timeframe}")
+    else:
+        state.consecutive_increases = 0
+        print(f"🛑 [Below Breakout] {symbol} {state.timeframe} close {close:.6f} is below breakout level {state.breakout_price:.6f} (Resetting consecutive counter in {state.timeframe})")
+
+    # Update previous bar close for this stage
+    state.previous_price = close
+    await promote_timeframe(state)
+
+
+async def trade_stream():
+    """Stream Binance aggTrades for tracked coins into the bar aggregator, evaluating stages on bar close."""
+    while True:
+        symbols = sorted(coin_states.keys())
+        if not symbols:
+            await asyncio.sleep(5)
+            continue
+
+        streams = "/".join(f"{s.lower()}@aggTrade" for s in symbols)
+        try:
+            async with websockets.connect(BINANCE_STREAM_URL + streams, ping_interval=20) as ws:
+                print(f"📡 Streaming trades for {len(symbols)} coins")
+                while True:
+                    # Resubscribe when the tracked watchlist changes
+                    if sorted(coin_states.keys()) != symbols:
+                        break
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(), timeout=STREAM_STALE_SECONDS)
+                    except asyncio.TimeoutError:
+                        continue
+                    trade = json.loads(raw).get("data", {})
+                    symbol = trade.get("s")
+                    if symbol not in coin_states:
+                        continue
+                    closed = bar_aggregator.on_trade(symbol, trade["p"], trade["q"], int(trade["T"]))
+                    for interval, bar in closed:
+                        await on_bar_close(symbol, interval, bar)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Trade stream error: {e}. Reconnecting in 5 seconds...")
+            await asyncio.sleep(5)
+
+
 async def check_uptrend_signals(conn):
     """Fetch watchlist coins, update state machines, evaluate consecutive timeframe changes above breakout level, check drawdowns and breakouts."""
     try:
@@ -302,28 +421,37 @@ async def check_uptrend_signals(conn):
             if symbol not in active_symbols:
                 print(f"🗑️ Removing state tracking for {symbol} (no longer in DB watchlist)")
                 del coin_states[symbol]
+                bar_aggregator.drop(symbol)
 
         for symbol in active_symbols:
             if symbol not in coin_states:
                 breakout_price = breakout_prices.get(symbol)
                 if breakout_price:
+                    await seed_bars(symbol)
                     coin_states[symbol] = CoinState(symbol, breakout_price)
                     print(f"🚀 Initialized 1D tracking state for {symbol} | Breakout level: {breakout_price:.6f}")
 
-        # 2. Optimize Querying: Fetch prices selectively to prevent API blocks
+        # 2. Optimize Querying: Use streamed trade prices, fetch selectively via REST only when the stream is stale
         current_time = time.time()
         symbols_to_query = []
+        current_prices = {}
         
         # Check if any coin is currently close and needs high-frequency scanning
         any_close = any(st.is_close for st in coin_states.values())
         
         for symbol in active_symbols:
-            state = coin_states[symbol]
+            state = coin_states.get(symbol)
+            if not state:
+                continue
+            streamed_price, trade_time = bar_aggregator.last_trade(symbol)
+            if streamed_price and trade_time and current_time - trade_time / 1000 <= STREAM_STALE_SECONDS:
+                current_prices[symbol] = streamed_price
+                state.last_queried = current_time
             # Always query if in close scan, or if 5 minutes have elapsed since last check
-            if state.is_close or (current_time - state.last_queried >= NORMAL_INTERVAL) or not state.previous_price:
+            elif state.is_close or (current_time - state.last_queried >= NORMAL_INTERVAL):
                 symbols_to_query.append(symbol)
 
-        current_prices = {}
+        rest_prices = {}
         if symbols_to_query:
             if len(symbols_to_query) == len(active_symbols) and not any_close:
                 # Standard bulk fetch (uses only 1 API weight)
@@ -335,7 +463,7 @@ async def check_uptrend_signals(conn):
                         ticker_map = {t['symbol']: float(t['price']) for t in tickers}
                         for sym in symbols_to_query:
                             if sym in ticker_map:
-                                current_prices[sym] = ticker_map[sym]
+                                rest_prices[sym] = ticker_map[sym]
                                 coin_states[sym].last_queried = current_time
                 except Exception as e:
                     print(f"⚠️ Error fetching bulk prices: {e}")
@@ -344,10 +472,16 @@ async def check_uptrend_signals(conn):
                 for sym in symbols_to_query:
                     price = await query_individual_price(sym)
                     if price:
-                        current_prices[sym] = price
+                        rest_prices[sym] = price
                         coin_states[sym].last_queried = current_time
                     await asyncio.sleep(0.1) # Safe spacing to prevent burst rate limit blocks
 
+        # REST samples feed the aggregator as ticks so bars keep forming while the stream is down
+        for sym, price in rest_prices.items():
+            current_prices[sym] = price
+            for interval, bar in bar_aggregator.on_trade(sym, price, 0.0, int(current_time * 1000)):
+                await on_bar_close(sym, interval, bar)
+
         # 3. Process states & evaluate multi-timeframe checks
         for record in records:
             symbol = record['crypto']
@@ -365,7 +499,7 @@ async def check_uptrend_signals(conn):
                 state.is_close = False
                 state.timeframe = '1D'
                 state.consecutive_increases = 0
-                state.previous_price = current_price
+                state.previous_price = None
                 continue
 
             # Update highest observed peak price (overall since tracking/reset)
@@ -460,7 +594,7 @@ async def check_uptrend_signals(conn):
                         old_tf = state.timeframe
                         state.timeframe = '5m'
                         state.consecutive_increases = 0
-                        state.previous_price = current_price
+                        state.previous_price = None
                         msg_close = (
                             f"⚡ [Continuous Scan Activated] {symbol} is within {gap_pct:.2%} (<= 1.5%) of breakout level ({state.breakout_price:.6f})!\n"
                             f"• Promoting directly from {old_tf} -> 5m and initiating continuous high-frequency monitoring."
@@ -472,48 +606,9 @@ async def check_uptrend_signals(conn):
                         state.is_close = False
                         print(f"➖ {symbol} price drifted away from breakout ({gap_pct:.2%} > 1.5%). Exiting continuous scan.")
 
-            # Check consecutive price increase ONLY when price is above the breakout price (ATH/52W)
+            # Consecutive increases and timeframe promotions are evaluated on bar close (see on_bar_close)
             if is_above_breakout:
                 state.has_broken_out = True  # Record that price has broken out
-                
-                if state.previous_price is not None:
-                    if current_price > state.previous_price:
-                        state.consecutive_increases += 1
-                        print(f"📈 [Increase & Above Breakout] {symbol} price rose: {state.previous_price:.6f} -> {current_price:.6f} ({state.consecutive_increases}/2 consecutive in {state.timeframe})")
-                    else:
-                        state.consecutive_increases = 0
-                        print(f"➖ [No Increase] {symbol} price did not rise: {state.previous_price:.6f} -> {current_price:.6f} (Resetting consecutive counter in {state.timeframe})")
-                else:
-                    print(f"📊 [First Price Record] {symbol} starts at {current_price:.6f} (above breakout) in timeframe {state.timeframe}")
-                
-                # Update previous interval price
-                state.previous_price = current_price
-            else:
-                state.consecutive_increases = 0
-                state.previous_price = current_price # still update previous price
-                print(f"🛑 [Below Breakout] {symbol} current price {current_price:.6f} is below breakout level {state.breakout_price:.6f} (Resetting consecutive counter in {state.timeframe})")
-
-            # Evaluate timeframe transition if price has increased consecutively 2 times while above breakout
-            if state.consecutive_increases >= 2:
-                old_tf = state.timeframe
-                if state.timeframe == '1D':
-                    state.timeframe = '4H'
-                    state.consecutive_increases = 0
-                    state.previous_price = None  # require new history for next stage
-                    msg_tf = f"⚡ [Timeframe Promotion] {symbol} rose above breakout 2 times consecutively! Moving from 1D -> 4H timeframe."
-                    await send_custom_slack_message(msg_tf)
-                elif state.timeframe == '4H':
-                    state.timeframe = '1H'
-                    state.consecutive_increases = 0
-                    state.previous_price = None
-                    msg_tf = f"⚡ [Timeframe Promotion] {symbol} rose above breakout 2 times consecutively! Moving from 4H -> 1H timeframe."
-                    await send_custom_slack_message(msg_tf)
-                elif state.timeframe == '1H':
-                    state.timeframe = '5m'
-                    state.consecutive_increases = 0
-                    state.previous_price = None
-                    msg_tf = f"⚡ [Timeframe Promotion] {symbol} rose above breakout 2 times consecutively! Moving from 1H -> 5m timeframe."
-                    await send_custom_slack_message(msg_tf)
 
             # Check for live breakout trigger only if the state is in the '5m' stage
             if state.timeframe == '5m':
@@ -579,6 +674,7 @@ async def check_uptrend_signals(conn):
 
 async def main():
     await send_custom_slack_message("🤖 Multi-Timeframe Confirmation & High-Frequency Breakout Bot initialized.")
+    stream_task = asyncio.create_task(trade_stream())
     
     try:
         while True:
@@ -615,6 +711,7 @@ async def main():
             await asyncio.sleep(sleep_duration)
             
     finally:
+        stream_task.cancel()
         # Gracefully shut down HTTP connection pool on termination
         await http_client.aclose()
 
@@ -5,6 +5,7 @@ import httpx
 import os
 from datetime import datetime
 from dotenv import load_dotenv
+from vn_quote_service import VNQuoteService
 
 # Load environment variables
 load_dotenv()
@@ -38,6 +39,9 @@ http_client = httpx.AsyncClient(
     headers={"User-Agent": "VN-Stock-Uptrend-Bot/1.0"}
 )
 
+# Shared DNSE quote service (bounded concurrency, request coalescing, short TTL cache)
+quote_service = VNQuoteService(http_client)
+
 async def send_custom_slack_message(text):
     """Print message to console and send to Slack if enabled."""
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {text}")
@@ -53,21 +57,6 @@ async def send_custom_slack_message(text):
         print(f"⚠️ Error sending Slack message: {e}")
 
 
-async def fetch_vn_stock_price(client, symbol):
-    """Fetch the current price of a VN stock from DNSE Entrade API."""
-    try:
-        url = f"https://services.entrade.com.vn/dnse-financial-product/securities/{symbol}"
-        res = await client.get(url, timeout=10.0)
-        if res.status_code == 200:
-            data = res.json()
-            basic_price = data.get('basicPrice')
-            if basic_price is not None:
-                return float(basic_price)
-    except Exception as e:
-        print(f"⚠️ Error fetching price for VN stock {symbol}: {e}")
-    return None
-
-
 async def check_uptrend_signals(conn):
     """Fetch watchlist stocks, update state machines, evaluate consecutive timeframe changes above breakout level, check drawdowns and breakouts."""
     try:
@@ -121,13 +110,10 @@ async def check_uptrend_signals(conn):
 
         current_prices = {}
         if symbols_to_query:
-            # Query sequentially with connection reuse and tiny spacing delay
-            for sym in symbols_to_query:
-                price = await fetch_vn_stock_price(http_client, sym)
-                if price:
-                    current_prices[sym] = price
-                    stock_states[sym].last_queried = current_time
-                await asyncio.sleep(0.1) # Safe rate limit pacing to prevent blocking
+            # Query concurrently through the shared quote service (bounded to avoid DNSE blocking)
+            current_prices = await quote_service.get_prices(symbols_to_query)
+            for sym in current_prices:
+                stock_states[sym].last_queried = current_time
 
         # 3. Process states & evaluate multi-timeframe checks
         for record in records:
@@ -344,6 +330,8 @@ async def main():
                 if conn:
                     await conn.close()
             
+            print(f"📊 {quote_service.summary()}")
+
             # Sleep based on active monitoring mode
             sleep_duration = FAST_INTERVAL if is_fast_mode else NORMAL_INTERVAL
             if is_fast_mode:
@@ -355,6 +343,7 @@ async def main():
             
     finally:
         # Gracefully shut down HTTP connection pool on termination
+        print(f"📊 {quote_service.summary()}")
         await http_client.aclose()
 
 
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Bar Aggregator
+Builds OHLCV bars for several intervals from a trade/ticker stream.
+Closed bars are kept in fixed-size array rings, so memory per symbol is constant.
+"""
+
+from array import array
+from collections import namedtuple
+
+# Interval name -> length in milliseconds (bars are aligned to UTC epoch like Binance klines)
+INTERVAL_MS = {
+    '1m': 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '4h': 4 * 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+}
+
+DEFAULT_INTERVALS = ('5m', '1h', '4h', '1d')
+DEFAULT_CAPACITY = 64    # Closed bars kept per (symbol, interval)
+
+Bar = namedtuple('Bar', 'open_time open high low close volume')
+
+_FIELDS = 5  # open, high, low, close, volume
+
+
+class BarRing:
+    """Fixed-size ring of closed OHLCV bars backed by flat arrays"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.times = array('q', [0]) * capacity
+        self.values = array('d', [0.0]) * (capacity * _FIELDS)
+        self.count = 0   # Total bars ever pushed
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def push(self, open_time, open_, high, low, close, volume):
+        slot = self.count % self.capacity
+        base = slot * _FIELDS
+        self.times[slot] = open_time
+        self.values[base] = open_
+        self.values[base + 1] = high
+        self.values[base + 2] = low
+        self.values[base + 3] = close
+        self.values[base + 4] = volume
+        self.count += 1
+
+    def bar(self, ago=0):
+        """Closed bar `ago` bars back (0 = most recently closed)"""
+        if ago < 0 or ago >= len(self):
+            raise IndexError(f"bar {ago} not in ring of {len(self)}")
+        slot = (self.count - 1 - ago) % self.capacity
+        base = slot * _FIELDS
+        return Bar(self.times[slot], *self.values[base:base + _FIELDS])
+
+    def closes(self, n=None):
+        """Last `n` closes, oldest first"""
+        n = len(self) if n is None else min(n, len(self))
+        return [self.bar(ago).close for ago in range(n - 1, -1, -1)]
+
+
+class _FormingBar:
+    """The bar currently being built for one (symbol, interval)"""
+
+    __slots__ = ('open_time', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self):
+        self.open_time = None
+
+    def start(self, open_time, price, qty):
+        self.open_time = open_time
+        self.open = self.high = self.low = self.close = price
+        self.volume = qty
+
+    def add(self, price, qty):
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += qty
+
+    def to_bar(self):
+        return Bar(self.open_time, self.open, self.high, self.low, self.close, self.volume)
+
+
+class _SymbolBars:
+    def __init__(self, intervals, capacity):
+        self.forming = {interval: _FormingBar() for interval in intervals}
+        self.rings = {interval: BarRing(capacity) for interval in intervals}
+        self.last_price = None
+        self.last_trade_time = None
+
+
+class BarAggregator:
+    """
+    Aggregates trades/ticks into OHLCV bars for every configured interval.
+
+    `on_trade()` returns the bars closed by that tick as (interval, Bar) pairs,
+    so callers can run their logic exactly once per bar close.
+    """
+
+    def __init__(self, intervals=DEFAULT_INTERVALS, capacity=DEFAULT_CAPACITY):
+        for interval in intervals:
+            if interval not in INTERVAL_MS:
+                raise ValueError(f"Unsupported interval: {interval}")
+        self.intervals = tuple(intervals)
+        self.capacity = capacity
+        self.symbols = {}
+
+    def _get(self, symbol):
+        bars = self.symbols.get(symbol)
+        if bars is None:
+            bars = self.symbols[symbol] = _SymbolBars(self.intervals, self.capacity)
+        return bars
+
+    def on_trade(self, symbol, price, qty, ts_ms):
+        """
+        Apply one trade (or ticker sample with qty=0).
+
+        Returns:
+            List of (interval, Bar) for every bar this tick closed
+        """
+        bars = self._get(symbol)
+        price = float(price)
+        qty = float(qty)
+        closed = []
+        for interval in self.intervals:
+            length = INTERVAL_MS[interval]
+            open_time = ts_ms - ts_ms % length
+            forming = bars.forming[interval]
+            if forming.open_time is None:
+                forming.start(open_time, price, qty)
+            elif open_time > forming.open_time:
+                bars.rings[interval].push(forming.open_time, forming.open, forming.high,
+                                          forming.low, forming.close, forming.volume)
+                closed.append((interval, forming.to_bar()))
+                forming.start(open_time, price, qty)
+            elif open_time == forming.open_time:
+                forming.add(price, qty)
+            # Late ticks for an already closed bar are ignored
+        if bars.last_trade_time is None or ts_ms >= bars.last_trade_time:
+            bars.last_price = price
+            bars.last_trade_time = ts_ms
+        return closed
+
+    def seed(self, symbol, interval, klines):
+        """
+        Seed history from Binance-style klines ([open_time, open, high, low, close, volume, ...]).
+        The last kline is treated as the still-forming bar.
+        """
+        if not klines:
+            return
+        bars = self._get(symbol)
+        ring = bars.rings[interval]
+        for k in klines[:-1]:
+            ring.push(int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]))
+        last = klines[-1]
+        forming = bars.forming[interval]
+        forming.start(int(last[0]), float(last[1]), float(last[5]))
+        forming.high = float(last[2])
+        forming.low = float(last[3])
+        forming.close = float(last[4])
+
+    def closed_bars(self, symbol, interval):
+        return self._get(symbol).rings[interval]
+
+    def forming_bar(self, symbol, interval):
+        forming = self._get(symbol).forming[interval]
+        return forming.to_bar() if forming.open_time is not None else None
+
+    def last_trade(self, symbol):
+        """(last_price, last_trade_time_ms) or (None, None) if nothing was seen yet"""
+        bars = self.symbols.get(symbol)
+        if bars is None:
+            return None, None
+        return bars.last_price, bars.last_trade_time
+
+    def drop(self, symbol):
+        self.symbols.pop(symbol, None)
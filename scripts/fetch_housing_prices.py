@@ -1,14 +1,21 @@
 import asyncio
 import csv
+import hashlib
+import json
 import logging
 import random
 import os
+import sys
+import time
 import httpx
 import asyncpg
-from bs4 import BeautifulSoup
-from datetime import datetime
+from bs4 import BeautifulSoup, SoupStrainer
+from collections import defaultdict
+from datetime import date, datetime, timedelta
 import re
 
+from housing_index import update_index
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -19,6 +26,26 @@ logger = logging.getLogger(__name__)
 
 # Constants
 BASE_URL = "https://mogi.vn"
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Crawl state (page validators + listings already stored), next to the script
+CRAWL_STATE_FILE = os.path.join(BASE_DIR, 'housing_crawl_state.json')
+SEEN_DAYS = 30          # A listing seen within this many days is not stored again
+MAX_PAGES = 5           # Pages per region/category; crawling stops at the first page without new listings
+HOST_CONCURRENCY = 3    # Concurrent requests per host
+REQUEST_DELAY = 1.0     # Seconds each request slot waits after a request (rate limit)
+
+# lxml is several times faster than the pure-Python html.parser; use it when installed
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# Only these blocks are built into a tree when parsing a page
+LISTING_CLASSES = ["prop-info", "prop-item"]
+NUMBER_PATTERN = re.compile(r"(\d+(\.\d+)?)")
+AREA_TEXT_PATTERN = re.compile(r"(\d+(?:[.,]\d+)?)\s*m2")
 
 # Regions map: Display Name -> URL slug
 REGIONS = {
@@ -71,8 +98,7 @@ def parse_price_to_numeric(price_text):
         # Extract number from val_str
         # e.g. "5.2" -> 5.2
         # Use regex to find number
-        import re
-        match = re.search(r"(\d+(\.\d+)?)", val_str)
+        match = NUMBER_PATTERN.search(val_str)
         if match:
             val = float(match.group(1))
             return int(val * multiplier)
@@ -88,125 +114,288 @@ def parse_area(text):
     if not text:
         return 0.0
     try:
-        match = re.search(r"(\d+(\.\d+)?)", text.replace(',', '.'))
+        match = NUMBER_PATTERN.search(text.replace(',', '.'))
         if match:
             return float(match.group(1))
     except:
         pass
     return 0.0
 
-async def fetch_url(client, url):
-    """Fetch URL with random User-Agent"""
+async def fetch_url(client, url, page_state=None):
+    """
+    Fetch URL with random User-Agent.
+    With `page_state` ({"etag", "last_modified", "hash"} from the last crawl) the request is
+    conditional and a page whose content did not change is skipped.
+
+    Returns:
+        (html, status) - html is None when the page is unchanged or the request failed;
+        status is 'changed', 'not_modified', 'same_hash' or 'error'
+    """
     headers = {
         "User-Agent": random.choice(USER_AGENTS),
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
         "Accept-Language": "en-US,en;q=0.5",
         "Referer": "https://google.com"
     }
+    if page_state:
+        if page_state.get("etag"):
+            headers["If-None-Match"] = page_state["etag"]
+        if page_state.get("last_modified"):
+            headers["If-Modified-Since"] = page_state["last_modified"]
     try:
         response = await client.get(url, headers=headers)
-        if response.status_code == 200:
-            return response.text
-        else:
+        if response.status_code == 304:
+            return None, 'not_modified'
+        if response.status_code != 200:
             logger.error(f"Failed to fetch {url}: Status {response.status_code}")
-            return None
+            return None, 'error'
+        html = response.text
+        content_hash = hashlib.sha256(response.content).hexdigest()[:16]
+        unchanged = page_state is not None and page_state.get("hash") == content_hash
+        if page_state is not None:
+            page_state.update({
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "hash": content_hash,
+            })
+        if unchanged:
+            return None, 'same_hash'
+        return html, 'changed'
     except Exception as e:
         logger.error(f"Error fetching {url}: {e}")
-        return None
+        return None, 'error'
 
-async def parse_listing_page(client, region_name, property_type, url):
-    """Parse listing data from page"""
-    html = await fetch_url(client, url)
-    if not html:
-        return []
-
-    soup = BeautifulSoup(html, 'html.parser')
-    data = []
-    
+def find_listing_items(soup):
+    """Listing blocks of a page, with the fallbacks for older page layouts"""
     items = soup.find_all(class_="prop-info")
     if not items:
         # Fallback
         items = soup.find_all(class_="prop-item")
-    
+
     if not items:
         titles = soup.find_all(class_="prop-title")
         items = [t.find_parent(class_="prop-info") or t.parent for t in titles]
+    return items
+
+def parse_item(item, region_name, property_type, url, fetched_at):
+    """One listing dict from a listing block"""
+    # Title
+    title_tag = item.find(class_="prop-title")
+    title = title_tag.get_text(strip=True) if title_tag else "N/A"
+
+    # Price
+    price_tag = item.find(class_="price")
+    if not price_tag:
+        price_tag = item.find(class_="property-top-price")
+
+    price_text = price_tag.get_text(strip=True) if price_tag else "N/A"
+    price_numeric = parse_price_to_numeric(price_text)
+
+    # Address
+    addr_tag = item.find(class_="prop-addr")
+    location = addr_tag.get_text(strip=True) if addr_tag else "N/A"
 
+    # Link of the listing itself (only used for dedup)
+    link_tag = item.find('a', href=True)
+    if not link_tag:
+        container = item.find_parent(class_="prop-item")
+        link_tag = container.find('a', href=True) if container else None
+    listing_url = link_tag['href'] if link_tag else None
+
+    # Area
+    area = 0.0
+    attr_list = item.find(class_="prop-attr")
+    if attr_list:
+        for li in attr_list.find_all('li'):
+            # "82 m2" or "82 m 2" (m2 often comes with a sup tag)
+            clean_txt = li.get_text(strip=True).lower().replace(' ', '').replace('\n', '')
+            if 'm2' in clean_txt or 'm²' in clean_txt:
+                match = NUMBER_PATTERN.search(clean_txt)
+                if match:
+                    area = float(match.group(1))
+                    break
+    if area == 0:
+        # Fallback: first "<number> m2" anywhere in the listing block
+        match = AREA_TEXT_PATTERN.search(item.get_text())
+        if match:
+            try:
+                area = float(match.group(1).replace(',', '.'))
+            except ValueError:
+                pass
+
+    return {
+        "region": region_name,
+        "property_type": property_type,
+        "title": title,
+        "location": location,
+        "price_text": price_text,
+        "price_numeric": price_numeric,
+        "area": area,
+        "url": url,
+        "listing_url": listing_url,
+        "fetched_at": fetched_at
+    }
+
+def parse_listings(html, region_name, property_type, url, parser=None):
+    """
+    Parse listing data from page HTML.
+    Only the listing blocks are built into a tree (SoupStrainer), with lxml when installed;
+    the full page is parsed only when the blocks are not found (older layouts).
+    """
+    parser = parser or HTML_PARSER
+    soup = BeautifulSoup(html, parser, parse_only=SoupStrainer(class_=LISTING_CLASSES))
+    items = soup.find_all(class_="prop-info") or soup.find_all(class_="prop-item")
+    if not items:
+        items = find_listing_items(BeautifulSoup(html, parser))
+
+    fetched_at = datetime.now()
+    return [parse_item(item, region_name, property_type, url, fetched_at) for item in items if item]
+
+def listing_key(item):
+    """Identity of a listing at its current price (a price change counts as a new listing)"""
+    identity = item.get("listing_url") or f"{item['region']}|{item['property_type']}|{item['title']}|{item['location']}"
+    raw = f"{identity}|{item['price_text']}|{item['area']}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+
+def dedup_listings(items, seen, today):
+    """
+    Keep only listings not seen in this run or in the last SEEN_DAYS days.
+    `seen` ({listing key: "YYYY-MM-DD"}) is updated in place.
+    """
+    fresh = []
     for item in items:
-        if not item: continue
-        
-        # Title
-        title_tag = item.find(class_="prop-title")
-        title = title_tag.get_text(strip=True) if title_tag else "N/A"
-        
-        # Price
-        price_tag = item.find(class_="price")
-        if not price_tag:
-             price_tag = item.find(class_="property-top-price")
-        
-        price_text = price_tag.get_text(strip=True) if price_tag else "N/A"
-        price_numeric = parse_price_to_numeric(price_text)
-        
-        # Address
-        addr_tag = item.find(class_="prop-addr")
-        location = addr_tag.get_text(strip=True) if addr_tag else "N/A"
-        
-        # Area
-        area = 0.0
-        attr_list = item.find(class_="prop-attr")
-        if attr_list:
-             for li in attr_list.find_all('li'):
-                 # Get text, handling sup tag for m2
-                 # "82 m2" or "82 m 2"
-                 txt = li.get_text(strip=True)
-                 clean_txt = txt.lower().replace(' ', '').replace('\n', '')
-                 
-                 if 'm2' in clean_txt or 'm²' in clean_txt:
-                     try:
-                         # Extract valid number from start
-                         match = re.search(r"(\d+(\.\d+)?)", clean_txt)
-                         if match:
-                             area = float(match.group(1))
-                             break
-                     except: pass
-        if area == 0:
-             # Fallback: search in full text if specific tag not found
-             # Often in title or other text, but risky.
-             # The markdown showed "- 82 m2", usually in a list.
-             # Let's try to find any text with m2 in the item
-             matches = re.findall(r"(\d+(?:[.,]\d+)?)\s*m2", item.get_text())
-             if matches:
-                 # Take the first one found ?
-                 try:
-                     area = float(matches[0].replace(',', '.'))
-                 except: pass
-
-        data.append({
-            "region": region_name,
-            "property_type": property_type,
-            "title": title,
-            "location": location,
-            "price_text": price_text,
-            "price_numeric": price_numeric,
-            "area": area,
-            "url": url,
-            "fetched_at": datetime.now()
-        })
-    
-    logger.info(f"Extracted {len(data)} items for {region_name} - {property_type}")
-    return data
+        key = listing_key(item)
+        if key in seen:
+            continue
+        seen[key] = today
+        fresh.append(item)
+    return fresh
+
+def load_crawl_state():
+    """Crawl state: {"pages": {url: {"etag", "last_modified", "hash"}}, "seen": {listing key: date}}"""
+    state = {"pages": {}, "seen": {}}
+    if os.path.exists(CRAWL_STATE_FILE):
+        try:
+            with open(CRAWL_STATE_FILE, 'r', encoding='utf-8') as f:
+                state.update(json.load(f))
+        except Exception as e:
+            logger.warning(f"Could not read crawl state: {e}")
+    cutoff = (date.today() - timedelta(days=SEEN_DAYS)).isoformat()
+    state["seen"] = {k: d for k, d in state["seen"].items() if d >= cutoff}
+    return state
+
+def save_crawl_state(state):
+    try:
+        tmp_path = f"{CRAWL_STATE_FILE}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, separators=(',', ':'))
+        os.replace(tmp_path, CRAWL_STATE_FILE)
+    except Exception as e:
+        logger.warning(f"Could not save crawl state: {e}")
+
+def page_url(base_url, page):
+    return base_url if page == 1 else f"{base_url}?cp={page}"
+
+async def crawl_category(client, host_limits, state, stats, region_name, property_type, base_url,
+                         fixtures_dir=None):
+    """
+    Crawl one region/category newest-first and stop at the first page that is unchanged
+    or has no new listings.
+    """
+    new_items = []
+    today = date.today().isoformat()
+    for page in range(1, MAX_PAGES + 1):
+        url = page_url(base_url, page)
+        page_state = state["pages"].setdefault(url, {})
+        async with host_limits[httpx.URL(url).host]:
+            html, status = await fetch_url(client, url, page_state)
+            # Politeness delay per host slot
+            await asyncio.sleep(REQUEST_DELAY)
+        stats[status] += 1
+        if html is None:
+            break
+        if fixtures_dir:
+            name = f"{CATEGORIES[property_type]}_{REGIONS[region_name]}_{page}.html"
+            with open(os.path.join(fixtures_dir, name), 'w', encoding='utf-8') as f:
+                f.write(html)
+
+        items = parse_listings(html, region_name, property_type, url)
+        fresh = dedup_listings(items, state["seen"], today)
+        stats['listings'] += len(items)
+        stats['duplicates'] += len(items) - len(fresh)
+        new_items.extend(fresh)
+        logger.info(f"{region_name} - {property_type} p{page}: {len(items)} items, {len(fresh)} new")
+        if not fresh:
+            break
+    return new_items
+
+async def crawl(fixtures_dir=None):
+    """
+    Crawl every region/category concurrently (at most HOST_CONCURRENCY requests per host).
+
+    Returns:
+        (new listings, crawl state) - the state is saved by the caller once the listings are stored
+    """
+    state = load_crawl_state()
+    stats = defaultdict(int)
+    host_limits = defaultdict(lambda: asyncio.Semaphore(HOST_CONCURRENCY))
+    if fixtures_dir:
+        os.makedirs(fixtures_dir, exist_ok=True)
+
+    started = time.perf_counter()
+    limits = httpx.Limits(max_connections=HOST_CONCURRENCY * 2, max_keepalive_connections=HOST_CONCURRENCY)
+    async with httpx.AsyncClient(timeout=15, follow_redirects=True, limits=limits) as client:
+        results = await asyncio.gather(*(
+            crawl_category(client, host_limits, state, stats, region_name, type_name,
+                           f"{BASE_URL}/{region_slug}/{type_slug}", fixtures_dir)
+            for region_name, region_slug in REGIONS.items()
+            for type_name, type_slug in CATEGORIES.items()
+        ))
+    elapsed = time.perf_counter() - started
+
+    all_data = [item for items in results for item in items]
+    pages = stats['changed'] + stats['not_modified'] + stats['same_hash'] + stats['error']
+    logger.info(
+        f"Crawled {pages} pages in {elapsed:.1f}s ({pages / elapsed:.2f} pages/s): "
+        f"{stats['changed']} changed, {stats['not_modified']} not modified, {stats['same_hash']} same content, "
+        f"{stats['error']} failed; {stats['listings']} listings, {stats['duplicates']} duplicates, "
+        f"{len(all_data)} new")
+    return all_data, state
+
+def benchmark(fixtures_dir, repeat=3):
+    """Parse throughput (pages/s, listings/s) on saved HTML fixtures for every available parser"""
+    fixtures = []
+    for name in sorted(os.listdir(fixtures_dir)):
+        if name.endswith('.html'):
+            with open(os.path.join(fixtures_dir, name), 'r', encoding='utf-8') as f:
+                fixtures.append(f.read())
+    if not fixtures:
+        print(f"No .html fixtures in {fixtures_dir} (save some with --save-fixtures)")
+        return
+
+    parsers = ['html.parser'] + (['lxml'] if HTML_PARSER == 'lxml' else [])
+    for parser in parsers:
+        listings = 0
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for html in fixtures:
+                listings += len(parse_listings(html, "bench", "bench", "bench", parser=parser))
+        elapsed = time.perf_counter() - started
+        pages = len(fixtures) * repeat
+        print(f"{parser:<12} {pages / elapsed:8.1f} pages/s  {listings / elapsed:9.1f} listings/s "
+              f"({pages} pages, {elapsed:.2f}s)")
 
 async def save_to_db(items):
-    """Save items to database"""
+    """Save items to database; returns True when the items were stored"""
     if not items:
-        return
+        return True
 
     conn = None
     try:
         db_port_str = os.environ.get('DB_PORT')
         if not db_port_str:
             logger.error("DB_PORT not set")
-            return
+            return False
 
         conn = await asyncpg.connect(
             user=os.environ.get('DB_USER'),
@@ -240,35 +429,42 @@ async def save_to_db(items):
         await conn.executemany(query, values)
         logger.info(f"Saved {len(items)} records to DB")
 
+        # Fold the new listings into the daily housing price index
+        try:
+            await update_index(conn)
+        except Exception as e:
+            logger.error(f"Housing index update failed: {e}")
+        return True
+
     except Exception as e:
         logger.error(f"Database error: {e}")
+        return False
     finally:
         if conn:
             await conn.close()
 
-async def main():
+async def main(argv=None):
+    args = list(argv if argv is not None else sys.argv[1:])
+    if args[:1] == ['--bench']:
+        if len(args) < 2:
+            print("Usage: fetch_housing_prices.py --bench FIXTURES_DIR [REPEAT]")
+            return
+        benchmark(args[1], int(args[2]) if len(args) > 2 else 3)
+        return
+    fixtures_dir = args[1] if args[:1] == ['--save-fixtures'] and len(args) > 1 else None
+
     # Load env
     from dotenv import load_dotenv
     load_dotenv()
 
-    async with httpx.AsyncClient(timeout=15, follow_redirects=True) as client:
-        all_data = []
-        
-        for region_name, region_slug in REGIONS.items():
-            for type_name, type_slug in CATEGORIES.items():
-                url = f"{BASE_URL}/{region_slug}/{type_slug}"
-                
-                logger.info(f"Scraping {region_name} - {type_name} from {url}...")
-                items = await parse_listing_page(client, region_name, type_name, url)
-                all_data.extend(items)
-                
-                # Rate limit
-                await asyncio.sleep(2)
-
-        if all_data:
-            await save_to_db(all_data)
-        else:
-            logger.error("No data extracted.")
+    all_data, state = await crawl(fixtures_dir)
+    if all_data:
+        if await save_to_db(all_data):
+            save_crawl_state(state)
+    else:
+        # Nothing new (or nothing reachable): keep the page validators for the next run
+        save_crawl_state(state)
+        logger.info("No new listings.")
 
 if __name__ == "__main__":
     try:
@@ -3,8 +3,10 @@ import asyncpg
 import httpx
 import os
 import re
+import time
 from datetime import datetime
 from dotenv import load_dotenv
+from indicator_state import IndicatorState, load_states, save_states
 
 # Các hằng số tín hiệu
 SIGNAL_NEAR_52W_HIGH = 'near_52w_high'
@@ -13,11 +15,28 @@ SIGNAL_EMA9_ABOVE_EMA21 = 'ema9_above_ema21'
 # Lấy top 25 hợp đồng có thanh khoản cao nhất để đảm bảo an toàn (Tier 1 & 2)
 TOP_FUTURES_LIMIT = 25
 
+# Chỉ quét các hợp đồng có vốn hoá lớn hơn $2B
+MIN_MARKET_CAP = 2000000000.0
+
+# Các tín hiệu được bật
+ENABLED_SIGNALS = (SIGNAL_EMA9_ABOVE_EMA21, SIGNAL_NEAR_52W_HIGH)
+HIGH_52W_BARS = 365      # Cửa sổ đỉnh 52W (số nến tải khi chưa có indicator state)
+
+# Số request kline chạy song song tới Binance FAPI
+FUTURES_CONCURRENCY = 8
+
+# EMA / đỉnh 52W lấy từ indicator state dùng chung (indicator_state.json), mỗi lần chạy
+# chỉ tải các nến từ sau nến cuối đã xử lý. Hậu tố '.P' tách hợp đồng perpetual khỏi spot.
+STATE_SUFFIX = '.P'
+
 # ================================
 #  COINGECKO MARKET CAP HELPERS
 # ================================
-async def get_coingecko_market_caps():
+async def get_coingecko_market_caps(client=None):
     """Lấy danh sách vốn hoá của top 250 coin từ CoinGecko để làm map tra cứu"""
+    if client is None:
+        async with httpx.AsyncClient(timeout=15) as own_client:
+            return await get_coingecko_market_caps(own_client)
     try:
         url = "https://api.coingecko.com/api/v3/coins/markets"
         params = {
@@ -27,14 +46,13 @@ async def get_coingecko_market_caps():
             "page": 1,
             "sparkline": False
         }
-        async with httpx.AsyncClient(timeout=15) as client:
-            res = await client.get(url, params=params)
-            if res.status_code == 200:
-                coins = res.json()
-                # Tạo map từ base_symbol (viết hoa) -> market_cap
-                return {c.get('symbol', '').upper(): float(c.get('market_cap') or 0) for c in coins}
-            else:
-                print(f"   ⚠️  Không thể lấy vốn hoá từ CoinGecko: status_code={res.status_code}")
+        res = await client.get(url, params=params, timeout=15)
+        if res.status_code == 200:
+            coins = res.json()
+            # Tạo map từ base_symbol (viết hoa) -> market_cap
+            return {c.get('symbol', '').upper(): float(c.get('market_cap') or 0) for c in coins}
+        else:
+            print(f"   ⚠️  Không thể lấy vốn hoá từ CoinGecko: status_code={res.status_code}")
     except Exception as e:
         print(f"⚠️ Lỗi fetch CoinGecko market caps: {e}")
     return {}
@@ -55,119 +73,185 @@ load_dotenv()
 # ================================
 #  INDICATOR FUNCTIONS
 # ================================
-def _calc_ema(closes, period):
-    if len(closes) < period: return None
-    k = 2.0 / (period + 1)
-    ema = sum(closes[:period]) / period
-    for price in closes[period:]:
-        ema = price * k + ema * (1 - k)
-    return ema
-
-def check_ema9_above_ema21(closes):
-    if not closes or len(closes) < 21: return False
-    ema9 = _calc_ema(closes, 9)
-    ema21 = _calc_ema(closes, 21)
+def check_ema9_above_ema21(view):
+    """EMA9 >= EMA21 từ giá trị indicator (IndicatorState.preview / current)"""
+    ema9, ema21 = view["ema"].get(9), view["ema"].get(21)
     if ema9 is None or ema21 is None: return False
     return ema9 >= ema21
 
 # ================================
 #  BINANCE FUTURES (FAPI) FUNCTIONS
 # ================================
-async def get_top_futures_by_volume(limit=TOP_FUTURES_LIMIT):
+async def get_top_futures_by_volume(limit=TOP_FUTURES_LIMIT, client=None):
     """Lấy danh sách các hợp đồng USDT-M Perpetual có Volume 24h cao nhất"""
+    if client is None:
+        async with httpx.AsyncClient(timeout=10) as own_client:
+            return await get_top_futures_by_volume(limit, own_client)
     try:
         url = "https://fapi.binance.com/fapi/v1/ticker/24hr"
-        async with httpx.AsyncClient(timeout=10) as client:
-            res = await client.get(url)
-            if res.status_code != 200: return []
-            
-            data = res.json()
-            # Lọc chỉ lấy cặp USDT và bỏ qua các token bị giới hạn
-            usdt_pairs = [p for p in data if p['symbol'].endswith('USDT') and '_' not in p['symbol']]
-            
-            # Sắp xếp theo quoteVolume (Khối lượng giao dịch bằng USDT) giảm dần
-            usdt_pairs.sort(key=lambda x: float(x['quoteVolume']), reverse=True)
-            
-            symbols = [pair['symbol'] for pair in usdt_pairs[:limit]]
-            print(f"🔹 Đã lấy Top {len(symbols)} Futures theo Volume: {', '.join(symbols[:5])}...")
-            return symbols
+        res = await client.get(url)
+        if res.status_code != 200: return []
+        
+        data = res.json()
+        # Lọc chỉ lấy cặp USDT và bỏ qua các token bị giới hạn
+        usdt_pairs = [p for p in data if p['symbol'].endswith('USDT') and '_' not in p['symbol']]
+        
+        # Sắp xếp theo quoteVolume (Khối lượng giao dịch bằng USDT) giảm dần
+        usdt_pairs.sort(key=lambda x: float(x['quoteVolume']), reverse=True)
+        
+        symbols = [pair['symbol'] for pair in usdt_pairs[:limit]]
+        print(f"🔹 Đã lấy Top {len(symbols)} Futures theo Volume: {', '.join(symbols[:5])}...")
+        return symbols
     except Exception as e:
         print(f"⚠️ Lỗi khi lấy danh sách Futures: {e}")
         return []
 
-async def fetch_futures_daily_data(symbol, days=365):
+async def fetch_futures_daily_data(symbol, days=365, client=None):
     """Lấy dữ liệu nến 1D từ Binance Futures"""
+    if client is None:
+        async with httpx.AsyncClient(timeout=10) as own_client:
+            return await fetch_futures_daily_data(symbol, days, own_client)
     try:
         url = "https://fapi.binance.com/fapi/v1/klines"
         params = {"symbol": symbol, "interval": "1d", "limit": days}
-        async with httpx.AsyncClient(timeout=10) as client:
-            res = await client.get(url, params=params)
-            if res.status_code != 200: return None
-            
-            klines = res.json()
-            if not klines: return None
-            
-            # Format: [open_time, open, high, low, close, volume...]
-            closes = [float(k[4]) for k in klines]
-            highs = [float(k[2]) for k in klines]
-            return {"closes": closes, "highs": highs}
+        res = await client.get(url, params=params)
+        if res.status_code != 200: return None
+        
+        klines = res.json()
+        if not klines: return None
+        
+        # Format: [open_time, open, high, low, close, volume...], nến cuối là nến đang chạy
+        return klines
     except Exception as e:
         print(f"⚠️ Lỗi fetch data cho {symbol}: {e}")
         return None
 
+# ================================
+#  INDICATOR STATE
+# ================================
+def state_key(symbol):
+    return f"{symbol}{STATE_SUFFIX}:1d"
+
+
+def get_state(states, symbol):
+    """Indicator state 1D của hợp đồng (tạo mới nếu chưa có)"""
+    key = state_key(symbol)
+    if key not in states:
+        states[key] = IndicatorState(f"{symbol}{STATE_SUFFIX}", '1d', extrema_window=HIGH_52W_BARS)
+    return states[key]
+
+
 # ================================
 #  SCAN LOGIC
 # ================================
-async def scan_futures():
-    symbols = await get_top_futures_by_volume()
-    
-    print("🔹 Đang tải dữ liệu vốn hoá từ CoinGecko...")
-    market_caps = await get_coingecko_market_caps()
-    
+class StageStats:
+    """Đếm số phần tử và thời gian của từng stage để báo throughput"""
+
+    def __init__(self):
+        self.stages = []
+
+    def record(self, name, count, started):
+        self.stages.append((name, count, time.perf_counter() - started))
+
+    def report(self):
+        print("🔹 Throughput theo stage:")
+        for name, count, elapsed in self.stages:
+            rate = count / elapsed if elapsed > 0 else float('inf')
+            print(f"   {name:<14} {count:>4} items  {elapsed:6.2f}s  {rate:8.1f} items/s")
+
+
+def evaluate_signals(symbol, view, mcap):
+    """Đánh giá các tín hiệu đang bật từ giá trị indicator tính cả nến đang chạy"""
     results = []
+    current_price = view["close"]
+    max_52w = view["high"]
     
-    print("🔹 Bắt đầu quét dữ liệu kĩ thuật...")
-    for symbol in symbols:
-        base_symbol = get_base_symbol(symbol)
-        mcap = market_caps.get(base_symbol, 0.0)
-        
-        # Chỉ quét các hợp đồng có vốn hoá lớn hơn $2B (2,000,000,000 USD)
-        if mcap < 2000000000.0:
-            print(f"   ⏩ {symbol} bỏ qua do vốn hoá thấp (${mcap:,.0f} USD < $2B)")
-            continue
-            
-        data = await fetch_futures_daily_data(symbol, 365)
-        if not data: continue
-        
-        closes = data["closes"]
-        highs = data["highs"]
-        current_price = closes[-1]
-        max_52w = max(highs)
+    # Check EMA
+    if SIGNAL_EMA9_ABOVE_EMA21 in ENABLED_SIGNALS and check_ema9_above_ema21(view):
+        print(f"   📈 {symbol}: EMA9 >= EMA21 ✓")
+        results.append({
+            "symbol": symbol,
+            "signal_type": SIGNAL_EMA9_ABOVE_EMA21,
+            "highest_price": max_52w,
+            "market_cap": mcap
+        })
         
-        # Check EMA
-        if check_ema9_above_ema21(closes[-50:]): # Chỉ cần 50 nến gần nhất để tính EMA21
-            print(f"   📈 {symbol}: EMA9 >= EMA21 ✓")
+    # Check 52W High (Giá cách đỉnh dưới 10%)
+    if SIGNAL_NEAR_52W_HIGH in ENABLED_SIGNALS and max_52w > 0:
+        diff = (max_52w - current_price) / max_52w
+        if diff <= 0.10:
+            print(f"   🔥 {symbol}: Gần đỉnh 52W (Cách {diff:.2%}) ✓")
             results.append({
                 "symbol": symbol,
-                "signal_type": SIGNAL_EMA9_ABOVE_EMA21,
+                "signal_type": SIGNAL_NEAR_52W_HIGH,
                 "highest_price": max_52w,
                 "market_cap": mcap
             })
-            
-        # Check 52W High (Giá cách đỉnh dưới 10%)
-        if max_52w > 0:
-            diff = (max_52w - current_price) / max_52w
-            if diff <= 0.10:
-                print(f"   🔥 {symbol}: Gần đỉnh 52W (Cách {diff:.2%}) ✓")
-                results.append({
-                    "symbol": symbol,
-                    "signal_type": SIGNAL_NEAR_52W_HIGH,
-                    "highest_price": max_52w,
-                    "market_cap": mcap
-                })
-                
-        await asyncio.sleep(0.1) # Tránh Rate Limit của Binance
+    return results
+
+
+async def scan_futures():
+    stats = StageStats()
+    states = load_states()
+    
+    async with httpx.AsyncClient(
+        timeout=10,
+        limits=httpx.Limits(max_connections=FUTURES_CONCURRENCY, max_keepalive_connections=FUTURES_CONCURRENCY)
+    ) as client:
+        # Stage 1: universe + vốn hoá (chạy song song, không phụ thuộc nhau)
+        started = time.perf_counter()
+        symbols, market_caps = await asyncio.gather(
+            get_top_futures_by_volume(client=client),
+            get_coingecko_market_caps(client)
+        )
+        stats.record("universe", len(symbols), started)
+        
+        # Stage 2: lọc vốn hoá trước khi tải bất kỳ kline nào
+        started = time.perf_counter()
+        candidates = []
+        for symbol in symbols:
+            mcap = market_caps.get(get_base_symbol(symbol), 0.0)
+            if mcap < MIN_MARKET_CAP:
+                print(f"   ⏩ {symbol} bỏ qua do vốn hoá thấp (${mcap:,.0f} USD < $2B)")
+                continue
+            candidates.append((symbol, mcap))
+        stats.record("mcap_filter", len(symbols), started)
+        
+        # Stage 3: tải kline song song có giới hạn, chỉ các nến indicator state chưa có
+        print(f"🔹 Bắt đầu quét dữ liệu kĩ thuật ({len(candidates)} hợp đồng, tối đa {FUTURES_CONCURRENCY} song song)...")
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(FUTURES_CONCURRENCY)
+        now_ms = int(time.time() * 1000)
+        bars_fetched = 0
+        
+        async def fetch_candidate(symbol):
+            nonlocal bars_fetched
+            async with semaphore:
+                days = get_state(states, symbol).bars_to_fetch(now_ms, HIGH_52W_BARS)
+                data = await fetch_futures_daily_data(symbol, days, client)
+            if data:
+                bars_fetched += len(data)
+            return data
         
+        fetched = await asyncio.gather(*(fetch_candidate(symbol) for symbol, _ in candidates))
+        stats.record("klines", len(candidates), started)
+    
+    # Stage 4: cập nhật indicator state với các nến đã đóng + đánh giá tín hiệu
+    started = time.perf_counter()
+    results = []
+    updated = {}
+    for (symbol, mcap), data in zip(candidates, fetched):
+        if not data: continue
+        
+        state = get_state(states, symbol)
+        view = state.sync_klines(data, now_ms)
+        updated[state_key(symbol)] = state
+        results.extend(evaluate_signals(symbol, view, mcap))
+    stats.record("evaluate", len(candidates), started)
+    
+    save_states(updated)
+    print(f"   Đã tải {bars_fetched} nến cho {len(candidates)} hợp đồng")
+    stats.report()
     return results
 
 # ================================
@@ -26,6 +26,14 @@ EXCLUDE_KEYWORDS = [
 # Number of top coins to scan
 TOP_COINS_LIMIT = 25
 
+# Daily candles fetched once per symbol; every signal is derived from this array
+KLINE_DAYS = 365
+EMA_LOOKBACK_DAYS = 30
+PERF_LOOKBACK_DAYS = 30
+
+# Symbols scanned concurrently per batch (also the connection pool size)
+SCAN_BATCH_SIZE = 10
+
 # Coins with unreliable Binance data - force check via CoinGecko
 FORCE_COINGECKO_CHECK = ["XMR", "ZEC"]  # Delisted or frozen price data
 
@@ -37,6 +45,7 @@ COINGECKO_IDS = {
 
 # Cache for CoinGecko coin list to avoid rate limits
 _COINGECKO_COIN_LIST_CACHE = None
+_COINGECKO_COIN_LIST_LOCK = asyncio.Lock()
 
 # Load environment variables from .env file
 load_dotenv()
@@ -74,8 +83,8 @@ def check_ema9_above_ema21(closes):
     return ema9 >= ema21
 
 
-async def fetch_daily_closes(symbol, days=30):
-    """Fetch daily close prices from Binance for MA/EMA calculation."""
+async def fetch_daily_klines(client, symbol, days=365):
+    """Fetch raw daily klines from Binance using a shared client."""
     try:
         url = "https://api.binance.com/api/v3/klines"
         params = {
@@ -83,27 +92,43 @@ async def fetch_daily_closes(symbol, days=30):
             "interval": "1d",
             "limit": days
         }
-        async with httpx.AsyncClient(timeout=10) as client:
-            res = await client.get(url, params=params)
-            if res.status_code != 200:
-                return None
-            klines = res.json()
-            if not klines:
-                return None
-            # kline format: [timestamp, open, high, low, close, volume, ...]
-            return [float(k[4]) for k in klines]
+        res = await client.get(url, params=params)
+        if res.status_code != 200:
+            return None
+        klines = res.json()
+        if not klines:
+            return None
+        # kline format: [timestamp, open, high, low, close, volume, ...]
+        return klines
     except Exception as e:
-        print(f"   ⚠️  Error fetching daily closes for {symbol}: {e}")
+        print(f"   ⚠️  Error fetching daily klines for {symbol}: {e}")
         return None
 
 
-async def fetch_30d_perf(symbol):
-    closes = await fetch_daily_closes(symbol, days=30)
-    if closes and len(closes) >= 2:
-        return ((closes[-1] - closes[0]) / closes[0]) * 100
+async def fetch_daily_closes(symbol, days=30, client=None):
+    """Fetch daily close prices from Binance for MA/EMA calculation."""
+    if client is None:
+        async with httpx.AsyncClient(timeout=10) as own_client:
+            return await fetch_daily_closes(symbol, days=days, client=own_client)
+    klines = await fetch_daily_klines(client, symbol, days=days)
+    if not klines:
+        return None
+    return [float(k[4]) for k in klines]
+
+
+def calc_perf(closes, days=30):
+    """Percent change over the last `days` closes (first to last close)."""
+    window = closes[-days:] if closes else []
+    if len(window) >= 2 and window[0]:
+        return ((window[-1] - window[0]) / window[0]) * 100
     return 0.0
 
 
+async def fetch_30d_perf(symbol, client=None):
+    closes = await fetch_daily_closes(symbol, days=30, client=client)
+    return calc_perf(closes, days=30)
+
+
 def get_signal_label(signal_type):
     """Return human-readable label for a signal type."""
     if signal_type == SIGNAL_NEAR_52W_ATH:
@@ -169,8 +194,11 @@ async def send_slack_message(cryptos_list):
 #  COINGECKO + MULTI-EXCHANGE FUNCTIONS
 # ================================
 
-async def get_coingecko_market_caps():
+async def get_coingecko_market_caps(client=None):
     """Lấy danh sách vốn hoá từ CoinGecko để làm map tra cứu"""
+    if client is None:
+        async with httpx.AsyncClient(timeout=15) as own_client:
+            return await get_coingecko_market_caps(own_client)
     try:
         url = "https://api.coingecko.com/api/v3/coins/markets"
         params = {
@@ -180,11 +208,10 @@ async def get_coingecko_market_caps():
             "page": 1,
             "sparkline": False
         }
-        async with httpx.AsyncClient(timeout=15) as client:
-            res = await client.get(url, params=params)
-            if res.status_code == 200:
-                coins = res.json()
-                return {c.get('symbol', '').upper(): float(c.get('market_cap') or 0) for c in coins}
+        res = await client.get(url, params=params, timeout=15)
+        if res.status_code == 200:
+            coins = res.json()
+            return {c.get('symbol', '').upper(): float(c.get('market_cap') or 0) for c in coins}
     except Exception as e:
         print(f"⚠️ Lỗi fetch CoinGecko market caps: {e}")
     return {}
@@ -193,8 +220,11 @@ def get_base_symbol(symbol):
     """Trích xuất symbol cơ bản"""
     base = symbol[:-4] if symbol.endswith('USDT') else symbol
     return re.sub(r'^\d+', '', base).upper()
-async def get_top_coins_from_coingecko(limit=TOP_COINS_LIMIT):
+async def get_top_coins_from_coingecko(limit=TOP_COINS_LIMIT, client=None):
     """Get top coins by market cap from CoinGecko (includes XMR, ZEC, etc.)"""
+    if client is None:
+        async with httpx.AsyncClient(timeout=15) as own_client:
+            return await get_top_coins_from_coingecko(limit=limit, client=own_client)
     try:
         url = "https://api.coingecko.com/api/v3/coins/markets"
         params = {
@@ -205,30 +235,29 @@ async def get_top_coins_from_coingecko(limit=TOP_COINS_LIMIT):
             "sparkline": False
         }
         
-        async with httpx.AsyncClient(timeout=15) as client:
-            res = await client.get(url, params=params)
-            if res.status_code != 200:
-                print(f"   ⚠️  CoinGecko API error: {res.status_code}")
-                return []
-            
-            coins = res.json()
-            symbols = []
-            for coin in coins:
-                symbol = coin.get('symbol', '').upper()
-                if symbol and symbol not in EXCLUDE_KEYWORDS:
-                    symbols.append(symbol + 'USDT')
-            
-            print(f"   Got {len(symbols)} coins from CoinGecko")
-            return symbols
+        res = await client.get(url, params=params, timeout=15)
+        if res.status_code != 200:
+            print(f"   ⚠️  CoinGecko API error: {res.status_code}")
+            return []
+        
+        coins = res.json()
+        symbols = []
+        for coin in coins:
+            symbol = coin.get('symbol', '').upper()
+            if symbol and symbol not in EXCLUDE_KEYWORDS:
+                symbols.append(symbol + 'USDT')
+        
+        print(f"   Got {len(symbols)} coins from CoinGecko")
+        return symbols
     except Exception as e:
         print(f"   ⚠️  Error fetching from CoinGecko: {e}")
         return []
 
 
-async def get_top_usdt_pairs_by_volume(limit=TOP_COINS_LIMIT):
+async def get_top_usdt_pairs_by_volume(limit=TOP_COINS_LIMIT, client=None):
     """Get top coins from CoinGecko, fallback to Binance if needed"""
     # Try CoinGecko first
-    symbols = await get_top_coins_from_coingecko(limit=limit)
+    symbols = await get_top_coins_from_coingecko(limit=limit, client=client)
     
     # If CoinGecko fails, fallback to Binance
     if not symbols:
@@ -258,84 +287,80 @@ async def get_top_usdt_pairs_by_volume(limit=TOP_COINS_LIMIT):
     return symbols
 
 
-async def check_ath_from_coingecko(base_symbol):
-    """Check if a coin is at/near ATH using CoinGecko"""
-    try:
-        # Get coin ID from symbol
-        url = f"https://api.coingecko.com/api/v3/coins/list"
-        async with httpx.AsyncClient(timeout=10) as client:
-            res = await client.get(url)
-            if res.status_code != 200:
-                return None
-            
-            coins = res.json()
-            coin_id = None
-            for coin in coins:
-                if coin['symbol'].upper() == base_symbol.upper():
-                    coin_id = coin['id']
-                    break
-            
-            if not coin_id:
-                print(f"   ⚠️  Could not find CoinGecko ID for {base_symbol}")
-                return None
-            
-            # Get market data including ATH
-            url = f"https://api.coingecko.com/api/v3/coins/{coin_id}"
-            params = {"localization": False, "tickers": False, "community_data": False, "developer_data": False}
-            res = await client.get(url, params=params)
-            
+async def get_coingecko_coin_id(client, base_symbol):
+    """Resolve a CoinGecko coin ID, downloading the coin list at most once per run"""
+    global _COINGECKO_COIN_LIST_CACHE
+
+    # Use hardcoded ID if available
+    coin_id = COINGECKO_IDS.get(base_symbol)
+    if coin_id:
+        return coin_id
+
+    async with _COINGECKO_COIN_LIST_LOCK:
+        if _COINGECKO_COIN_LIST_CACHE is None:
+            url = "https://api.coingecko.com/api/v3/coins/list"
+            res = await client.get(url, timeout=15)
+            if res.status_code == 429:
+                print(f"   ⚠️  CoinGecko rate limit, waiting 5s...")
+                await asyncio.sleep(5)
+                res = await client.get(url, timeout=15)
+
             if res.status_code != 200:
                 return None
-            
-            data = res.json()
-            current_price = data.get('market_data', {}).get('current_price', {}).get('usd')
-            ath = data.get('market_data', {}).get('ath', {}).get('usd')
-            
-            if not current_price or not ath:
-                return None
-            
-            # Check if within 10% of ATH
-            diff_from_ath = (ath - current_price) / ath
-            if diff_from_ath <= 0.10:
-                print(f"   🏆 {base_symbol} near ATH: Price ${current_price:.2f} | ATH: ${ath:.2f} | Gap: -{diff_from_ath:.2%}")
-                return {"is_ath": True, "price": current_price, "ath": ath}
-            
+
+            _COINGECKO_COIN_LIST_CACHE = res.json()
+
+    for coin in _COINGECKO_COIN_LIST_CACHE:
+        if coin['symbol'].upper() == base_symbol.upper():
+            return coin['id']
+    return None
+
+
+async def check_ath_from_coingecko(base_symbol, client=None):
+    """Check if a coin is at/near ATH using CoinGecko"""
+    if client is None:
+        async with httpx.AsyncClient(timeout=10) as own_client:
+            return await check_ath_from_coingecko(base_symbol, own_client)
+    try:
+        coin_id = await get_coingecko_coin_id(client, base_symbol)
+        if not coin_id:
+            print(f"   ⚠️  Could not find CoinGecko ID for {base_symbol}")
             return None
+        
+        # Get market data including ATH
+        url = f"https://api.coingecko.com/api/v3/coins/{coin_id}"
+        params = {"localization": False, "tickers": False, "community_data": False, "developer_data": False}
+        res = await client.get(url, params=params)
+        
+        if res.status_code != 200:
+            return None
+        
+        data = res.json()
+        current_price = data.get('market_data', {}).get('current_price', {}).get('usd')
+        ath = data.get('market_data', {}).get('ath', {}).get('usd')
+        
+        if not current_price or not ath:
+            return None
+        
+        # Check if within 10% of ATH
+        diff_from_ath = (ath - current_price) / ath
+        if diff_from_ath <= 0.10:
+            print(f"   🏆 {base_symbol} near ATH: Price ${current_price:.2f} | ATH: ${ath:.2f} | Gap: -{diff_from_ath:.2%}")
+            return {"is_ath": True, "price": current_price, "ath": ath}
+        
+        return None
     except Exception as e:
         print(f"   ⚠️  Error checking ATH for {base_symbol}: {e}")
         return None
 
 
-async def check_52week_high_from_coingecko(base_symbol):
+async def check_52week_high_from_coingecko(base_symbol, client=None):
     """Check if a coin is near its 52-week high using CoinGecko"""
-    global _COINGECKO_COIN_LIST_CACHE
-    
+    if client is None:
+        async with httpx.AsyncClient(timeout=15) as own_client:
+            return await check_52week_high_from_coingecko(base_symbol, own_client)
     try:
-        # Use hardcoded ID if available
-        coin_id = COINGECKO_IDS.get(base_symbol)
-        
-        # Otherwise, fetch from API
-        if not coin_id:
-            if _COINGECKO_COIN_LIST_CACHE is None:
-                url = f"https://api.coingecko.com/api/v3/coins/list"
-                async with httpx.AsyncClient(timeout=15) as client:
-                    res = await client.get(url)
-                    if res.status_code == 429:
-                        print(f"   ⚠️  CoinGecko rate limit, waiting 5s...")
-                        await asyncio.sleep(5)
-                        res = await client.get(url)
-                    
-                    if res.status_code != 200:
-                        return None
-                    
-                    _COINGECKO_COIN_LIST_CACHE = res.json()
-            
-            coins = _COINGECKO_COIN_LIST_CACHE
-            for coin in coins:
-                if coin['symbol'].upper() == base_symbol.upper():
-                    coin_id = coin['id']
-                    break
-        
+        coin_id = await get_coingecko_coin_id(client, base_symbol)
         if not coin_id:
             return None
         
@@ -343,256 +368,237 @@ async def check_52week_high_from_coingecko(base_symbol):
         url = f"https://api.coingecko.com/api/v3/coins/{coin_id}/market_chart"
         params = {"vs_currency": "usd", "days": "365"}
         
-        async with httpx.AsyncClient(timeout=15) as client:
-            res = await client.get(url, params=params)
-            
-            if res.status_code == 429:
-                print(f"   ⚠️  CoinGecko rate limit for {base_symbol}, waiting 5s...")
-                await asyncio.sleep(5)
-                res = await client.get(url, params=params)
-            
-            if res.status_code != 200:
-                return None
-            
-            data = res.json()
-            prices = [p[1] for p in data.get('prices', [])]
-            
-            if not prices or len(prices) < 30:
-                return None
-            
-            max_52w = max(prices)
-            current_price = prices[-1]
-            
-            # Check if within 10% of 52-week high
-            diff = (max_52w - current_price) / max_52w
-            if diff <= 0.10:
-                print(f"   ✅ {base_symbol} (CoinGecko): Price ${current_price:.2f} | 52W High: ${max_52w:.2f} | Gap: -{diff:.2%}")
-                return {"price": current_price, "high_52w": max_52w, "diff": diff}
-            
+        res = await client.get(url, params=params, timeout=15)
+        
+        if res.status_code == 429:
+            print(f"   ⚠️  CoinGecko rate limit for {base_symbol}, waiting 5s...")
+            await asyncio.sleep(5)
+            res = await client.get(url, params=params, timeout=15)
+        
+        if res.status_code != 200:
             return None
+        
+        data = res.json()
+        prices = [p[1] for p in data.get('prices', [])]
+        
+        if not prices or len(prices) < 30:
+            return None
+        
+        max_52w = max(prices)
+        current_price = prices[-1]
+        
+        # Check if within 10% of 52-week high
+        diff = (max_52w - current_price) / max_52w
+        if diff <= 0.10:
+            print(f"   ✅ {base_symbol} (CoinGecko): Price ${current_price:.2f} | 52W High: ${max_52w:.2f} | Gap: -{diff:.2%}")
+            return {"price": current_price, "high_52w": max_52w, "diff": diff}
+        
+        return None
     except Exception as e:
         print(f"   ⚠️  Error checking CoinGecko for {base_symbol}: {e}")
         return None
 
 
-async def check_52week_high_async(symbol):
-    """Check if a symbol is near its 52-week high, try multiple sources"""
+def make_signal(symbol, signal_type, highest_price, is_ath=False):
+    """Build a watchlist row for one signal"""
+    return {
+        "symbol": symbol,
+        "is_ath": is_ath,
+        "signal_type": signal_type,
+        "highest_price": highest_price
+    }
+
+
+async def fetch_mexc_daily_ohlcv(symbol):
+    """Fetch 52 weeks of daily OHLCV from MEXC via ccxt (blocking call run in executor)"""
+    symbol_formatted = symbol.replace('USDT', '/USDT')
+    loop = asyncio.get_event_loop()
+    exchange = ccxt.mexc()
+    since = int((datetime.now() - timedelta(days=365)).timestamp() * 1000)
+    return await loop.run_in_executor(
+        None,
+        lambda: exchange.fetch_ohlcv(symbol_formatted, '1d', since=since, limit=KLINE_DAYS)
+    )
+
+
+async def scan_symbol(client, symbol):
+    """
+    Fetch one symbol's daily candles once and evaluate every signal from them.
+
+    52-week high, EMA9/EMA21, 30-day performance and the current price are all
+    derived from the same kline array, so a symbol costs a single kline request
+    (plus a CoinGecko ATH lookup only when it is already near its 52W high).
+    FORCE_COINGECKO_CHECK coins skip the exchanges and only get CoinGecko's 52W check.
+
+    Returns:
+        {"symbol", "signals", "perf_30d", "price"} or None if no candles could be loaded
+    """
     try:
         symbol_formatted = symbol.replace('USDT', '/USDT')
         base_symbol = symbol.replace('USDT', '')
-        
-        # Force CoinGecko check for coins with unreliable Binance data
+        signals = []
+
+        # Force CoinGecko check for coins with unreliable Binance data: their exchange
+        # candles are not used at all (no EMA signal either)
         if base_symbol in FORCE_COINGECKO_CHECK:
             print(f"   🔍 {symbol} - Forcing CoinGecko check (unreliable Binance data)...")
-            coingecko_result = await check_52week_high_from_coingecko(base_symbol)
-            if coingecko_result:
-                return {
-                    "symbol": symbol, 
-                    "is_ath": False, 
-                    "signal_type": SIGNAL_NEAR_52W_ATH,
-                    "highest_price": coingecko_result["high_52w"]
-                }
-            else:
+            coingecko_result = await check_52week_high_from_coingecko(base_symbol, client)
+            if not coingecko_result:
                 print(f"   ⚠️  {symbol} not near 52w high on CoinGecko")
                 return None
-        
+            signals.append(make_signal(symbol, SIGNAL_NEAR_52W_ATH, coingecko_result["high_52w"]))
+            return {"symbol": symbol, "signals": signals, "perf_30d": 0.0, "price": coingecko_result["price"]}
+
         # Try Binance first (fastest)
-        url = "https://api.binance.com/api/v3/klines"
-        params = {
-            "symbol": symbol,
-            "interval": "1d",
-            "limit": 365
-        }
-        
-        async with httpx.AsyncClient(timeout=10) as client:
-            res = await client.get(url, params=params)
-            
+        klines = await fetch_daily_klines(client, symbol, days=KLINE_DAYS)
+        if klines:
+            highs = [float(k[2]) for k in klines]
+            closes = [float(k[4]) for k in klines]
+        else:
             # If Binance fails, try MEXC using ccxt
-            if res.status_code != 200:
-                print(f"   🔍 {symbol} not on Binance, trying MEXC...")
-                
-                # Try to get 52-week data from MEXC first
-                try:
-                    loop = asyncio.get_event_loop()
-                    exchange = ccxt.mexc()
-                    
-                    # Fetch 52 weeks of daily data
-                    since = int((datetime.now() - timedelta(days=365)).timestamp() * 1000)
-                    ohlcv = await loop.run_in_executor(
-                        None, 
-                        lambda: exchange.fetch_ohlcv(symbol_formatted, '1d', since=since, limit=365)
-                    )
-                    
-                    if not ohlcv or len(ohlcv) == 0:
-                        print(f"   ⚠️  No OHLCV data from MEXC for {symbol}")
-                        return None
-                    
-                    if len(ohlcv) < 30:  # Not enough data
-                        print(f"   ⚠️  Insufficient data from MEXC for {symbol}: only {len(ohlcv)} days")
-                        return None
-                    
-                    # Extract highs and current price from OHLCV
-                    highs = [candle[2] for candle in ohlcv]
-                    current_price = ohlcv[-1][4]  # Last close price
-                    max_52w = max(highs)
-                    
-                    print(f"   ✓ Got MEXC data for {symbol}: {len(ohlcv)} candles, price: {current_price}")
-                    
-                    # Check if within 10% of 52W high
-                    diff = (max_52w - current_price) / max_52w
-                    if diff <= 0.10:
-                        ath_result = await check_ath_from_coingecko(base_symbol)
-                        is_ath = ath_result is not None
-                        highest_price = ath_result["ath"] if is_ath else max_52w
-                        return {
-                            "symbol": symbol, 
-                            "is_ath": is_ath, 
-                            "signal_type": SIGNAL_NEAR_ATH if is_ath else SIGNAL_NEAR_52W_ATH,
-                            "highest_price": highest_price
-                        }
-                    
-                except Exception as e:
-                    # If MEXC also fails, try CoinGecko as last resort
-                    print(f"   ⚠️  MEXC failed for {symbol}, trying CoinGecko as fallback...")
-                    ath_result = await check_ath_from_coingecko(base_symbol)
-                    if ath_result:
-                        print(f"   🏆 {symbol} is near ATH (CoinGecko)")
-                        return {
-                            "symbol": symbol, 
-                            "is_ath": True, 
-                            "signal_type": SIGNAL_NEAR_ATH,
-                            "highest_price": ath_result["ath"]
-                        }
-                    return None
+            print(f"   🔍 {symbol} not on Binance, trying MEXC...")
+            try:
+                ohlcv = await fetch_mexc_daily_ohlcv(symbol)
+            except Exception:
+                # If MEXC also fails, try CoinGecko as last resort
+                print(f"   ⚠️  MEXC failed for {symbol}, trying CoinGecko as fallback...")
+                ath_result = await check_ath_from_coingecko(base_symbol, client)
+                if ath_result:
+                    print(f"   🏆 {symbol} is near ATH (CoinGecko)")
+                    signals.append(make_signal(symbol, SIGNAL_NEAR_ATH, ath_result["ath"], is_ath=True))
+                    return {"symbol": symbol, "signals": signals, "perf_30d": 0.0, "price": ath_result["price"]}
+                return None
+
+            if not ohlcv:
+                print(f"   ⚠️  No OHLCV data from MEXC for {symbol}")
+                return None
+            if len(ohlcv) < 30:  # Not enough data
+                print(f"   ⚠️  Insufficient data from MEXC for {symbol}: only {len(ohlcv)} days")
+                return None
+
+            highs = [float(candle[2]) for candle in ohlcv]
+            closes = [float(candle[4]) for candle in ohlcv]
+            print(f"   ✓ Got MEXC data for {symbol}: {len(ohlcv)} candles, price: {closes[-1]}")
+
+        current_price = closes[-1]
+
+        # --- 52-week high / ATH ---
+        max_52w = max(highs)
+        diff = (max_52w - current_price) / max_52w
+        if diff <= 0.10:
+            # Only if near 52-week high, then check if it's also ATH
+            ath_result = await check_ath_from_coingecko(base_symbol, client)
+            is_ath = ath_result is not None
+            if is_ath:
+                print(f"   🏆 {symbol_formatted}: Price {current_price:.2f} | Near ATH!")
             else:
-                # Parse Binance response
-                klines = res.json()
-                if not klines:
-                    return None
-                
-                highs = [float(k[2]) for k in klines]
-                current_price = float(klines[-1][4])
-            
-            max_52w = max(highs)
-            
-            # Check if within 10% of 52-week high
-            diff = (max_52w - current_price) / max_52w
-            if diff <= 0.10:
-                # Only if near 52-week high, then check if it's also ATH
-                ath_result = await check_ath_from_coingecko(base_symbol)
-                is_ath = ath_result is not None
-                highest_price = ath_result["ath"] if is_ath else max_52w
-                
-                if is_ath:
-                    print(f"   🏆 {symbol_formatted}: Price {current_price:.2f} | Near ATH!")
-                else:
-                    print(f"   ✅ {symbol_formatted}: Price {current_price:.2f} | 52W High: {max_52w:.2f} | Gap: -{diff:.2%}")
-                
-                return {
-                    "symbol": symbol, 
-                    "is_ath": is_ath, 
-                    "signal_type": SIGNAL_NEAR_ATH if is_ath else SIGNAL_NEAR_52W_ATH,
-                    "highest_price": highest_price
-                }
-            
-            return None
+                print(f"   ✅ {symbol_formatted}: Price {current_price:.2f} | 52W High: {max_52w:.2f} | Gap: -{diff:.2%}")
+            signals.append(make_signal(
+                symbol,
+                SIGNAL_NEAR_ATH if is_ath else SIGNAL_NEAR_52W_ATH,
+                ath_result["ath"] if is_ath else max_52w,
+                is_ath=is_ath
+            ))
+
+        # --- EMA9 >= EMA21 on the last EMA_LOOKBACK_DAYS closes ---
+        ema_closes = closes[-EMA_LOOKBACK_DAYS:]
+        if check_ema9_above_ema21(ema_closes):
+            print(f"   📈 {base_symbol}: EMA9 >= EMA21 ✓")
+            signals.append(make_signal(symbol, SIGNAL_EMA9_ABOVE_EMA21, max(ema_closes)))
+
+        return {
+            "symbol": symbol,
+            "signals": signals,
+            "perf_30d": calc_perf(closes, days=PERF_LOOKBACK_DAYS),
+            "price": current_price
+        }
     except Exception as e:
         print(f"   ⚠️  Error checking {symbol}: {e}")
         return None
 
+
 # ================================
 #  DATABASE UPDATE LOGIC
 # ================================
-async def check_ema9_ema21_batch(symbols):
-    """Check EMA9 >= EMA21 for a list of symbols, return matching ones."""
-    ema9_results = []
-    batch_size = 10
-    total_batches = (len(symbols) + batch_size - 1) // batch_size
+async def scan_symbols(client, symbols):
+    """Run scan_symbol over all symbols in concurrent batches, return {symbol: scan}"""
+    scans = {}
+    total_batches = (len(symbols) + SCAN_BATCH_SIZE - 1) // SCAN_BATCH_SIZE
     
-    for i in range(0, len(symbols), batch_size):
-        batch = symbols[i:i + batch_size]
-        batch_num = i // batch_size + 1
-        print(f"   EMA9/EMA21 batch {batch_num}/{total_batches} ({len(batch)} symbols)...")
-        
-        tasks = [fetch_daily_closes(symbol, days=30) for symbol in batch]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        for symbol, closes in zip(batch, results):
-            if closes and not isinstance(closes, Exception):
-                if check_ema9_above_ema21(closes):
-                    base = symbol.replace('USDT', '')
-                    print(f"   📈 {base}: EMA9 >= EMA21 ✓")
-                    ema9_results.append({
-                        "symbol": symbol,
-                        "is_ath": False,
-                        "signal_type": SIGNAL_EMA9_ABOVE_EMA21,
-                        "highest_price": max(closes) if closes else None
-                    })
-        
-        if i + batch_size < len(symbols):
-            await asyncio.sleep(0.2)
-    
-    return ema9_results
-
-
-async def update_cryptos_watchlist(conn):
-    print("🔹 Fetching top coins from CoinGecko...")
-    top_symbols = await get_top_usdt_pairs_by_volume(limit=TOP_COINS_LIMIT)
-    
-    print(f"🔹 Found {len(top_symbols)} top trading pairs")
-    print(f"   Symbols: {', '.join([s.replace('USDT', '') for s in top_symbols[:10]])}...")
-
-    # --- Phase 1: Check 52-week highs (async batch processing) ---
-    print("🔹 Checking 52-week highs...")
-    near_52w = []
-    
-    # Process in concurrent batches
-    batch_size = 10
-    total_batches = (len(top_symbols) + batch_size - 1) // batch_size
-    
-    for i in range(0, len(top_symbols), batch_size):
-        batch = top_symbols[i:i + batch_size]
-        batch_num = i // batch_size + 1
+    for i in range(0, len(symbols), SCAN_BATCH_SIZE):
+        batch = symbols[i:i + SCAN_BATCH_SIZE]
+        batch_num = i // SCAN_BATCH_SIZE + 1
         print(f"   Processing batch {batch_num}/{total_batches} ({len(batch)} symbols)...")
         
         # Execute batch concurrently
-        tasks = [check_52week_high_async(symbol) for symbol in batch]
+        tasks = [scan_symbol(client, symbol) for symbol in batch]
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # Filter successful results
-        for res in results:
+        for symbol, res in zip(batch, results):
             if res and not isinstance(res, Exception):
-                near_52w.append(res)
+                scans[symbol] = res
         
         # Small delay between batches to respect rate limits
-        if i + batch_size < len(top_symbols):
+        if i + SCAN_BATCH_SIZE < len(symbols):
             await asyncio.sleep(0.2)
     
-    print(f"   Found {len(near_52w)} coins near 52-week high")
+    return scans
 
-    # --- Phase 2: Check EMA9 >= EMA21 ---
-    print("🔹 Checking EMA9 >= EMA21 (1d timeframe)...")
-    ema9_results = await check_ema9_ema21_batch(top_symbols)
-    print(f"   Found {len(ema9_results)} coins with EMA9 >= EMA21")
 
-    # --- Combine all signals ---
-    data_to_insert = near_52w + ema9_results
-    
-    print("🔹 Đang tải dữ liệu vốn hoá từ CoinGecko...")
-    market_caps = await get_coingecko_market_caps()
-    for item in data_to_insert:
-        base_symbol = get_base_symbol(item["symbol"])
-        item["market_cap"] = market_caps.get(base_symbol, 0.0)
-
-    # Calculate score_diff against BTCUSDT
-    print("🔹 Calculating relative strength against BTCUSDT...")
-    btc_perf = await fetch_30d_perf("BTCUSDT")
-    print(f"   BTCUSDT 30d performance: {btc_perf:+.2f}%")
-    for item in data_to_insert:
-        symbol = item["symbol"]
-        coin_perf = await fetch_30d_perf(symbol)
-        item["score_diff"] = coin_perf - btc_perf
-        print(f"   {symbol}: perf={coin_perf:+.2f}%, score_diff={item['score_diff']:+.2f}%")
+async def update_cryptos_watchlist(conn):
+    request_count = 0
+
+    async def count_request(request):
+        nonlocal request_count
+        request_count += 1
+
+    # One pooled client for the whole scan (keep-alive connections are reused across symbols)
+    async with httpx.AsyncClient(
+        timeout=10,
+        limits=httpx.Limits(max_connections=SCAN_BATCH_SIZE, max_keepalive_connections=SCAN_BATCH_SIZE),
+        event_hooks={"request": [count_request]}
+    ) as client:
+        print("🔹 Fetching top coins from CoinGecko...")
+        top_symbols = await get_top_usdt_pairs_by_volume(limit=TOP_COINS_LIMIT, client=client)
+        
+        print(f"🔹 Found {len(top_symbols)} top trading pairs")
+        print(f"   Symbols: {', '.join([s.replace('USDT', '') for s in top_symbols[:10]])}...")
+
+        # --- Single pass: 52-week high, EMA9 >= EMA21 and 30d performance from one kline fetch ---
+        print("🔹 Scanning 52-week highs, EMA9 >= EMA21 (1d timeframe) and 30d performance...")
+        scans = await scan_symbols(client, top_symbols)
+
+        near_52w = [sig for scan in scans.values() for sig in scan["signals"]
+                    if sig["signal_type"] != SIGNAL_EMA9_ABOVE_EMA21]
+        ema9_results = [sig for scan in scans.values() for sig in scan["signals"]
+                        if sig["signal_type"] == SIGNAL_EMA9_ABOVE_EMA21]
+        print(f"   Found {len(near_52w)} coins near 52-week high")
+        print(f"   Found {len(ema9_results)} coins with EMA9 >= EMA21")
+
+        # --- Combine all signals ---
+        data_to_insert = near_52w + ema9_results
+        
+        print("🔹 Đang tải dữ liệu vốn hoá từ CoinGecko...")
+        market_caps = await get_coingecko_market_caps(client)
+        for item in data_to_insert:
+            base_symbol = get_base_symbol(item["symbol"])
+            item["market_cap"] = market_caps.get(base_symbol, 0.0)
+
+        # Calculate score_diff against BTCUSDT (reuses the scanned candles when BTC is in the list)
+        print("🔹 Calculating relative strength against BTCUSDT...")
+        if "BTCUSDT" in scans:
+            btc_perf = scans["BTCUSDT"]["perf_30d"]
+        else:
+            btc_perf = await fetch_30d_perf("BTCUSDT", client=client)
+        print(f"   BTCUSDT 30d performance: {btc_perf:+.2f}%")
+        for item in data_to_insert:
+            symbol = item["symbol"]
+            coin_perf = scans[symbol]["perf_30d"]
+            item["score_diff"] = coin_perf - btc_perf
+            print(f"   {symbol}: perf={coin_perf:+.2f}%, score_diff={item['score_diff']:+.2f}%")
+
+    print(f"🔹 Scan used {request_count} HTTP requests for {len(top_symbols)} symbols")
 
     if data_to_insert:
         print(f"🔹 Updating {len(data_to_insert)} records into DB...")
@@ -620,22 +626,12 @@ async def update_cryptos_watchlist(conn):
             
             # Check price alerts
             print("🔹 Checking price alerts...")
+            # Current price is the last close of the scanned daily candles
             price_data = {}
             for item in data_to_insert:
                 symbol = item["symbol"]
-                if symbol in price_data:
-                    continue  # Avoid duplicate price fetches
-                try:
-                    # Get current price
-                    url = f"https://api.binance.com/api/v3/ticker/price"
-                    params = {"symbol": symbol}
-                    async with httpx.AsyncClient(timeout=5) as client:
-                        res = await client.get(url, params=params)
-                        if res.status_code == 200:
-                            data = res.json()
-                            price_data[symbol] = float(data["price"])
-                except Exception as e:
-                    print(f"   Error getting price for {symbol}: {e}")
+                if symbol not in price_data and scans[symbol]["price"]:
+                    price_data[symbol] = scans[symbol]["price"]
             
             if price_data:
                 triggered = check_multiple_alerts("crypto", price_data)
@@ -2,12 +2,14 @@ import asyncio
 import sys
 from datetime import datetime, timedelta
 import yfinance as yf
+import numpy as np
 import pandas as pd
 import asyncpg
 import os
 import httpx
 from dotenv import load_dotenv
 from price_alert_utils import check_multiple_alerts
+from source_cache import Source, load_sources_async, prune_cache, HOUR
 
 # Load environment variables from .env file
 load_dotenv()
@@ -123,99 +125,122 @@ PAIR_DISPLAY_NAMES = {
     '^TYX': 'US30Y'
 }
 
+YIELD_TICKERS = ['^IRX', '^TNX', '^TYX']
 
-async def get_forex_data(pair, from_date, to_date):
+# Batched price panel (all pairs, one download) and its local cache
+PANEL_TTL = HOUR          # Daily bars; refetch at most once an hour
+DOWNLOAD_TIMEOUT = 20     # Per-request timeout inside yf.download
+DOWNLOAD_BUDGET = 90      # Seconds before falling back to the cached panel
+
+# Extra lookbacks (in daily bars) solved from the same panel
+STRENGTH_WINDOWS = {'1W': 5, '1M': 21, '3M': 63}
+
+# Currencies scored by the strength solver (crosses/exotics add their own currencies)
+CURRENCIES = ['USD', 'EUR', 'JPY', 'GBP', 'AUD', 'CAD', 'CHF', 'XAU', 'WTI']
+MAJORS = {'USD', 'EUR', 'JPY', 'GBP', 'AUD', 'CAD', 'CHF'}
+
+# Display pairs whose legs cannot be read from the name
+PAIR_LEGS = {
+    'XAUUSD': ('XAU', 'USD'),
+    'WTI': ('WTI', 'USD'),
+    'DXY': ('USD', None),   # DXY up = USD strengthens
+}
+
+# US Treasury yields do not impact currency strength scores
+YIELD_PAIRS = ['US02Y', 'US10Y', 'US30Y']
+
+
+def _normalize_yield(pair, value):
+    """Normalize CBOE interest rate indices (e.g. ^IRX, ^TNX, ^TYX) from basis points / 10 to actual percentage"""
+    if pair in YIELD_TICKERS and value > 10.0:
+        return value / 10.0
+    return value
+
+
+def panel_start(from_date):
     """
-    Fetch forex data from Yahoo Finance (supports macOS)
+    First date the panel must cover: the strength window or 52 weeks, whichever is longer.
+    Rounded down to the month start so the cached panel is reused for a whole month.
     """
-    try:
-        # Add one day to end date to include the last day
-        date_to = datetime.strptime(to_date, "%Y-%m-%d") + timedelta(days=1)
-        to_date_str = date_to.strftime("%Y-%m-%d")
-        
-        # Add delay to avoid rate limiting
-        await asyncio.sleep(0.5)
-        
-        # Download data from Yahoo Finance - let YF handle session
-        ticker = yf.Ticker(pair)
-        df = ticker.history(start=from_date, end=to_date_str, timeout=10)
-        
-        if df is not None and len(df) > 0:
-            # Get first and last close prices
-            first_price = float(df.iloc[0]['Close'])
-            last_price = float(df.iloc[-1]['Close'])
-            
-            # Normalize CBOE interest rate indices (e.g. ^IRX, ^TNX, ^TYX) from basis points / 10 to actual percentage
-            if pair in ['^IRX', '^TNX', '^TYX']:
-                if first_price > 10.0:
-                    first_price /= 10.0
-                if last_price > 10.0:
-                    last_price /= 10.0
-            
-            return first_price, last_price
-        else:
-            print(f"No data available for {pair}")
-            return None, None
-        
-    except Exception as e:
-        print(f"Error fetching {pair}: {e}")
+    start = min(datetime.strptime(from_date, "%Y-%m-%d"), datetime.now() - timedelta(weeks=52))
+    return start.replace(day=1).strftime("%Y-%m-%d")
+
+
+def download_panel(tickers, start_date):
+    """
+    One batched Yahoo Finance download of every pair (blocking; run off the event loop).
+
+    Returns:
+        {'Close': df, 'High': df, 'Low': df} with one column per yfinance ticker, or None
+    """
+    data = yf.download(sorted(tickers), start=start_date, progress=False, auto_adjust=False,
+                       timeout=DOWNLOAD_TIMEOUT)
+    if data is None or data.empty:
+        return None
+    return {field: data[field].dropna(how='all') for field in ('Close', 'High', 'Low')}
+
+
+async def load_panel(tickers, from_date):
+    """Price panel for every pair through the local source cache (refreshed at most every PANEL_TTL)"""
+    start_date = panel_start(from_date)
+    key = f"forex_panel_{start_date}"
+    loaded = await load_sources_async([
+        Source(key, lambda: download_panel(tickers, start_date), ttl=PANEL_TTL, timeout=DOWNLOAD_BUDGET)
+    ])
+    # The key changes every month: keep only the current panel
+    prune_cache("forex_panel_", keep=key)
+    return loaded[key]
+
+
+def get_forex_data(panel, pair, from_date):
+    """
+    First and last close of a pair since from_date, from the price panel
+    """
+    if pair not in panel['Close']:
+        print(f"No data available for {pair}")
+        return None, None
+    closes = panel['Close'][pair].loc[from_date:].dropna()
+    if closes.empty:
+        print(f"No data available for {pair}")
         return None, None
+    return _normalize_yield(pair, float(closes.iloc[0])), _normalize_yield(pair, float(closes.iloc[-1]))
 
 
-async def get_52week_data(pair):
+def get_52week_data(panel, pair):
     """
-    Get 52-week high and low data for a pair
+    Get 52-week high and low data for a pair from the price panel
     """
-    try:
-        # Get last 52 weeks of data
-        end_date = datetime.now()
-        start_date = end_date - timedelta(weeks=52)
-        
-        # Add delay to avoid rate limiting
-        await asyncio.sleep(0.5)
-        
-        # Let YF handle session
-        ticker = yf.Ticker(pair)
-        df = ticker.history(start=start_date, end=end_date, timeout=10)
-        
-        if df is not None and len(df) > 0:
-            week_52_high = float(df['High'].max())
-            week_52_low = float(df['Low'].min())
-            current_price = float(df.iloc[-1]['Close'])
-            
-            # Normalize CBOE interest rate indices (e.g. ^IRX, ^TNX, ^TYX) from basis points / 10 to actual percentage
-            if pair in ['^IRX', '^TNX', '^TYX']:
-                if week_52_high > 10.0:
-                    week_52_high /= 10.0
-                if week_52_low > 10.0:
-                    week_52_low /= 10.0
-                if current_price > 10.0:
-                    current_price /= 10.0
-            
-            # Calculate distance from 52w high and low
-            distance_from_high = ((current_price - week_52_high) / week_52_high) * 100
-            distance_from_low = ((current_price - week_52_low) / week_52_low) * 100
-            
-            return {
-                'high_52w': week_52_high,
-                'low_52w': week_52_low,
-                'current': current_price,
-                'dist_from_high': distance_from_high,
-                'dist_from_low': distance_from_low
-            }
-        
+    if pair not in panel['Close']:
         return None
-        
-    except Exception as e:
-        print(f"Error fetching 52w data for {pair}: {e}")
+    start_date = datetime.now() - timedelta(weeks=52)
+    highs = panel['High'][pair].loc[start_date:].dropna()
+    lows = panel['Low'][pair].loc[start_date:].dropna()
+    closes = panel['Close'][pair].loc[start_date:].dropna()
+    if highs.empty or lows.empty or closes.empty:
         return None
 
+    week_52_high = _normalize_yield(pair, float(highs.max()))
+    week_52_low = _normalize_yield(pair, float(lows.min()))
+    current_price = _normalize_yield(pair, float(closes.iloc[-1]))
 
-async def calculate_pair_strength(pair, from_date, to_date):
+    # Calculate distance from 52w high and low
+    distance_from_high = ((current_price - week_52_high) / week_52_high) * 100
+    distance_from_low = ((current_price - week_52_low) / week_52_low) * 100
+
+    return {
+        'high_52w': week_52_high,
+        'low_52w': week_52_low,
+        'current': current_price,
+        'dist_from_high': distance_from_high,
+        'dist_from_low': distance_from_low
+    }
+
+
+def calculate_pair_strength(panel, pair, from_date):
     """
     Calculate percentage change for a forex pair
     """
-    first_price, last_price = await get_forex_data(pair, from_date, to_date)
+    first_price, last_price = get_forex_data(panel, pair, from_date)
     
     if first_price and last_price and first_price > 0:
         pct_change = ((last_price - first_price) / first_price) * 100
@@ -231,64 +256,120 @@ async def calculate_pair_strength(pair, from_date, to_date):
     return None
 
 
+def strength_by_window(panel):
+    """Currency strength over every STRENGTH_WINDOWS lookback, from the same panel (windows x currencies)"""
+    closes = panel['Close'].drop(columns=[t for t in YIELD_TICKERS if t in panel['Close']])
+    closes = closes.rename(columns=PAIR_DISPLAY_NAMES)
+    returns = window_returns(closes, list(STRENGTH_WINDOWS.values()))
+    returns.index = list(STRENGTH_WINDOWS)
+    return solve_currency_strength(returns)
+
+
+def pair_legs(pair):
+    """
+    (base, quote) currencies of a display pair, e.g. 'EURUSD' -> ('EUR', 'USD').
+    DXY only measures USD (quote None); yields are not currency pairs (None).
+    """
+    if pair in YIELD_PAIRS:
+        return None
+    if pair in PAIR_LEGS:
+        return PAIR_LEGS[pair]
+    return pair[:3], pair[3:]
+
+
+def design_matrix(pairs):
+    """
+    Pair/currency incidence matrix: row = pair, +1 on its base currency, -1 on its quote.
+
+    Returns:
+        (A, currencies, rows) - rows are the indices into `pairs` that are currency pairs
+    """
+    currencies = list(CURRENCIES)
+    rows, legs = [], []
+    for i, pair in enumerate(pairs):
+        pair_leg = pair_legs(pair)
+        if pair_leg is None:
+            continue
+        for currency in pair_leg:
+            if currency and currency not in currencies:
+                currencies.append(currency)
+        rows.append(i)
+        legs.append(pair_leg)
+
+    index = {c: j for j, c in enumerate(currencies)}
+    A = np.zeros((len(rows), len(currencies)))
+    for r, (base, quote) in enumerate(legs):
+        A[r, index[base]] = 1.0
+        if quote:
+            A[r, index[quote]] = -1.0
+    return A, currencies, rows
+
+
+def window_returns(panel, windows):
+    """
+    % change of every pair over several lookback windows at once from one price panel.
+
+    Args:
+        panel: DataFrame (dates x display pairs) of closes
+        windows: Lookback lengths in bars, e.g. [5, 21, 63]
+    Returns:
+        DataFrame (windows x pairs); NaN where the panel is shorter than the window
+    """
+    prices = panel.ffill().to_numpy(dtype=float)
+    starts = len(prices) - 1 - np.asarray(windows)
+    first = prices[np.clip(starts, 0, None)]
+    first[starts < 0] = np.nan
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = (prices[-1] / first - 1) * 100
+    return pd.DataFrame(returns, index=pd.Index(windows, name='window'), columns=panel.columns)
+
+
+def solve_currency_strength(pair_returns):
+    """
+    Least-squares currency strengths from pair returns: pair return ≈ strength(base) - strength(quote).
+    DXY pins the USD level; without it the strengths of each connected group average to zero.
+    Every window (row) is solved at once; windows with the same missing pairs share one pseudo-inverse.
+
+    Args:
+        pair_returns: DataFrame (windows x display pairs) of % changes
+    Returns:
+        DataFrame (windows x currencies) of strengths in %; currencies without any pair get 0
+    """
+    pairs = list(pair_returns.columns)
+    A, currencies, rows = design_matrix(pairs)
+    R = pair_returns.iloc[:, rows].to_numpy(dtype=float)
+    strength = np.zeros((len(R), len(currencies)))
+
+    available = ~np.isnan(R)
+    masks, groups = np.unique(available, axis=0, return_inverse=True)
+    for g, mask in enumerate(masks):
+        in_group = np.ravel(groups) == g
+        if not mask.any():
+            continue
+        A_g = A[mask]
+        strength[in_group] = R[np.ix_(in_group, mask)] @ np.linalg.pinv(A_g).T
+        # Currencies without any pair in these windows stay at 0
+        strength[np.ix_(in_group, ~A_g.any(axis=0))] = 0.0
+
+    result = pd.DataFrame(strength, index=pair_returns.index, columns=currencies)
+    # The DXY "currency" is the index itself
+    result['DXY'] = pair_returns['DXY'].fillna(0.0) if 'DXY' in pair_returns else 0.0
+    return result
+
+
 def calculate_currency_strength(pair_results):
     """
-    Calculate individual currency strength based on pair movements
-    
+    Calculate individual currency strength based on pair movements (see solve_currency_strength)
+
     For each currency:
     - If currency is base and pair goes up -> currency strengthens
     - If currency is base and pair goes down -> currency weakens
     - If currency is quote and pair goes up -> currency weakens
     - If currency is quote and pair goes down -> currency strengthens
     """
-    currency_scores = {
-        'USD': [], 'EUR': [], 'JPY': [], 'GBP': [], 
-        'AUD': [], 'CAD': [], 'CHF': [], 'XAU': [], 
-        'WTI': [], 'DXY': []
-    }
-    
-    for result in pair_results:
-        if not result:
-            continue
-            
-        pair = result['pair']
-        pct_change = result['pct_change']
-        
-        # Handle US Treasury Yields separately - they do not impact currency strength scores
-        if pair in ['US02Y', 'US10Y', 'US30Y']:
-            continue
-            
-        # Handle DXY index separately - DXY up = USD strengthens, DXY down = USD weakens
-        if pair == 'DXY':
-            currency_scores['USD'].append(pct_change)
-            currency_scores['DXY'].append(pct_change)
-            continue
-        
-        # Handle special commodity displays
-        if pair == 'WTI':
-            base = 'WTI'
-            quote = 'USD'
-        else:
-            base = pair[:3]
-            quote = pair[3:]
-        
-        # Base currency: positive change = strength
-        if base in currency_scores:
-            currency_scores[base].append(pct_change)
-        
-        # Quote currency: positive change = weakness (inverse)
-        if quote in currency_scores:
-            currency_scores[quote].append(-pct_change)
-    
-    # Calculate average strength for each currency
-    currency_strength = {}
-    for currency, scores in currency_scores.items():
-        if scores:
-            currency_strength[currency] = sum(scores) / len(scores)
-        else:
-            currency_strength[currency] = 0
-    
-    return currency_strength
+    returns = {r['pair']: r['pct_change'] for r in pair_results if r}
+    strength = solve_currency_strength(pd.DataFrame([returns]))
+    return {currency: float(value) for currency, value in strength.iloc[0].items()}
 
 
 def generate_recommendations(currency_strength, valid_results, pair_52w_data):
@@ -297,133 +378,91 @@ def generate_recommendations(currency_strength, valid_results, pair_52w_data):
     Buy strong currency against weak currency
     Also include neutral currencies against very weak ones (≤ -2%)
     Show all potential pairs, with note if near 52-week high or low (within 1%)
+
+    Every rule is evaluated as a boolean array over the available pairs (linear in the
+    number of pairs, no currency x currency loops); the first matching rule gives the reason.
     """
-    # Sort currencies by strength
-    sorted_currencies = sorted(currency_strength.items(), key=lambda x: x[1], reverse=True)
-    
-    # Get top 3 strongest
-    strongest = [c[0] for c in sorted_currencies[:3]]
-    
-    # Get neutral currencies (-1% to 1%, not in top 3)
-    neutral = [c[0] for c in sorted_currencies if -1 <= c[1] <= 1 and c[0] not in strongest]
-    
-    # Get very weak currencies (≤ -2%)
-    very_weak = [c[0] for c in sorted_currencies if c[1] <= -2]
-    
-    # Get all weak currencies (for strong pairs)
-    weakest = [c[0] for c in sorted_currencies[-3:]]
-    
+    strength = pd.Series(currency_strength, dtype=float)
+    ranked = strength.sort_values(ascending=False, kind='stable')
+
+    # Top 3 strongest / weakest, neutral (-1% to 1%, not in top 3), very weak (≤ -2%)
+    strongest = strength.index.isin(ranked.index[:3])
+    weakest = strength.index.isin(ranked.index[-3:])
+    neutral = (strength.between(-1, 1) & ~strongest).to_numpy()
+    very_weak = (strength <= -2).to_numpy()
+    major = strength.index.isin(MAJORS)
+
+    # Tradeable pairs whose legs both have a strength
+    pairs, bases, quotes = [], [], []
+    for result in valid_results:
+        legs = pair_legs(result['pair'])
+        if legs is None or legs[1] is None or legs[0] not in strength.index or legs[1] not in strength.index:
+            continue
+        pairs.append(result['pair'])
+        bases.append(strength.index.get_loc(legs[0]))
+        quotes.append(strength.index.get_loc(legs[1]))
+    if not pairs:
+        return []
+    b, q = np.array(bases), np.array(quotes)
+    values = strength.to_numpy()
+    diff = values[b] - values[q]
+
+    # 52-week position of each pair (within 1% of the high / low)
+    dist_high = np.array([pair_52w_data.get(p, {}).get('dist_from_high', np.nan) for p in pairs])
+    dist_low = np.array([pair_52w_data.get(p, {}).get('dist_from_low', np.nan) for p in pairs])
+    near_high = dist_high >= -1.0
+    near_low = (dist_low <= 1.0) & ~near_high
+
+    # (action, mask, base_type, quote_type) in priority order
+    rules = [
+        ('Buy', major[b] & major[q] & (diff >= 3.0), 'strong major', 'weak major'),  # 3% divergence
+        ('Buy', strongest[b] & weakest[q], 'strong', 'weak'),
+        ('Sell', weakest[b] & strongest[q], 'weak', 'strong'),
+        ('Buy', neutral[b] & very_weak[q], 'neutral', 'very weak'),
+        ('Sell', very_weak[b] & neutral[q], 'very weak', 'neutral'),
+        ('Buy', near_high, '52w high breakout base', '52w high breakout quote'),
+        ('Sell', near_low, '52w low breakout base', '52w low breakout quote'),
+    ]
+
     recommendations = []
-    added_setups = set()
-    
-    # Get all available pairs
-    available_pairs = {r['pair'] for r in valid_results}
-    
-    # Function to add recommendation
-    def try_add_recommendation(base, quote, action, base_type, quote_type):
-        pair = f"{base}{quote}"
-        if pair == 'WTIUSD':
-            pair = 'WTI'
-            
-        if pair in available_pairs:
-            setup_key = (pair, action)
-            if setup_key in added_setups:
-                return
-                
-            # Check 52w data
-            week_data = pair_52w_data.get(pair)
-            
-            # Determine position info
+    for action in ('Buy', 'Sell'):
+        reason = np.full(len(pairs), -1)
+        for k, (rule_action, mask, _, _) in enumerate(rules):
+            if rule_action == action:
+                reason[(reason < 0) & mask] = k
+        # Absolute setup strength (always positive for the correct action)
+        score_diff = diff if action == 'Buy' else -diff
+
+        for i in np.flatnonzero(reason >= 0):
+            pair = pairs[i]
+            _, _, base_type, quote_type = rules[reason[i]]
+            base, quote = strength.index[b[i]], strength.index[q[i]]
+
             position_note = ""
             near_extreme = False
-            dist_from_high = None
-            dist_from_low = None
-            
-            if week_data:
-                dist_from_high = week_data['dist_from_high']
-                dist_from_low = week_data['dist_from_low']
-                
-                # Check if near 52w high or low (within 1%)
-                near_high = dist_from_high >= -1.0
-                near_low = dist_from_low <= 1.0
-                
-                if near_high:
-                    position_note = f"📍 Near 52W HIGH ({dist_from_high:+.2f}%)"
-                    near_extreme = True
-                elif near_low:
-                    position_note = f"📍 Near 52W LOW ({dist_from_low:+.2f}%)"
-                    near_extreme = True
-            
-            # Calculate score_diff as the absolute setup strength (always positive for the correct action)
-            score_diff = currency_strength[base] - currency_strength[quote] if action == 'Buy' else currency_strength[quote] - currency_strength[base]
+            if near_high[i]:
+                position_note = f"📍 Near 52W HIGH ({dist_high[i]:+.2f}%)"
+                near_extreme = True
+            elif near_low[i]:
+                position_note = f"📍 Near 52W LOW ({dist_low[i]:+.2f}%)"
+                near_extreme = True
 
             recommendations.append({
                 'action': action,
                 'pair': pair,
                 'reason': f"{base} is {base_type}, {quote} is {quote_type}",
-                'base_score': currency_strength[base],
-                'quote_score': currency_strength[quote],
-                'score_diff': score_diff,
+                'base_score': float(values[b[i]]),
+                'quote_score': float(values[q[i]]),
+                'score_diff': float(score_diff[i]),
                 'position_note': position_note,
                 'near_extreme': near_extreme,
-                'dist_from_high': dist_from_high,
-                'dist_from_low': dist_from_low
+                'dist_from_high': None if np.isnan(dist_high[i]) else float(dist_high[i]),
+                'dist_from_low': None if np.isnan(dist_low[i]) else float(dist_low[i])
             })
-            added_setups.add(setup_key)
-    
-    # 1. Majors vs Majors (Divergence Threshold)
-    MAJORS = {'USD', 'EUR', 'JPY', 'GBP', 'AUD', 'CAD', 'CHF'}
-    for base in MAJORS:
-        for quote in MAJORS:
-            if base != quote:
-                diff = currency_strength[base] - currency_strength[quote]
-                if diff >= 3.0: # 3% divergence threshold
-                    try_add_recommendation(base, quote, 'Buy', 'strong major', 'weak major')
-    
-    # 2. Overall Strong vs Weak (including commodities/exotics)
-    for strong in strongest:
-        for weak in weakest:
-            try_add_recommendation(strong, weak, 'Buy', 'strong', 'weak')
-            try_add_recommendation(weak, strong, 'Sell', 'weak', 'strong')
-    
-    # 3. Neutral vs Very Weak (≤ -2%)
-    for neut in neutral:
-        for vw in very_weak:
-            try_add_recommendation(neut, vw, 'Buy', 'neutral', 'very weak')
-            try_add_recommendation(vw, neut, 'Sell', 'very weak', 'neutral')
-            
-    # 4. Near 52-Week High or Low (Breakout Setups)
-    for result in valid_results:
-        pair = result['pair']
-        if pair in ['US02Y', 'US10Y', 'US30Y', 'DXY']:
-            continue
-            
-        week_data = pair_52w_data.get(pair)
-        if week_data:
-            dist_from_high = week_data['dist_from_high']
-            dist_from_low = week_data['dist_from_low']
-            
-            if dist_from_high >= -1.0: # Within 1% of 52W High
-                if pair == 'WTI':
-                    base, quote = 'WTI', 'USD'
-                elif pair == 'XAUUSD':
-                    base, quote = 'XAU', 'USD'
-                else:
-                    base, quote = pair[:3], pair[3:]
-                try_add_recommendation(base, quote, 'Buy', '52w high breakout base', '52w high breakout quote')
-                
-            elif dist_from_low <= 1.0: # Within 1% of 52W Low
-                if pair == 'WTI':
-                    base, quote = 'WTI', 'USD'
-                elif pair == 'XAUUSD':
-                    base, quote = 'XAU', 'USD'
-                else:
-                    base, quote = pair[:3], pair[3:]
-                try_add_recommendation(base, quote, 'Sell', '52w low breakout base', '52w low breakout quote')
-    
+
     # Sort by score difference (highest first)
     recommendations.sort(key=lambda x: x['score_diff'], reverse=True)
-    
+
     return recommendations
 
 
@@ -562,11 +601,13 @@ async def main():
     
     print(f"Fetching data for {len(all_pairs)} currency pairs from Yahoo Finance...")
     
-    # Fetch data for all pairs
-    pair_results = []
-    for pair in all_pairs:
-        result = await calculate_pair_strength(pair, from_date, to_date)
-        pair_results.append(result)
+    # One batched download covering the strength window and the 52-week range
+    panel = await load_panel(all_pairs, from_date)
+    if panel is None:
+        print("\n⚠️  Warning: Could not fetch forex data.")
+        return
+
+    pair_results = [calculate_pair_strength(panel, pair, from_date) for pair in all_pairs]
     
     # Filter valid results
     valid_results = [r for r in pair_results if r]
@@ -581,15 +622,12 @@ async def main():
     
     print(f"✅ Successfully fetched data for {len(valid_results)} pairs\n")
     
-    # Fetch 52-week data for all pairs
-    print("Fetching 52-week high/low data...")
+    # 52-week data for all pairs (same panel, no second download)
     pair_52w_data = {}
     for result in valid_results:
-        yf_pair = result['yf_pair']
-        pair_name = result['pair']
-        week_data = await get_52week_data(yf_pair)
+        week_data = get_52week_data(panel, result['yf_pair'])
         if week_data:
-            pair_52w_data[pair_name] = week_data
+            pair_52w_data[result['pair']] = week_data
     
     print(f"✅ Successfully fetched 52w data for {len(pair_52w_data)} pairs\n")
     
@@ -610,6 +648,13 @@ async def main():
         status = "Strong 💪" if strength > 1 else "Weak 📉" if strength < -1 else "Neutral ➡️"
         print(f"{idx:<6} {currency:<10} {strength:>13.2f}%  {status:<15}")
     
+    # Strength over the standard lookbacks (solved together from the same panel)
+    window_strength = strength_by_window(panel)
+    print(f"\n{'Currency':<10} " + " ".join(f"{w:>8}" for w in window_strength.index))
+    for currency, _ in sorted_currencies:
+        if currency in window_strength.columns:
+            print(f"{currency:<10} " + " ".join(f"{v:>7.2f}%" for v in window_strength[currency]))
+    
     # Display pair details
     print(f"\n{'='*60}")
     print(f"Currency Pair Performance")
@@ -7,6 +7,7 @@ import sys
 from dotenv import load_dotenv
 from curl_cffi.requests import AsyncSession, RequestsError
 from price_alert_utils import check_multiple_alerts
+from vn_quote_service import VNQuoteService
 
 # Set standard output to UTF-8 to prevent encoding errors on Windows
 sys.stdout.reconfigure(encoding='utf-8')
@@ -477,46 +478,30 @@ async def fetch_potential_stocks(stocks, conn):
 async def update_current_prices_portfolio(conn):
     try:
         # Get all data from the user_trading_symbols table
-        symbols = await conn.fetch('SELECT symbol FROM user_trading_symbols')
+        symbols = [record['symbol'] for record in await conn.fetch('SELECT symbol FROM user_trading_symbols')]
+        if not symbols:
+            return
 
-        data_to_update = []
+        # Fetch all prices concurrently; symbols without a price keep their previous value
         async with AsyncSession(impersonate="chrome") as client:
-            for record in symbols:
-                symbol = record['symbol']
-                url = f"https://services.entrade.com.vn/dnse-financial-product/securities/{symbol}"
-                try:
-                    response = await client.get(url, timeout=10.0)
-                    response.raise_for_status()
-                    data = response.json()
-                    basic_price = data.get('basicPrice')  # Use .get() for safety
-                    if basic_price is not None:
-                        data_to_update.append((basic_price, symbol))  #price, symbol
-                    else:
-                        data_to_update.append((0, symbol)) # Default to 0 if basic_price is None
-                except RequestsError as e:
-                    print(f"Error for {symbol}: {e}")
-                except asyncio.TimeoutError:
-                    print(f"Timeout for {symbol}")
-                except Exception as e:
-                    print(f"Error for {symbol}: {e}")
-
-                await asyncio.sleep(1) # Comply with rate limit
+            quote_service = VNQuoteService(client)
+            prices = await quote_service.get_prices(symbols)
+        print(f"📊 {quote_service.summary()}")
+        missing = [s for s in symbols if s not in prices]
+        if missing:
+            print(f"⚠️ No DNSE price for {len(missing)} portfolio symbols: {', '.join(missing)}")
 
         # Update the current_price field in the database using a single SQL statement
-        if data_to_update:
-            transaction = conn.transaction()
-            await transaction.start()
+        if prices:
             try:
-                await conn.executemany('''
-                    UPDATE user_trading_symbols
-                    SET current_price = $1
-                    WHERE symbol = $2
-                ''', data_to_update)
+                await conn.execute('''
+                    UPDATE user_trading_symbols AS u
+                    SET current_price = v.price
+                    FROM unnest($1::text[], $2::float8[]) AS v(symbol, price)
+                    WHERE u.symbol = v.symbol
+                ''', list(prices.keys()), list(prices.values()))
             except asyncpg.PostgresError as e:
                 print(f"Database error during bulk update: {e}")
-                await transaction.rollback()
-            else:
-                await transaction.commit()
 
 
     except Exception as e:
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Housing Price Index
+Folds new real_estate_prices listings into a daily housing_price_index table
+(robust median price/m² per region, district and property type).
+
+Each run only reads listings with an id above the stored watermark, so an update
+costs O(new listings) instead of a rescan of the whole listings table. The samples
+of the days that got new listings are kept in the row, so a second crawl on the same
+day recomputes that day's median exactly.
+
+Usage:
+    python3 housing_index.py      # fold new listings into the index
+"""
+
+import asyncio
+import logging
+import math
+import os
+import re
+import statistics
+from collections import defaultdict
+from datetime import date, datetime
+
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_KEY = 'housing_index_last_id'   # system_settings key, see migration 020
+ALL = 'ALL'                               # district / property_type of the roll-up rows
+HCMC_REGION = 'Hồ Chí Minh'
+
+# Listings outside these bounds are typos or rentals, not sale prices
+MIN_AREA_M2 = 10
+MIN_PRICE_M2 = 1_000_000          # VND/m²
+MAX_PRICE_M2 = 2_000_000_000      # VND/m²
+
+# Outlier rejection: modified z-score on log(price/m²) (Iglewicz & Hoaglin)
+MAD_THRESHOLD = 3.5
+MIN_LISTINGS = 3                  # Rows with fewer kept listings are skipped by the readers
+
+
+def price_per_m2(price_numeric, area):
+    """Price per m² in VND, or None if the listing cannot be used"""
+    if not price_numeric or not area or area < MIN_AREA_M2:
+        return None
+    value = float(price_numeric) / float(area)
+    if not MIN_PRICE_M2 <= value <= MAX_PRICE_M2:
+        return None
+    return value
+
+
+_DISTRICT_PATTERN = re.compile(r'(Quận\s+[\w\s]+?|Huyện\s+[\w\s]+?|(?:TP\.?|Thành phố|Thị xã)\s+[\w\s]+?)\s*(?:,|$)',
+                               re.IGNORECASE)
+
+
+def district_of(location):
+    """
+    District part of a listing address.
+    "Đường Lê Văn Việt, Quận 9, TPHCM" -> "Quận 9"; falls back to the first address part.
+    """
+    if not location or location == 'N/A':
+        return None
+    match = _DISTRICT_PATTERN.search(location)
+    if match:
+        return ' '.join(match.group(1).split())
+    return ' '.join(location.split(',')[0].split()) or None
+
+
+def robust_median(values):
+    """
+    Median after dropping outliers (modified z-score on the log price).
+
+    Returns:
+        (median, kept_count)
+    """
+    if not values:
+        return None, 0
+    logs = [math.log(v) for v in values]
+    center = statistics.median(logs)
+    mad = statistics.median(abs(x - center) for x in logs)
+    if mad == 0:
+        kept = values
+    else:
+        kept = [v for v, x in zip(values, logs) if 0.6745 * abs(x - center) / mad <= MAD_THRESHOLD]
+    return statistics.median(kept), len(kept)
+
+
+def group_listings(rows):
+    """
+    Group listing rows into {(index_date, region, district, property_type): [price/m², ...]},
+    including the district and property type roll-ups (ALL).
+    """
+    groups = defaultdict(list)
+    for row in rows:
+        value = price_per_m2(row['price_numeric'], row['area'])
+        if value is None:
+            continue
+        fetched_at = row['fetched_at']
+        day = fetched_at.date() if isinstance(fetched_at, datetime) else fetched_at
+        region = row['region']
+        district = district_of(row['location'])
+        ptype = row['property_type']
+        keys = {(region, ALL, ptype), (region, ALL, ALL)}
+        if district:
+            keys.update({(region, district, ptype), (region, district, ALL)})
+        for region_key, district_key, type_key in keys:
+            groups[(day, region_key, district_key, type_key)].append(value)
+    return groups
+
+
+async def connect():
+    db_port_str = os.environ.get('DB_PORT')
+    if not db_port_str:
+        raise RuntimeError("DB_PORT not set")
+    return await asyncpg.connect(
+        user=os.environ.get('DB_USER'),
+        password=os.environ.get('DB_PASSWORD'),
+        database=os.environ.get('DB_NAME'),
+        host=os.environ.get('DB_HOST'),
+        port=int(db_port_str)
+    )
+
+
+async def update_index(conn):
+    """
+    Fold listings newer than the watermark into housing_price_index.
+
+    Returns:
+        Number of new listings read
+    """
+    last_id = int(await conn.fetchval(
+        "SELECT value FROM system_settings WHERE key = $1", WATERMARK_KEY) or 0)
+    rows = await conn.fetch(
+        "SELECT id, region, location, price_numeric, area, property_type, fetched_at "
+        "FROM real_estate_prices WHERE id > $1 ORDER BY id", last_id)
+    if not rows:
+        logger.info("Housing index up to date (last id %s)", last_id)
+        return 0
+
+    groups = group_listings(rows)
+    keys = list(groups)
+    async with conn.transaction():
+        # Samples already stored for the days that got new listings
+        stored = await conn.fetch(
+            "SELECT i.index_date, i.region, i.district, i.property_type, i.samples "
+            "FROM housing_price_index i "
+            "JOIN unnest($1::date[], $2::text[], $3::text[], $4::text[]) AS k(index_date, region, district, property_type) "
+            "USING (index_date, region, district, property_type)",
+            [k[0] for k in keys], [k[1] for k in keys], [k[2] for k in keys], [k[3] for k in keys])
+        for row in stored:
+            key = (row['index_date'], row['region'], row['district'], row['property_type'])
+            groups[key] = list(row['samples']) + groups[key]
+
+        values = []
+        for (day, region, district, ptype), samples in groups.items():
+            median, kept = robust_median(samples)
+            values.append((day, region, district, ptype, median, kept, samples))
+        await conn.executemany(
+            "INSERT INTO housing_price_index "
+            "(index_date, region, district, property_type, median_price_m2, listing_count, samples) "
+            "VALUES ($1, $2, $3, $4, $5, $6, $7) "
+            "ON CONFLICT (region, district, property_type, index_date) DO UPDATE SET "
+            "median_price_m2 = EXCLUDED.median_price_m2, listing_count = EXCLUDED.listing_count, "
+            "samples = EXCLUDED.samples, updated_at = CURRENT_TIMESTAMP",
+            values)
+        await conn.execute(
+            "INSERT INTO system_settings (key, value) VALUES ($1, $2) "
+            "ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value",
+            WATERMARK_KEY, str(rows[-1]['id']))
+
+    logger.info("Housing index: %d new listings -> %d index rows (last id %s)",
+                len(rows), len(values), rows[-1]['id'])
+    return len(rows)
+
+
+async def fetch_index(conn, region=HCMC_REGION, district=ALL, property_type=ALL,
+                      start_date=None, min_listings=MIN_LISTINGS):
+    """
+    Daily median price/m² series (VND) from housing_price_index.
+
+    Returns:
+        pandas Series indexed by date (empty if there is no data yet)
+    """
+    import pandas as pd
+
+    rows = await conn.fetch(
+        "SELECT index_date, median_price_m2 FROM housing_price_index "
+        "WHERE region = $1 AND district = $2 AND property_type = $3 "
+        "AND listing_count >= $4 AND index_date >= $5 ORDER BY index_date",
+        region, district, property_type, min_listings, start_date or date(1970, 1, 1))
+    return pd.Series([r['median_price_m2'] for r in rows],
+                     index=pd.DatetimeIndex([r['index_date'] for r in rows]),
+                     name=f"{region} {district} {property_type}", dtype=float)
+
+
+async def load_index_series(region=HCMC_REGION, district=ALL, property_type=ALL, start_date=None):
+    """fetch_index with its own connection; None if the DB is unavailable"""
+    try:
+        conn = await connect()
+    except Exception as e:
+        logger.error(f"Database error: {e}")
+        return None
+    try:
+        return await fetch_index(conn, region, district, property_type, start_date)
+    finally:
+        await conn.close()
+
+
+def quarterly_index(series):
+    """
+    Quarterly average of a daily index, shaped like hcm_real_estate_cpi_2018_2026.json
+    rows (year, quarter, value) so the real-estate models can join it.
+    """
+    import pandas as pd
+
+    if series is None or series.empty:
+        return pd.DataFrame(columns=['year', 'quarter', 'price_avg_m2'])
+    quarterly = series.groupby([series.index.year, series.index.quarter]).mean()
+    quarterly.index.names = ['year', 'quarter']
+    return quarterly.rename('price_avg_m2').reset_index()
+
+
+async def main():
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
+
+    conn = await connect()
+    try:
+        await update_index(conn)
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    asyncio.run(main())
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Streaming Indicator State
+Per-(symbol, interval) EMA / SMA / rolling high-low state with O(1) updates per bar,
+shared between scanners and daemons through a compact JSON form.
+"""
+
+import fcntl
+import json
+import os
+import tempfile
+from collections import deque
+
+from bar_aggregator import INTERVAL_MS
+
+STATE_VERSION = 1
+
+# Default indicators used by the scanners (EMA9/EMA21 uptrend + 52-week high on 1d bars)
+DEFAULT_EMA_PERIODS = (9, 21)
+DEFAULT_SMA_PERIODS = ()
+DEFAULT_EXTREMA_WINDOW = 365
+
+STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'indicator_state.json')
+
+
+class _StreamingEMA:
+    """
+    EMA seeded with the SMA of the first `period` closes, exactly like the
+    batch `_calc_ema(closes, period)` helpers in the scanners.
+    """
+
+    def __init__(self, period):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.count = 0          # Closes seen so far
+        self.seed_sum = 0       # Running sum while count < period (same order as sum())
+        self.value = None       # Current EMA, None until `period` closes are seen
+
+    def update(self, close):
+        self.value = self.preview(close)
+        if self.count < self.period:
+            self.seed_sum += close
+        self.count += 1
+
+    def preview(self, close):
+        """EMA as if `close` were appended, without changing the state"""
+        if self.count + 1 < self.period:
+            return None
+        if self.count + 1 == self.period:
+            return (self.seed_sum + close) / self.period
+        return close * self.k + self.value * (1 - self.k)
+
+    def to_list(self):
+        return [self.count, self.seed_sum, self.value]
+
+    @classmethod
+    def from_list(cls, period, data):
+        ema = cls(period)
+        ema.count, ema.seed_sum, ema.value = data
+        return ema
+
+
+class _StreamingSMA:
+    """SMA of the last `period` closes via a compensated running sum"""
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.compensation = 0.0   # Neumaier correction to keep drift below float rounding
+
+    def _add(self, x):
+        t = self.total + x
+        if abs(self.total) >= abs(x):
+            self.compensation += (self.total - t) + x
+        else:
+            self.compensation += (x - t) + self.total
+        self.total = t
+
+    def update(self, close):
+        if len(self.window) == self.period:
+            self._add(-self.window[0])
+        self.window.append(close)
+        self._add(close)
+
+    @property
+    def value(self):
+        if len(self.window) < self.period:
+            return None
+        return (self.total + self.compensation) / self.period
+
+    def to_list(self):
+        return list(self.window)
+
+    @classmethod
+    def from_list(cls, period, data):
+        sma = cls(period)
+        for close in data:
+            sma.update(close)
+        return sma
+
+
+class _RollingExtremum:
+    """Rolling max (or min) over the last `window` bars using a monotonic deque"""
+
+    def __init__(self, window, is_max=True):
+        self.window = window
+        self.is_max = is_max
+        self.entries = deque()    # (bar_index, value), values monotonic from the front
+
+    def _dominates(self, a, b):
+        return a >= b if self.is_max else a <= b
+
+    def update(self, index, value):
+        while self.entries and self._dominates(value, self.entries[-1][1]):
+            self.entries.pop()
+        self.entries.append((index, value))
+        # Drop bars that left the window
+        while self.entries[0][0] <= index - self.window:
+            self.entries.popleft()
+
+    def value(self):
+        return self.entries[0][1] if self.entries else None
+
+    def preview(self, index, value):
+        """Extremum as if bar `index` with `value` were appended, without changing the state"""
+        for entry_index, entry_value in self.entries:
+            if entry_index > index - self.window:
+                # First surviving entry is the extremum of the remaining window
+                return entry_value if self._dominates(entry_value, value) else value
+        return value
+
+    def to_list(self):
+        return [list(entry) for entry in self.entries]
+
+    @classmethod
+    def from_list(cls, window, is_max, data):
+        extremum = cls(window, is_max)
+        extremum.entries = deque((int(i), v) for i, v in data)
+        return extremum
+
+
+class IndicatorState:
+    """
+    Streaming indicator state for one (symbol, interval).
+
+    Feed closed bars in order with `update()`; every call is O(1) amortized.
+    EMA and rolling high/low values are identical to the batch helpers run over
+    the same closes/highs (`_calc_ema(closes, p)`, `max(highs[-window:])`);
+    SMA uses a compensated running sum and matches `_calc_sma` to float rounding.
+    """
+
+    def __init__(self, symbol, interval='1d', ema_periods=DEFAULT_EMA_PERIODS,
+                 sma_periods=DEFAULT_SMA_PERIODS, extrema_window=DEFAULT_EXTREMA_WINDOW):
+        self.symbol = symbol
+        self.interval = interval
+        self.extrema_window = extrema_window
+        self.bar_count = 0               # Number of closed bars consumed
+        self.last_bar_time = None        # Open time (ms) of the last consumed bar
+        self.last_close = None
+        self.emas = {p: _StreamingEMA(p) for p in ema_periods}
+        self.smas = {p: _StreamingSMA(p) for p in sma_periods}
+        self.highest = _RollingExtremum(extrema_window, is_max=True)
+        self.lowest = _RollingExtremum(extrema_window, is_max=False)
+
+    @property
+    def key(self):
+        return f"{self.symbol}:{self.interval}"
+
+    def update(self, close, high=None, low=None, bar_time=None):
+        """
+        Consume one closed bar.
+
+        Args:
+            close: Close price of the bar
+            high: High of the bar (defaults to close)
+            low: Low of the bar (defaults to close)
+            bar_time: Open time of the bar in ms; bars at or before the last one are ignored
+
+        Returns:
+            True if the bar was applied, False if it was a duplicate
+        """
+        if bar_time is not None and self.last_bar_time is not None and bar_time <= self.last_bar_time:
+            return False
+        close = float(close)
+        for ema in self.emas.values():
+            ema.update(close)
+        for sma in self.smas.values():
+            sma.update(close)
+        self.highest.update(self.bar_count, float(high) if high is not None else close)
+        self.lowest.update(self.bar_count, float(low) if low is not None else close)
+        self.bar_count += 1
+        self.last_close = close
+        if bar_time is not None:
+            self.last_bar_time = int(bar_time)
+        return True
+
+    def update_many(self, bars):
+        """Consume an iterable of (bar_time, high, low, close) tuples"""
+        applied = 0
+        for bar_time, high, low, close in bars:
+            applied += self.update(close, high, low, bar_time)
+        return applied
+
+    def ema(self, period):
+        return self.emas[period].value
+
+    def sma(self, period):
+        return self.smas[period].value
+
+    def rolling_high(self):
+        return self.highest.value()
+
+    def rolling_low(self):
+        return self.lowest.value()
+
+    def preview(self, close, high=None, low=None):
+        """
+        Indicator values as if a still-forming bar closed at `close`, without
+        mutating the state. Daemons use this for the live candle between closes.
+        """
+        close = float(close)
+        index = self.bar_count
+        return {
+            "close": close,
+            "ema": {p: ema.preview(close) for p, ema in self.emas.items()},
+            "high": self.highest.preview(index, float(high) if high is not None else close),
+            "low": self.lowest.preview(index, float(low) if low is not None else close),
+        }
+
+    def ema_above(self, fast=9, slow=21):
+        """EMA(fast) >= EMA(slow), False until both are available"""
+        fast_value, slow_value = self.ema(fast), self.ema(slow)
+        if fast_value is None or slow_value is None:
+            return False
+        return fast_value >= slow_value
+
+    def to_dict(self):
+        """Compact serializable form"""
+        return {
+            "v": STATE_VERSION,
+            "s": self.symbol,
+            "i": self.interval,
+            "w": self.extrema_window,
+            "n": self.bar_count,
+            "t": self.last_bar_time,
+            "c": self.last_close,
+            "ema": {str(p): ema.to_list() for p, ema in self.emas.items()},
+            "sma": {str(p): sma.to_list() for p, sma in self.smas.items()},
+            "hi": self.highest.to_list(),
+            "lo": self.lowest.to_list(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("v") != STATE_VERSION:
+            raise ValueError(f"Unsupported indicator state version: {data.get('v')}")
+        state = cls(data["s"], data["i"], ema_periods=(), sma_periods=(), extrema_window=data["w"])
+        state.bar_count = data["n"]
+        state.last_bar_time = data["t"]
+        state.last_close = data["c"]
+        state.emas = {int(p): _StreamingEMA.from_list(int(p), v) for p, v in data["ema"].items()}
+        state.smas = {int(p): _StreamingSMA.from_list(int(p), v) for p, v in data["sma"].items()}
+        state.highest = _RollingExtremum.from_list(data["w"], True, data["hi"])
+        state.lowest = _RollingExtremum.from_list(data["w"], False, data["lo"])
+        return state
+
+    def current(self):
+        """Indicator values of the last consumed bar, in the same shape as preview()"""
+        return {
+            "close": self.last_close,
+            "ema": {p: ema.value for p, ema in self.emas.items()},
+            "high": self.rolling_high(),
+            "low": self.rolling_low(),
+        }
+
+    def bars_to_fetch(self, now_ms, max_bars):
+        """
+        Number of klines to request so the state catches up to `now_ms`: every bar since
+        the last consumed one plus the forming bar, or `max_bars` for a cold state.
+        """
+        if self.last_bar_time is None:
+            return max_bars
+        gap = (now_ms - self.last_bar_time) // INTERVAL_MS[self.interval] + 1
+        return int(min(max(gap, 1), max_bars))
+
+    def sync_klines(self, klines, now_ms):
+        """
+        Consume the closed bars of Binance-style klines and preview the forming one.
+
+        Bars already consumed are skipped. If the klines start after a gap, the state is
+        rebuilt from them, so a state that fell behind never mixes non-adjacent bars.
+
+        Returns:
+            preview() of the forming bar, or current() when every kline is closed
+        """
+        bar_ms = INTERVAL_MS[self.interval]
+        closed = [k for k in klines if int(k[0]) + bar_ms <= now_ms]
+        if closed and self.last_bar_time is not None and int(closed[0][0]) > self.last_bar_time + bar_ms:
+            self.__init__(self.symbol, self.interval, tuple(self.emas), tuple(self.smas), self.extrema_window)
+        self.update_many((int(k[0]), float(k[2]), float(k[3]), float(k[4])) for k in closed)
+        if len(closed) < len(klines):
+            forming = klines[-1]
+            return self.preview(float(forming[4]), float(forming[2]), float(forming[3]))
+        return self.current()
+
+    @classmethod
+    def from_klines(cls, symbol, klines, interval='1d', **kwargs):
+        """Build state from Binance-style klines ([open_time, open, high, low, close, ...])"""
+        state = cls(symbol, interval, **kwargs)
+        state.update_many((int(k[0]), float(k[2]), float(k[3]), float(k[4])) for k in klines)
+        return state
+
+
+def load_states(path=STATE_FILE):
+    """
+    Load all saved indicator states (entries that fail to parse are skipped).
+
+    Returns:
+        Dictionary of {"SYMBOL:interval": IndicatorState}
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            raw = json.load(f)
+    except Exception as e:
+        print(f"⚠️ Could not read indicator state cache: {e}")
+        return {}
+
+    states = {}
+    for key, data in raw.items():
+        try:
+            states[key] = IndicatorState.from_dict(data)
+        except Exception as e:
+            print(f"⚠️ Skipping indicator state {key}: {e}")
+    return states
+
+
+def save_states(states, path=STATE_FILE):
+    """Persist indicator states (merged with any saved by other processes)"""
+    tmp_path = None
+    try:
+        # The futures scan and the uptrend daemon share the file: serialize read-merge-replace
+        with open(f"{path}.lock", 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            merged = {}
+            if os.path.exists(path):
+                try:
+                    with open(path, 'r', encoding='utf-8') as f:
+                        merged = json.load(f)
+                except ValueError as e:
+                    print(f"⚠️ Replacing unreadable indicator state cache: {e}")
+            for key, state in states.items():
+                merged[key] = state.to_dict()
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.indicator_state.', suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(merged, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+            tmp_path = None
+    except Exception as e:
+        print(f"⚠️ Could not save indicator state cache: {e}")
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -3,7 +3,10 @@ Script giải thích chi tiết tại sao model dự đoán giá vàng cụ th
 """
 import pandas as pd
 import numpy as np
-from pycaret.regression import load_model, predict_model
+import gold_data
+import gold_features
+from gold_explain import GoldExplainer, background_rows, top_contributions
+from gold_runtime import load_predictor
 import json
 import warnings
 warnings.filterwarnings('ignore')
@@ -15,14 +18,14 @@ print("=" * 80)
 # Load model
 print("\n[1] THÔNG TIN MODEL:")
 print("-" * 80)
-model = load_model('best_model_price.pkl')
-print(f"   ✓ Model type: {type(model).__name__}")
+model = load_predictor('best_model_price')
+print(f"   ✓ Model type: {type(model.estimator).__name__}")
 print(f"   ✓ Model đã được train trong: train_gold_model.py")
 print(f"   ✓ Target: Direct Price Prediction (không phải % return)")
 print(f"   ✓ Best experiment: Price prediction (R² = 0.9728)")
 
 # Load data
-df = pd.read_csv('gold_macro_data_full.csv', index_col=0, parse_dates=True)
+df = gold_data.load_data()
 print(f"\n[2] DỮ LIỆU LỊCH SỬ:")
 print("-" * 80)
 print(f"   Training period: {df.index[0].date()} → {df.index[-1].date()}")
@@ -52,63 +55,8 @@ print(f"   4-week change: ${current_price - price_4w_ago:+,.2f} ({change_4w:+.2f
 print(f"\n[4] TẠO FEATURES CHO PREDICTION:")
 print("-" * 80)
 
-# Recreate features
-df['Geo_Score'] = 1.0
-df.loc['2022-02':'2022-04', 'Geo_Score'] = 9.0
-df.loc['2023-10':'2023-11', 'Geo_Score'] = 8.0
-df.loc['2020-03':'2020-05', 'Geo_Score'] = 6.0
-
-# BASIC RETURNS
-df['Gold_Ret'] = df['Gold'].pct_change()
-df['DXY_Ret'] = df['DXY'].pct_change()
-df['SP500_Ret'] = df['SP500'].pct_change()
-df['Oil_Ret'] = df['Oil'].pct_change()
-df['Silver_Ret'] = df['Silver'].pct_change()
-
-# LAGGED FEATURES
-for lag in [1, 2, 3, 4]:
-    df[f'Gold_Ret_Lag{lag}'] = df['Gold_Ret'].shift(lag)
-    df[f'DXY_Ret_Lag{lag}'] = df['DXY_Ret'].shift(lag)
-    df[f'VIX_Lag{lag}'] = df['VIX'].shift(lag)
-
-# ROLLING STATISTICS
-for window in [4, 8, 12]:
-    df[f'Gold_MA{window}'] = df['Gold'].rolling(window).mean()
-    df[f'Gold_Deviation_MA{window}'] = (df['Gold'] - df[f'Gold_MA{window}']) / df[f'Gold_MA{window}']
-    df[f'Gold_Std{window}'] = df['Gold_Ret'].rolling(window).std()
-    df[f'VIX_MA{window}'] = df['VIX'].rolling(window).mean()
-    df[f'Gold_Price_Position{window}'] = df['Gold'] / df[f'Gold_MA{window}'] - 1
-
-# MOMENTUM INDICATORS
-df['Gold_Momentum_4w'] = df['Gold'].pct_change(4)
-df['Gold_Momentum_8w'] = df['Gold'].pct_change(8)
-df['Gold_Momentum_12w'] = df['Gold'].pct_change(12)
-df['Gold_Acceleration'] = df['Gold_Ret'] - df['Gold_Ret'].shift(1)
-
-# VOLATILITY INDICATORS
-df['VIX_Change'] = df['VIX'].pct_change()
-df['VIX_Spike'] = (df['VIX'] > df['VIX'].rolling(12).mean() * 1.5).astype(int)
-
-# REAL YIELD
-df['Real_Yield_Proxy'] = df['US10Y'] / df['TIPS']
-df['Real_Yield_Change'] = df['Real_Yield_Proxy'].pct_change()
-df['Real_Yield_MA4'] = df['Real_Yield_Proxy'].rolling(4).mean()
-
-# FEAR FACTOR
-df['Fear_Factor'] = df['VIX'] * df['Geo_Score']
-df['Fear_Factor_Change'] = df['Fear_Factor'].pct_change()
-
-# CORRELATION FEATURES
-df['Gold_Silver_Ratio'] = df['Gold'] / df['Silver']
-df['Gold_Silver_Ratio_Change'] = df['Gold_Silver_Ratio'].pct_change()
-df['Gold_DXY_Divergence'] = df['Gold_Ret'] + df['DXY_Ret']
-
-# MARKET REGIME
-df['Risk_On'] = ((df['SP500_Ret'] > 0) & (df['VIX'] < 20)).astype(int)
-df['Risk_Off'] = ((df['SP500_Ret'] < 0) & (df['VIX'] > 25)).astype(int)
-
-df['Target_Price'] = df['Gold'].shift(-1)
-df.dropna(inplace=True)
+# Same cached feature matrix as training / prediction (gold_features.py)
+df = gold_features.build_features(df)
 
 print(f"   ✓ Tạo {len(df.columns)} features")
 print(f"   ✓ Samples after cleaning: {len(df)}")
@@ -162,19 +110,23 @@ print(f"\n[7] MODEL PREDICTION:")
 print("-" * 80)
 
 # Prepare input
-exclude_cols = ['Gold', 'Silver', 'DXY', 'US10Y', 'TIPS', 'SP500', 
-                'VIX', 'Miners', 'Oil', 'Target_Price']
-feature_cols = [col for col in df.columns if col not in exclude_cols]
+feature_cols = [col for col in df.columns if col not in gold_features.EXCLUDE_COLUMNS]
 
 X_pred = pd.DataFrame([latest_row_modified[feature_cols]])
-prediction = predict_model(model, data=X_pred, verbose=False)
-predicted_price = prediction['prediction_label'].values[0]
+predicted_price = model.predict(X_pred)[0]
 
 print(f"   Input features: {len(feature_cols)}")
 print(f"   Predicted price: ${predicted_price:,.2f}")
 print(f"   Current price:   ${current_price:,.2f} (hoặc $4,509 manual)")
 print(f"   Difference:      ${predicted_price - current_price:+,.2f} ({((predicted_price - current_price)/current_price)*100:+.2f}%)")
 
+# Per-feature contributions (gold_explain.py: exact for tree / linear models)
+explainer = GoldExplainer(model, background_rows())
+explanation = explainer.explain(pd.DataFrame([latest_row_modified])).iloc[0]
+print(f"\n   Đóng góp theo feature ({explainer.method}): base ${explanation['base_value']:,.2f}")
+for feature, contribution in top_contributions(explanation):
+    print(f"      {feature:<28} {contribution:+12,.2f}")
+
 # Analysis
 print(f"\n[8] PHÂN TÍCH:")
 print("-" * 80)
@@ -0,0 +1,255 @@
+"""
+Walk-forward backtest cho model giá vàng
+
+Thay vì một split 85/15 duy nhất, mỗi fold train trên toàn bộ lịch sử tới thời điểm đó
+(expanding window) và test trên các tuần ngay sau, giống cách model được dùng thật.
+Mỗi cặp (estimator, target, fold) là một task độc lập chạy trong process pool.
+
+Feature matrix của mỗi fold (đã chuẩn hoá bằng scaler fit trên phần train) được tính
+một lần trong process chính và lưu ra backtest_cache/*.npz; worker chỉ nhận đường dẫn,
+nên các estimator / target dùng chung, không tính lại cũng không pickle DataFrame qua process.
+
+Mọi target (Return, LogReturn, Price) được quy về giá để so sánh cùng đơn vị.
+
+Usage:
+    python3 gold_backtest.py                       # mặc định: 8 folds x 13 tuần, mọi CPU
+    python3 gold_backtest.py --folds 12 --test-weeks 4 --workers 4
+    python3 gold_backtest.py --models lasso,ridge,rf --targets Return,Price
+"""
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, 'backtest_cache')
+RESULTS_FILE = 'backtest_results.csv'
+
+DEFAULT_FOLDS = 8
+DEFAULT_TEST_WEEKS = 13       # Một quý mỗi fold
+MIN_TRAIN_WEEKS = 104         # Fold đầu cần ít nhất 2 năm dữ liệu train
+
+TARGETS = {
+    'Return': 'Target_Return',
+    'LogReturn': 'Target_LogReturn',
+    'Price': 'Target_Price',
+}
+TARGETS_INDEX = {name: i for i, name in enumerate(TARGETS)}
+
+# Candidate estimators, tên giống model library của PyCaret
+CANDIDATES = ['lr', 'ridge', 'lasso', 'en', 'huber', 'rf', 'et', 'gbr']
+
+
+def make_estimator(name):
+    """
+    Estimator sklearn chưa fit theo tên candidate.
+    n_jobs=1: song song hoá ở mức task, không lồng thread trong từng worker.
+    """
+    from sklearn import ensemble, linear_model
+
+    if name == 'lr':
+        return linear_model.LinearRegression()
+    if name == 'ridge':
+        return linear_model.Ridge(random_state=42)
+    if name == 'lasso':
+        return linear_model.Lasso(alpha=1e-4, max_iter=10000, random_state=42)
+    if name == 'en':
+        return linear_model.ElasticNet(alpha=1e-4, max_iter=10000, random_state=42)
+    if name == 'huber':
+        return linear_model.HuberRegressor(max_iter=1000)
+    if name == 'rf':
+        return ensemble.RandomForestRegressor(n_estimators=200, min_samples_leaf=3, n_jobs=1, random_state=42)
+    if name == 'et':
+        return ensemble.ExtraTreesRegressor(n_estimators=200, min_samples_leaf=3, n_jobs=1, random_state=42)
+    if name == 'gbr':
+        return ensemble.GradientBoostingRegressor(random_state=42)
+    raise ValueError(f"Unknown model '{name}', expected one of {CANDIDATES}")
+
+
+# ==========================================
+# FOLDS + FEATURE CACHE (process chính)
+# ==========================================
+def walk_forward_folds(n_rows, n_folds=DEFAULT_FOLDS, test_weeks=DEFAULT_TEST_WEEKS, min_train=MIN_TRAIN_WEEKS):
+    """
+    [(train_end, test_end), ...] theo thứ tự thời gian: train = [0, train_end),
+    test = [train_end, test_end). Các fold cuối phủ đến dòng cuối cùng.
+    """
+    folds = []
+    test_end = n_rows
+    while len(folds) < n_folds and test_end - test_weeks >= min_train:
+        folds.append((test_end - test_weeks, test_end))
+        test_end -= test_weeks
+    return folds[::-1]
+
+
+def _data_key(X, targets):
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(X).tobytes())
+    digest.update(np.ascontiguousarray(targets).tobytes())
+    return digest.hexdigest()[:12]
+
+
+def build_fold_cache(df, feature_cols, folds, cache_dir=CACHE_DIR):
+    """
+    Chuẩn hoá feature theo từng fold (fit trên train) và lưu ra npz.
+    Fold đã có trong cache (cùng dữ liệu, cùng ranh giới) không tính lại.
+
+    Returns:
+        Danh sách đường dẫn npz, một file mỗi fold
+    """
+    X = df[feature_cols].to_numpy(dtype=float)
+    y = df[list(TARGETS.values())].to_numpy(dtype=float)
+    gold = df['Gold'].to_numpy(dtype=float)
+    key = _data_key(X, y)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    paths = []
+    for train_end, test_end in folds:
+        path = os.path.join(cache_dir, f'fold_{key}_{train_end}_{test_end}.npz')
+        if not os.path.exists(path):
+            mean = X[:train_end].mean(axis=0)
+            std = X[:train_end].std(axis=0)
+            std[std == 0] = 1.0
+            tmp_path = f'{path[:-4]}.tmp.npz'
+            np.savez(tmp_path,
+                     X_train=(X[:train_end] - mean) / std,
+                     X_test=(X[train_end:test_end] - mean) / std,
+                     y_train=y[:train_end], y_test=y[train_end:test_end],
+                     gold_test=gold[train_end:test_end])
+            os.replace(tmp_path, path)
+        paths.append(path)
+    return paths
+
+
+# ==========================================
+# WORKER
+# ==========================================
+def to_price(target, prediction, gold):
+    """Dự đoán của từng loại target -> giá tuần tới"""
+    if target == 'Return':
+        return gold * (1 + prediction)
+    if target == 'LogReturn':
+        return gold * np.exp(prediction)
+    return prediction
+
+
+def run_task(task):
+    """Fit + predict một (model, target, fold); trả về metrics của fold"""
+    model_name, target, fold, path = task
+    started = time.perf_counter()
+    data = np.load(path)
+    column = TARGETS_INDEX[target]
+
+    estimator = make_estimator(model_name)
+    estimator.fit(data['X_train'], data['y_train'][:, column])
+    prediction = np.nan_to_num(estimator.predict(data['X_test']))
+
+    gold = data['gold_test']
+    actual = data['y_test'][:, TARGETS_INDEX['Price']]
+    predicted = to_price(target, prediction, gold)
+    error = predicted - actual
+    return {
+        'model': model_name,
+        'target': target,
+        'fold': fold,
+        'train_weeks': len(data['X_train']),
+        'test_weeks': len(actual),
+        'mae': float(np.abs(error).mean()),
+        'rmse': float(np.sqrt((error ** 2).mean())),
+        'mape_pct': float((np.abs(error) / actual).mean() * 100),
+        # Đoán đúng chiều tăng/giảm so với giá hiện tại
+        'direction_acc': float((np.sign(predicted - gold) == np.sign(actual - gold)).mean()),
+        'seconds': time.perf_counter() - started,
+    }
+
+
+# ==========================================
+# HARNESS
+# ==========================================
+def run_backtest(df, feature_cols, models=None, targets=None, n_folds=DEFAULT_FOLDS,
+                 test_weeks=DEFAULT_TEST_WEEKS, workers=None):
+    """
+    Walk-forward backtest mọi (model, target) trên mọi fold.
+
+    Returns:
+        (per_fold DataFrame, summary DataFrame sắp xếp theo RMSE giá)
+    """
+    models = models or CANDIDATES
+    targets = targets or list(TARGETS)
+    folds = walk_forward_folds(len(df), n_folds, test_weeks)
+    if not folds:
+        raise ValueError(f"Not enough data for a fold: {len(df)} rows, "
+                         f"need {MIN_TRAIN_WEEKS + test_weeks}")
+
+    started = time.perf_counter()
+    paths = build_fold_cache(df, feature_cols, folds)
+    print(f"   ✓ {len(folds)} folds x {test_weeks} tuần "
+          f"({df.index[folds[0][0]].date()} → {df.index[folds[-1][1] - 1].date()}), "
+          f"feature cache {time.perf_counter() - started:.2f}s")
+
+    tasks = [(m, t, i, path) for m in models for t in targets for i, path in enumerate(paths)]
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    if workers == 1:
+        rows = [run_task(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            rows = list(executor.map(run_task, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+    wall = time.perf_counter() - started
+
+    per_fold = pd.DataFrame(rows)
+    per_fold['fold_start'] = [df.index[folds[f][0]].strftime('%Y-%m-%d') for f in per_fold['fold']]
+    summary = (per_fold.groupby(['model', 'target'])
+               .agg(mae=('mae', 'mean'), rmse=('rmse', 'mean'), rmse_std=('rmse', 'std'),
+                    mape_pct=('mape_pct', 'mean'), direction_acc=('direction_acc', 'mean'),
+                    seconds=('seconds', 'sum'))
+               .sort_values('rmse').reset_index())
+    cpu = per_fold['seconds'].sum()
+    print(f"   ✓ {len(tasks)} tasks trên {workers} workers: wall {wall:.1f}s, "
+          f"CPU {cpu:.1f}s ({cpu / wall:.1f}x)")
+    return per_fold, summary
+
+
+def _arg(args, flag, default):
+    if flag in args and args.index(flag) + 1 < len(args):
+        return args[args.index(flag) + 1]
+    return default
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    n_folds = int(_arg(args, '--folds', DEFAULT_FOLDS))
+    test_weeks = int(_arg(args, '--test-weeks', DEFAULT_TEST_WEEKS))
+    workers = int(_arg(args, '--workers', 0)) or None
+    models = _arg(args, '--models', None)
+    targets = _arg(args, '--targets', None)
+
+    print("=" * 70)
+    print("GOLD MODEL - WALK-FORWARD BACKTEST")
+    print("=" * 70)
+
+    # Feature engineering giống hệt lúc train (import ở đây để worker không phải load PyCaret)
+    import train_gold_model
+
+    raw_df = train_gold_model.load_data()
+    if raw_df.empty:
+        sys.exit(1)
+    df = train_gold_model.create_advanced_features(raw_df)
+    feature_cols = train_gold_model.select_features(df)
+
+    per_fold, summary = run_backtest(
+        df, feature_cols,
+        models=models.split(',') if models else None,
+        targets=targets.split(',') if targets else None,
+        n_folds=n_folds, test_weeks=test_weeks, workers=workers)
+
+    per_fold.to_csv(RESULTS_FILE, index=False)
+    print(f"\n📊 WALK-FORWARD RESULTS (lỗi tính trên giá, trung bình {per_fold['fold'].nunique()} folds):")
+    print(summary.to_string(index=False, float_format=lambda v: f'{v:,.4f}'))
+    best = summary.iloc[0]
+    print(f"\n🏆 Best: {best['model']} / {best['target']} (RMSE ${best['rmse']:,.2f})")
+    print(f"   ✓ Chi tiết từng fold: '{RESULTS_FILE}'")
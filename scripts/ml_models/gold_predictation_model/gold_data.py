@@ -0,0 +1,153 @@
+"""
+Kho dữ liệu macro cho model giá vàng (dùng chung cho mọi script gold)
+
+Dữ liệu tuần được lưu dạng Parquet (cột float64, index ngày) chia theo năm:
+gold_macro_store/gold_<năm>.parquet. Mỗi lần update chỉ tải các tuần mới bằng một lần
+yf.download cho cả 9 ticker, rồi ghi lại đúng partition của năm có tuần thay đổi,
+nên thời gian update không tăng theo độ dài lịch sử. gold_macro_data_full.csv chỉ còn
+là dữ liệu gốc để tạo kho lần đầu, không bị ghi lại.
+
+Usage:
+    python3 gold_data.py            # update các tuần mới
+"""
+import glob
+import os
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.path.join(BASE_DIR, 'gold_macro_store')
+SEED_CSV = os.path.join(BASE_DIR, 'gold_macro_data_full.csv')
+
+WEEK_RULE = 'W-FRI'
+UPDATE_OVERLAP_DAYS = 14      # Tải lại cả tuần cuối đã lưu (có thể chưa đủ ngày lúc lưu)
+
+TICKERS = {
+    'Gold': 'GC=F',
+    'Silver': 'SI=F',
+    'DXY': 'DX-Y.NYB',
+    'US10Y': '^TNX',
+    'TIPS': 'TIP',
+    'SP500': '^GSPC',
+    'VIX': '^VIX',
+    'Miners': 'GDX',
+    'Oil': 'CL=F'
+}
+COLUMNS = list(TICKERS)
+
+
+def _partition_path(year):
+    return os.path.join(STORE_DIR, f'gold_{year}.parquet')
+
+
+def _write_partitions(df, years):
+    """Ghi lại partition của các năm trong `years` (ghi file tạm rồi os.replace)"""
+    os.makedirs(STORE_DIR, exist_ok=True)
+    for year in sorted(years):
+        part = df[df.index.year == year]
+        path = _partition_path(year)
+        tmp_path = f'{path}.tmp'
+        part.to_parquet(tmp_path)
+        os.replace(tmp_path, path)
+
+
+def _normalize(df):
+    """Tuần W-FRI, đúng thứ tự cột, float64"""
+    df = df.resample(WEEK_RULE).last().ffill()
+    df.index.name = 'Date'
+    return df.reindex(columns=COLUMNS).astype('float64')
+
+
+def _seed_store():
+    if not os.path.exists(SEED_CSV):
+        return False
+    df = _normalize(pd.read_csv(SEED_CSV, index_col=0, parse_dates=True))
+    _write_partitions(df, set(df.index.year))
+    print(f"   ✓ Đã tạo kho dữ liệu từ '{os.path.basename(SEED_CSV)}' ({len(df)} tuần)")
+    return True
+
+
+def load_data(since=None):
+    """
+    Dữ liệu macro theo tuần (index W-FRI, cột COLUMNS).
+
+    Args:
+        since: Chỉ đọc các partition từ năm của ngày này (None = toàn bộ lịch sử)
+
+    Returns:
+        DataFrame (rỗng nếu chưa có dữ liệu)
+    """
+    paths = sorted(glob.glob(_partition_path('*')))
+    if not paths:
+        if not _seed_store():
+            return pd.DataFrame(columns=COLUMNS)
+        paths = sorted(glob.glob(_partition_path('*')))
+    if since is not None:
+        first_year = pd.Timestamp(since).year
+        paths = [p for p in paths if int(os.path.basename(p)[5:9]) >= first_year]
+    df = pd.concat([pd.read_parquet(p) for p in paths]).sort_index()
+    if since is not None:
+        df = df[df.index >= pd.Timestamp(since)]
+    return df
+
+
+def download_latest(start):
+    """Giá đóng cửa từ `start` cho mọi ticker trong một lần yf.download, theo tuần"""
+    import yfinance as yf
+
+    raw = yf.download(list(TICKERS.values()), start=start.strftime('%Y-%m-%d'),
+                      progress=False, auto_adjust=False, threads=True)
+    if raw is None or raw.empty:
+        return pd.DataFrame(columns=COLUMNS)
+    close = raw['Close'].rename(columns={ticker: name for name, ticker in TICKERS.items()})
+    return close.resample(WEEK_RULE).last()
+
+
+def update_data(df=None):
+    """
+    Thêm các tuần mới vào kho (tuần cuối đã lưu được ghi đè bằng giá mới).
+
+    Returns:
+        DataFrame đầy đủ sau update
+    """
+    df = load_data() if df is None else df
+    if df.empty:
+        return df
+    last_week = df.index[-1]
+    latest = download_latest(last_week - pd.Timedelta(days=UPDATE_OVERLAP_DAYS))
+    latest = latest[latest.index >= last_week].dropna(how='all')
+    if latest.empty:
+        return df
+
+    # Ô trống (ticker chưa có giá tuần này) lấy giá của tuần trước đó
+    history = df[df.index < latest.index[0]]
+    latest = pd.concat([history.iloc[-1:], latest.reindex(columns=COLUMNS)]).ffill().iloc[1:]
+    latest = latest.astype('float64')
+
+    combined = pd.concat([history, latest])
+    combined = combined[~combined.index.duplicated(keep='last')].sort_index()
+    _write_partitions(combined, set(latest.index.year))
+    return combined
+
+
+def load_and_update_data():
+    """load_data + update_data; offline thì trả về dữ liệu đã lưu"""
+    df = load_data()
+    if df.empty:
+        return df
+    try:
+        return update_data(df)
+    except Exception as e:
+        print(f"   ⚠ Không thể cập nhật (offline?): {e}")
+        print("   → Sử dụng dữ liệu cũ")
+        return df
+
+
+if __name__ == "__main__":
+    before = load_data()
+    after = load_and_update_data()
+    if after.empty:
+        print("❌ Không tìm thấy dữ liệu.")
+    else:
+        print(f"✓ {len(after)} tuần, {len(after) - len(before):+d} tuần mới, "
+              f"dữ liệu mới nhất: {after.index[-1].date()}")
@@ -0,0 +1,153 @@
+"""
+Direct multi-horizon model cho giá vàng
+
+Forecast cuối tháng/quý/năm mặc định đưa giá dự đoán của model 1 tuần quay lại làm feature
+tới 52 lần: lỗi cộng dồn theo từng bước, trong khi VIX, DXY và các lag feature đứng yên.
+Ở đây mỗi horizon (1, 4, 13, 52 tuần) có một model riêng, train trực tiếp trên
+log(Gold[t+h] / Gold[t]) từ cùng feature matrix. Lúc predict, dòng mới nhất được chuẩn
+hoá một lần và mọi horizon được dự đoán cùng lúc, không có vòng lặp 52 bước.
+
+Usage:
+    python3 gold_direct.py                  # train mọi horizon song song (model mặc định: lasso)
+    python3 gold_direct.py --model rf       # candidate khác, xem gold_backtest.CANDIDATES
+"""
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+
+from gold_backtest import make_estimator
+
+DIRECT_FILE = 'direct_models.joblib'
+FORMAT_VERSION = 1
+HORIZONS = [1, 4, 13, 52]
+DEFAULT_MODEL = 'lasso'
+HOLDOUT_FRACTION = 0.15       # Phần cuối của mỗi horizon dùng để báo lỗi trước khi refit
+
+
+def horizon_targets(df, horizons=HORIZONS):
+    """{h: log(Gold[t+h] / Gold[t])}, NaN ở h dòng cuối"""
+    return {h: np.log(df['Gold'].shift(-h) / df['Gold']).to_numpy() for h in horizons}
+
+
+def fit_horizon(task):
+    """
+    Train model của một horizon: báo lỗi trên holdout cuối, rồi refit trên toàn bộ.
+    Chạy trong worker process.
+    """
+    horizon, model_name, X, y, gold = task
+    started = time.perf_counter()
+    split = int(len(X) * (1 - HOLDOUT_FRACTION))
+
+    estimator = make_estimator(model_name)
+    estimator.fit(X[:split], y[:split])
+    predicted = gold[split:] * np.exp(estimator.predict(X[split:]))
+    actual = gold[split:] * np.exp(y[split:])
+    mape = float((np.abs(predicted - actual) / actual).mean() * 100)
+
+    estimator = make_estimator(model_name)
+    estimator.fit(X, y)
+    return horizon, estimator, {'rows': len(X), 'holdout_mape_pct': mape,
+                                'seconds': time.perf_counter() - started}
+
+
+def train_direct_models(df, feature_cols, model_name=DEFAULT_MODEL, horizons=HORIZONS, workers=None):
+    """
+    Train một model cho mỗi horizon, song song theo horizon.
+
+    Returns:
+        Artifact dict (features, scaler, {horizon: estimator}, metrics)
+    """
+    X_all = df[feature_cols].to_numpy(dtype=float)
+    gold = df['Gold'].to_numpy(dtype=float)
+    # Một scaler chung cho mọi horizon: lúc predict chỉ chuẩn hoá dòng mới nhất một lần
+    mean = X_all.mean(axis=0)
+    std = X_all.std(axis=0)
+    std[std == 0] = 1.0
+    X_all = (X_all - mean) / std
+
+    tasks = []
+    for h, y in horizon_targets(df, horizons).items():
+        rows = ~np.isnan(y)
+        tasks.append((h, model_name, X_all[rows], y[rows], gold[rows]))
+
+    workers = workers or min(len(tasks), os.cpu_count() or 1)
+    started = time.perf_counter()
+    if workers == 1:
+        fitted = [fit_horizon(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            fitted = list(executor.map(fit_horizon, tasks))
+    print(f"   ✓ {len(tasks)} horizons trên {workers} workers: {time.perf_counter() - started:.1f}s")
+
+    for h, _, metrics in fitted:
+        print(f"      {h:>2} tuần: {metrics['rows']} dòng, holdout MAPE {metrics['holdout_mape_pct']:.2f}%, "
+              f"{metrics['seconds']:.1f}s")
+    return {
+        'format_version': FORMAT_VERSION,
+        'model_name': model_name,
+        'features': list(feature_cols),
+        'mean': mean,
+        'std': std,
+        'models': {h: estimator for h, estimator, _ in fitted},
+        'metrics': {h: metrics for h, _, metrics in fitted},
+        'trained_until': df.index[-1].strftime('%Y-%m-%d'),
+    }
+
+
+class DirectGoldForecaster:
+    """Giá dự đoán cho mọi horizon từ một dòng feature"""
+
+    def __init__(self, artifact):
+        if artifact.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported direct model format {artifact.get('format_version')}")
+        self.features = artifact['features']
+        self.mean = artifact['mean']
+        self.std = artifact['std']
+        self.models = artifact['models']
+        self.horizons = sorted(self.models)
+        self.model_name = artifact['model_name']
+
+    def predict(self, row, current_price):
+        """{horizon: giá dự đoán} cho dòng feature `row` (Series / dict)"""
+        X = ((np.array([float(row[f]) for f in self.features]) - self.mean) / self.std)[None, :]
+        return {h: float(current_price * np.exp(self.models[h].predict(X)[0])) for h in self.horizons}
+
+    def weekly_path(self, row, current_price, weeks):
+        """
+        Đường giá tuần 1..weeks nội suy tuyến tính trên log giá giữa các horizon
+        (tuần 0 = current_price, sau horizon dài nhất giữ nguyên giá cuối)
+        """
+        prices = self.predict(row, current_price)
+        knots = [0] + self.horizons
+        log_prices = [np.log(current_price)] + [np.log(prices[h]) for h in self.horizons]
+        return list(np.exp(np.interp(np.arange(1, weeks + 1), knots, log_prices)))
+
+
+def load_direct_forecaster(path=DIRECT_FILE):
+    """DirectGoldForecaster, hoặc None nếu chưa train (chạy gold_direct.py)"""
+    if not os.path.exists(path):
+        return None
+    return DirectGoldForecaster(joblib.load(path))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    model_name = args[args.index('--model') + 1] if '--model' in args else DEFAULT_MODEL
+
+    # Feature engineering giống hệt lúc train (import ở đây để worker không phải load PyCaret)
+    import train_gold_model
+
+    raw_df = train_gold_model.load_data()
+    if raw_df.empty:
+        sys.exit(1)
+    df = train_gold_model.create_advanced_features(raw_df)
+    feature_cols = train_gold_model.select_features(df)
+
+    print(f"\n[3/3] Train direct models ({model_name}) cho horizons {HORIZONS} tuần...")
+    artifact = train_direct_models(df, feature_cols, model_name)
+    joblib.dump(artifact, DIRECT_FILE)
+    print(f"   ✓ Đã lưu '{DIRECT_FILE}' (dữ liệu tới {artifact['trained_until']})")
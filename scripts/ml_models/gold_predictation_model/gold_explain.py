@@ -0,0 +1,260 @@
+"""
+Giải thích prediction của model giá vàng: đóng góp của từng feature
+
+Với mỗi dòng: prediction = base_value + tổng contributions.
+- Tree model (DecisionTree / RandomForest / ExtraTrees / GradientBoosting của sklearn):
+  đóng góp chính xác theo đường đi trong cây (mỗi split cộng phần thay đổi giá trị node
+  cho feature của split đó), tính bằng decision_path cho cả batch.
+- LightGBM / XGBoost: TreeSHAP có sẵn của thư viện (pred_contrib).
+- Linear model: coef * (x - trung bình background), chính xác.
+- Model khác: Shapley ước lượng bằng permutation sampling trên background, mọi dòng
+  trung gian của cả batch được predict trong một lần gọi.
+
+Background (mẫu các dòng train từ gold_features) được tạo một lần và giữ trong process.
+
+Usage:
+    python3 gold_explain.py            # giải thích tuần mới nhất (+ news factors) -> latest_explanation.json
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from gold_runtime import load_predictor
+
+EXPLANATION_FILE = 'latest_explanation.json'
+NEWS_FILE = 'gold_price_model.json'
+BACKGROUND_SIZE = 200
+SAMPLING_PERMUTATIONS = 32
+TOP_FEATURES = 10
+
+_EXPLAINERS = {}
+
+
+# ==========================================
+# TREE PATH CONTRIBUTIONS
+# ==========================================
+def _tree_contributions(tree, X, n_features):
+    """
+    (contributions (n, d), bias) của một cây sklearn đã fit (tree = estimator.tree_).
+    Node con nhận value[con] - value[cha] cho feature split ở node cha.
+    """
+    values = tree.value[:, 0, 0]
+    parent = np.full(tree.node_count, -1)
+    for children in (tree.children_left, tree.children_right):
+        nodes = np.flatnonzero(children >= 0)
+        parent[children[nodes]] = nodes
+    child_nodes = np.flatnonzero(parent >= 0)
+
+    from scipy import sparse
+
+    deltas = sparse.csr_matrix(
+        (values[child_nodes] - values[parent[child_nodes]], (child_nodes, tree.feature[parent[child_nodes]])),
+        shape=(tree.node_count, n_features))
+    paths = tree.decision_path(X)
+    return np.asarray((paths @ deltas).todense()), values[0]
+
+
+def tree_contributions(estimator, X):
+    """
+    Đóng góp theo đường đi cho tree model của sklearn.
+
+    Returns:
+        (contributions (n, d), base_values (n,)), hoặc None nếu không phải tree model hỗ trợ
+    """
+    X = np.asarray(X, dtype=np.float32)
+    n, d = X.shape
+    name = type(estimator).__name__
+
+    if hasattr(estimator, 'tree_'):
+        contrib, bias = _tree_contributions(estimator.tree_, X, d)
+        return contrib, np.full(n, bias)
+
+    if name in ('RandomForestRegressor', 'ExtraTreesRegressor'):
+        contrib, bias = np.zeros((n, d)), 0.0
+        for tree in estimator.estimators_:
+            c, b = _tree_contributions(tree.tree_, X, d)
+            contrib += c
+            bias += b
+        k = len(estimator.estimators_)
+        return contrib / k, np.full(n, bias / k)
+
+    if name == 'GradientBoostingRegressor' and getattr(estimator, 'init_', None) != 'zero':
+        contrib, bias = np.zeros((n, d)), 0.0
+        for tree in estimator.estimators_[:, 0]:
+            c, b = _tree_contributions(tree.tree_, X, d)
+            contrib += c
+            bias += b
+        lr = estimator.learning_rate
+        init = np.asarray(estimator.init_.predict(X), dtype=float).ravel()
+        return contrib * lr, init + bias * lr
+
+    return None
+
+
+def native_tree_shap(estimator, X):
+    """TreeSHAP của LightGBM / XGBoost: (contributions, base_values) hoặc None"""
+    name = type(estimator).__name__
+    if name == 'LGBMRegressor':
+        out = estimator.predict(X, pred_contrib=True)
+    elif name == 'XGBRegressor':
+        import xgboost
+        out = estimator.get_booster().predict(xgboost.DMatrix(X), pred_contribs=True)
+    else:
+        return None
+    out = np.asarray(out, dtype=float)
+    return out[:, :-1], out[:, -1]
+
+
+# ==========================================
+# EXPLAINER
+# ==========================================
+class GoldExplainer:
+    """
+    Đóng góp của từng feature cho một batch dòng.
+
+    Args:
+        predictor: GoldModelRuntime (hoặc PyCaretPredictor, khi đó chỉ dùng sampling)
+        background: DataFrame các dòng feature tham chiếu (vd. mẫu dữ liệu train)
+    """
+
+    def __init__(self, predictor, background):
+        self.predictor = predictor
+        self.features = list(predictor.features)
+        self.estimator = predictor.estimator
+        self.background = background[self.features].to_numpy(dtype=float)
+        self._transform = getattr(predictor, 'transform', None)
+
+        # Đóng góp trên feature đã transform chỉ quy về feature gốc khi các bước
+        # preprocessing giữ nguyên từng cột (scale, power transform, ...)
+        self.background_t = None
+        if self._transform is not None:
+            transformed = self._transform(self.background)
+            if transformed.shape[1] == len(self.features):
+                self.background_t = transformed
+
+        if self.background_t is None:
+            self.method = 'sampling'
+        elif native_tree_shap(self.estimator, self.background_t[:1]) is not None:
+            self.method = 'tree_shap'
+        elif tree_contributions(self.estimator, self.background_t[:1]) is not None:
+            self.method = 'tree_path'
+        elif np.ravel(getattr(self.estimator, 'coef_', [])).size == len(self.features):
+            self.method = 'linear'
+        else:
+            self.method = 'sampling'
+
+    def _rows(self, X):
+        if hasattr(X, 'columns'):
+            return X[self.features].to_numpy(dtype=float)
+        if isinstance(X, dict) or (hasattr(X, 'index') and hasattr(X, 'to_numpy')):
+            return np.array([[float(X[f]) for f in self.features]])
+        return np.atleast_2d(np.asarray(X, dtype=float))
+
+    def _linear(self, Xt):
+        coef = np.ravel(self.estimator.coef_)
+        center = self.background_t.mean(axis=0)
+        contrib = (Xt - center) * coef
+        base = float(np.ravel(self.estimator.predict(center[None, :]))[0])
+        return contrib, np.full(len(Xt), base)
+
+    def _sampling(self, X, n_permutations, seed):
+        """
+        Permutation sampling: với mỗi hoán vị và một dòng background, thay dần từng feature
+        bằng giá trị của dòng cần giải thích; đóng góp = chênh lệch prediction ở mỗi bước.
+        """
+        rng = np.random.default_rng(seed)
+        n, d = X.shape
+        perms = np.argsort(rng.random((n, n_permutations, d)), axis=-1)
+        starts = self.background[rng.integers(len(self.background), size=(n, n_permutations))]
+
+        # chain[i, p, k] = dòng background với k feature đầu của hoán vị lấy từ X[i]
+        chain = np.repeat(starts[:, :, None, :], d + 1, axis=2)
+        ranks = np.argsort(perms, axis=-1)                       # vị trí của feature j trong hoán vị
+        take = ranks[:, :, None, :] < np.arange(d + 1)[None, None, :, None]
+        chain = np.where(take, X[:, None, None, :], chain)
+
+        preds = np.asarray(self.predictor.predict(chain.reshape(-1, d)), dtype=float)
+        preds = preds.reshape(n, n_permutations, d + 1)
+        steps = np.diff(preds, axis=-1)                          # đóng góp của feature perms[..., k]
+        contrib = np.zeros((n, n_permutations, d))
+        np.put_along_axis(contrib, perms, steps, axis=-1)
+        return contrib.mean(axis=1), preds[:, :, 0].mean(axis=1)
+
+    def explain(self, X, n_permutations=SAMPLING_PERMUTATIONS, seed=0):
+        """
+        Returns:
+            DataFrame: một dòng cho mỗi dòng của X, cột = features + 'base_value' + 'prediction'
+            (base_value + tổng đóng góp = prediction)
+        """
+        index = X.index if hasattr(X, 'columns') else None
+        X = self._rows(X)
+
+        if self.method == 'sampling':
+            contrib, base = self._sampling(X, n_permutations, seed)
+        else:
+            Xt = self._transform(X)
+            if self.method == 'tree_shap':
+                contrib, base = native_tree_shap(self.estimator, Xt)
+            elif self.method == 'tree_path':
+                contrib, base = tree_contributions(self.estimator, Xt)
+            else:
+                contrib, base = self._linear(Xt)
+
+        result = pd.DataFrame(contrib, columns=self.features, index=index)
+        result['base_value'] = base
+        result['prediction'] = base + contrib.sum(axis=1)
+        return result
+
+
+def background_rows(size=BACKGROUND_SIZE, seed=0):
+    """Mẫu cố định các dòng train từ feature matrix dùng chung (gold_features)"""
+    import gold_features
+
+    rows = gold_features.training_rows(gold_features.build_features())
+    if len(rows) > size:
+        rows = rows.iloc[np.sort(np.random.default_rng(seed).choice(len(rows), size, replace=False))]
+    return rows
+
+
+def load_explainer(model_name='best_model_price'):
+    """GoldExplainer của model (load model + background một lần mỗi process)"""
+    if model_name not in _EXPLAINERS:
+        _EXPLAINERS[model_name] = GoldExplainer(load_predictor(model_name), background_rows())
+    return _EXPLAINERS[model_name]
+
+
+def top_contributions(explanation_row, n=TOP_FEATURES):
+    """[(feature, contribution), ...] lớn nhất theo trị tuyệt đối"""
+    contrib = explanation_row.drop(['base_value', 'prediction'])
+    order = contrib.abs().sort_values(ascending=False).index[:n]
+    return [(feature, float(contrib[feature])) for feature in order]
+
+
+if __name__ == "__main__":
+    import gold_features
+
+    explainer = load_explainer()
+    df = gold_features.build_features()
+    rows = {'latest': df.iloc[-1]}
+    if os.path.exists(NEWS_FILE):
+        with open(NEWS_FILE) as f:
+            rows['news_factors'] = gold_features.apply_period_news_factors(df.iloc[-1], json.load(f))
+
+    explanation = explainer.explain(pd.DataFrame(list(rows.values()), index=list(rows)))
+    output = {'method': explainer.method, 'model': type(explainer.estimator).__name__,
+              'data_date': df.index[-1].strftime('%Y-%m-%d'), 'rows': {}}
+    for name, row in explanation.iterrows():
+        output['rows'][name] = {
+            'prediction': float(row['prediction']),
+            'base_value': float(row['base_value']),
+            'top': [{'feature': f, 'contribution': c} for f, c in top_contributions(row)],
+        }
+        print(f"\n{name}: ${row['prediction']:,.2f} = base ${row['base_value']:,.2f} + đóng góp ({explainer.method})")
+        for feature, value in top_contributions(row):
+            print(f"   {feature:<28} {value:+12,.2f}")
+
+    with open(EXPLANATION_FILE, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"\n✓ Đã lưu '{EXPLANATION_FILE}'")
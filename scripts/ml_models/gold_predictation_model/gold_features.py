@@ -0,0 +1,197 @@
+"""
+Feature pipeline dùng chung cho train / predict / explain model giá vàng
+
+Một định nghĩa feature duy nhất (FEATURE_VERSION), kết quả được cache trong
+gold_macro_store/features_v<N>.pkl cùng hash của từng dòng dữ liệu gốc. Lần chạy sau chỉ
+tính lại từ dòng đầu tiên thay đổi (tuần cuối được update, tuần mới được thêm), với
+LOOKBACK_WEEKS dòng phía trước làm ngữ cảnh cho rolling / lag, thay vì tính ~60 feature
+trên toàn bộ lịch sử mỗi lần.
+
+Ma trận trả về giữ cả tuần mới nhất (target NaN vì chưa có giá tuần sau):
+- train: training_rows(df) bỏ các dòng chưa có target
+- predict / explain: dùng df.iloc[-1]
+"""
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+import gold_data
+
+FEATURE_VERSION = 1           # Tăng khi đổi công thức feature: cache cũ bị bỏ
+CACHE_PATH = os.path.join(gold_data.STORE_DIR, f'features_v{FEATURE_VERSION}.pkl')
+
+# Feature dài nhất nhìn lại 13 dòng (Gold_Std12 = rolling(12) của pct_change)
+LOOKBACK_WEEKS = 16
+
+RAW_COLUMNS = gold_data.COLUMNS
+TARGET_COLUMNS = ['Target_Return', 'Target_LogReturn', 'Target_Direction', 'Target_Price']
+EXCLUDE_COLUMNS = RAW_COLUMNS + TARGET_COLUMNS
+
+
+def compute_features(df_input):
+    """Toàn bộ feature + target trên `df_input` (dữ liệu tuần), chưa bỏ dòng NaN"""
+    df = df_input[RAW_COLUMNS].copy()
+
+    # ===== GEO SCORE (Historical Events) =====
+    df['Geo_Score'] = 1.0
+    df.loc['2022-02':'2022-04', 'Geo_Score'] = 9.0  # Russia-Ukraine
+    df.loc['2023-10':'2023-11', 'Geo_Score'] = 8.0  # Israel-Hamas
+    df.loc['2020-03':'2020-05', 'Geo_Score'] = 6.0  # COVID-19
+
+    # ===== BASIC RETURNS =====
+    df['Gold_Ret'] = df['Gold'].pct_change()
+    df['DXY_Ret'] = df['DXY'].pct_change()
+    df['SP500_Ret'] = df['SP500'].pct_change()
+    df['Oil_Ret'] = df['Oil'].pct_change()
+    df['Silver_Ret'] = df['Silver'].pct_change()
+
+    # ===== LAGGED FEATURES (1-4 weeks ago) =====
+    for lag in [1, 2, 3, 4]:
+        df[f'Gold_Ret_Lag{lag}'] = df['Gold_Ret'].shift(lag)
+        df[f'DXY_Ret_Lag{lag}'] = df['DXY_Ret'].shift(lag)
+        df[f'VIX_Lag{lag}'] = df['VIX'].shift(lag)
+
+    # ===== ROLLING STATISTICS (4, 8, 12 weeks) =====
+    for window in [4, 8, 12]:
+        df[f'Gold_MA{window}'] = df['Gold'].rolling(window).mean()
+        df[f'Gold_Deviation_MA{window}'] = (df['Gold'] - df[f'Gold_MA{window}']) / df[f'Gold_MA{window}']
+        df[f'Gold_Std{window}'] = df['Gold_Ret'].rolling(window).std()
+        df[f'VIX_MA{window}'] = df['VIX'].rolling(window).mean()
+        df[f'Gold_Price_Position{window}'] = df['Gold'] / df[f'Gold_MA{window}'] - 1
+
+    # ===== MOMENTUM INDICATORS =====
+    df['Gold_Momentum_4w'] = df['Gold'].pct_change(4)
+    df['Gold_Momentum_8w'] = df['Gold'].pct_change(8)
+    df['Gold_Momentum_12w'] = df['Gold'].pct_change(12)
+    df['Gold_Acceleration'] = df['Gold_Ret'] - df['Gold_Ret'].shift(1)
+
+    # ===== VOLATILITY INDICATORS =====
+    df['VIX_Change'] = df['VIX'].pct_change()
+    df['VIX_Spike'] = (df['VIX'] > df['VIX'].rolling(12).mean() * 1.5).astype(int)
+
+    # ===== REAL YIELD =====
+    df['Real_Yield_Proxy'] = df['US10Y'] / df['TIPS']
+    df['Real_Yield_Change'] = df['Real_Yield_Proxy'].pct_change()
+    df['Real_Yield_MA4'] = df['Real_Yield_Proxy'].rolling(4).mean()
+
+    # ===== FEAR FACTOR =====
+    df['Fear_Factor'] = df['VIX'] * df['Geo_Score']
+    df['Fear_Factor_Change'] = df['Fear_Factor'].pct_change()
+
+    # ===== CORRELATION FEATURES =====
+    df['Gold_Silver_Ratio'] = df['Gold'] / df['Silver']
+    df['Gold_Silver_Ratio_Change'] = df['Gold_Silver_Ratio'].pct_change()
+    df['Gold_DXY_Divergence'] = df['Gold_Ret'] + df['DXY_Ret']  # Should be negative
+
+    # ===== MARKET REGIME INDICATORS =====
+    df['Risk_On'] = ((df['SP500_Ret'] > 0) & (df['VIX'] < 20)).astype(int)
+    df['Risk_Off'] = ((df['SP500_Ret'] < 0) & (df['VIX'] > 25)).astype(int)
+
+    # ===== TARGETS (NaN ở tuần cuối) =====
+    df['Target_Return'] = df['Gold'].pct_change().shift(-1)
+    df['Target_LogReturn'] = np.log(df['Gold'] / df['Gold'].shift(1)).shift(-1)
+    df['Target_Direction'] = np.sign(df['Target_Return'])
+    df['Target_Price'] = df['Gold'].shift(-1)
+    return df
+
+
+def _valid_rows(df):
+    """Bỏ các dòng đầu chưa đủ lịch sử cho rolling / lag (target được phép NaN)"""
+    features = [c for c in df.columns if c not in TARGET_COLUMNS]
+    return df[df[features].notna().all(axis=1)]
+
+
+def _row_hashes(raw):
+    return pd.util.hash_pandas_object(raw[RAW_COLUMNS], index=True).to_numpy()
+
+
+def _read_cache(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            cache = pickle.load(f)
+        return cache if cache.get('version') == FEATURE_VERSION else None
+    except Exception as e:
+        print(f"   ⚠ Không đọc được feature cache: {e}")
+        return None
+
+
+def _write_cache(path, cache):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def build_features(raw=None, use_cache=True, cache_path=CACHE_PATH):
+    """
+    Feature matrix của dữ liệu tuần `raw` (mặc định: gold_data.load_data()).
+
+    Cache khớp fingerprint (FEATURE_VERSION + hash từng dòng gốc) thì chỉ tính lại phần đuôi
+    từ dòng đầu tiên khác cache.
+
+    Returns:
+        DataFrame gồm cột gốc, feature và target, từ dòng đầu đủ lịch sử tới tuần mới nhất
+    """
+    raw = gold_data.load_data() if raw is None else raw
+    if raw.empty:
+        return pd.DataFrame()
+    hashes = _row_hashes(raw)
+    cache = _read_cache(cache_path) if use_cache else None
+
+    start = 0
+    if cache is not None:
+        cached_hashes = cache['row_hashes']
+        n = min(len(cached_hashes), len(hashes))
+        mismatch = np.flatnonzero(cached_hashes[:n] != hashes[:n])
+        start = int(mismatch[0]) if len(mismatch) else n
+        if start == len(hashes) == len(cached_hashes):
+            return cache['features']
+
+    if start <= LOOKBACK_WEEKS:
+        features = _valid_rows(compute_features(raw))
+        mode = 'full'
+    else:
+        # Target của dòng start-1 phụ thuộc dòng start: tính lại từ start-1
+        tail = _valid_rows(compute_features(raw.iloc[start - 1 - LOOKBACK_WEEKS:]))
+        tail = tail[tail.index >= raw.index[start - 1]]
+        kept = cache['features']
+        features = pd.concat([kept[kept.index < raw.index[start - 1]], tail])
+        mode = f'+{len(raw) - start} tuần'
+
+    if use_cache:
+        _write_cache(cache_path, {'version': FEATURE_VERSION, 'row_hashes': hashes, 'features': features})
+    print(f"   ✓ Features ({mode}): {len(features)} dòng, {len(features.columns)} cột")
+    return features
+
+
+def apply_period_news_factors(row, news_factors):
+    """News factors applied to the first forecast step only (the path itself is not adjusted)"""
+    row = row.copy()
+    if 'geo_score' in news_factors:
+        row['Geo_Score'] = news_factors['geo_score']
+        row['Fear_Factor'] = row['VIX'] * news_factors['geo_score']
+
+    if 'vix' in news_factors:
+        vix_new = news_factors['vix']
+        row['VIX_Change'] = (vix_new - row['VIX']) / row['VIX']
+        row['Fear_Factor'] = vix_new * row['Geo_Score']
+
+    if 'dxy_pct' in news_factors:
+        row['DXY_Ret'] = news_factors['dxy_pct'] / 100
+    return row
+
+
+def training_rows(features):
+    """Các dòng có target (bỏ tuần mới nhất)"""
+    return features.dropna(subset=TARGET_COLUMNS)
+
+
+def feature_columns(features):
+    """Cột feature theo đúng thứ tự của train_gold_model (Geo_Score ở cuối)"""
+    columns = [c for c in features.columns if c not in EXCLUDE_COLUMNS and c != 'Geo_Score']
+    return columns + ['Geo_Score']
@@ -0,0 +1,223 @@
+"""
+Runtime nhẹ cho model giá vàng (không cần PyCaret khi predict)
+
+Khi train, pipeline PyCaret (preprocessing đã fit + estimator) được export ra một
+artifact tối giản: danh sách feature, các transformer sklearn đã fit và estimator.
+Load artifact chỉ cần numpy / scikit-learn (+ thư viện của chính estimator, vd. lightgbm),
+kết quả giống hệt predict_model.
+
+Usage:
+    python3 gold_runtime.py --export [best_model_price]   # export từ file .pkl PyCaret có sẵn
+    python3 gold_runtime.py --bench [best_model_price]    # cold-start: runtime vs PyCaret
+"""
+import os
+import subprocess
+import sys
+import warnings
+
+import joblib
+import numpy as np
+
+FORMAT_VERSION = 1
+RUNTIME_SUFFIX = '_runtime.joblib'
+
+
+def runtime_path(model_name):
+    """'best_model_price' -> 'best_model_price_runtime.joblib'"""
+    if model_name.endswith('.pkl'):
+        model_name = model_name[:-4]
+    return f'{model_name}{RUNTIME_SUFFIX}'
+
+
+# ==========================================
+# EXPORT (chạy trong process đã có PyCaret)
+# ==========================================
+def export_runtime(pipeline, path):
+    """
+    Export pipeline PyCaret (kết quả của load_model / save_model) ra artifact runtime.
+    Các bước chỉ dùng khi train (remove_outliers, ...) được bỏ qua; bước đổi tên cột
+    không đổi giá trị nên cũng bỏ qua.
+
+    Returns:
+        Artifact dict đã lưu
+    """
+    features = list(pipeline.feature_names_in_[:-1])
+    steps = []
+    for name, step in pipeline.steps[:-1]:
+        if type(step).__name__ == 'TransformerWrapperWithInverse':
+            raise ValueError(f"Step '{name}' transforms the target, not supported by the runtime")
+        transformer = getattr(step, 'transformer', step)
+        if getattr(transformer, '_train_only', False) or type(transformer).__name__ == 'CleanColumnNames':
+            continue
+        include = getattr(step, '_include', None)
+        if include is not None and not include:
+            continue
+        if include is not None and list(include) != features:
+            raise ValueError(f"Step '{name}' only transforms {len(include)}/{len(features)} columns, "
+                             f"not supported by the runtime")
+        steps.append((name, transformer))
+
+    artifact = {
+        'format_version': FORMAT_VERSION,
+        'features': features,
+        'steps': steps,
+        'estimator': pipeline.steps[-1][1],
+    }
+    joblib.dump(artifact, path)
+    print(f"   ✓ Đã export runtime model vào '{path}' ({len(steps)} preprocessing steps)")
+    return artifact
+
+
+def verify_runtime(runtime, pipeline, data):
+    """So sánh runtime với predict_model trên `data`; True nếu giống hệt từng bit"""
+    from pycaret.regression import predict_model
+
+    expected = predict_model(pipeline, data=data[runtime.features], verbose=False)['prediction_label'].to_numpy()
+    actual = runtime.predict(data)
+    identical = np.array_equal(expected, actual)
+    max_diff = float(np.max(np.abs(expected - actual))) if len(actual) else 0.0
+    status = "✓ giống hệt" if identical else f"⚠ lệch tối đa {max_diff:.3e}"
+    print(f"   {status} predict_model trên {len(actual)} dòng")
+    return identical
+
+
+def export_verified_runtime(pipeline, model_name, data):
+    """
+    Export runtime cho `model_name` rồi verify_runtime trên `data`. Nếu lệch, artifact bị
+    xoá để load_predictor fallback sang PyCaret.
+
+    Returns:
+        True nếu runtime đã export và giống hệt predict_model
+    """
+    path = runtime_path(model_name)
+    runtime = GoldModelRuntime(export_runtime(pipeline, path))
+    if verify_runtime(runtime, pipeline, data):
+        return True
+    os.remove(path)
+    print(f"   ⚠ Đã xoá '{path}', dự đoán sẽ dùng PyCaret")
+    return False
+
+
+# ==========================================
+# RUNTIME
+# ==========================================
+class GoldModelRuntime:
+    """Preprocessing + estimator đã fit, predict trên ma trận feature theo thứ tự `features`"""
+
+    def __init__(self, artifact):
+        if artifact.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported runtime format {artifact.get('format_version')}")
+        self.features = artifact['features']
+        self.steps = artifact['steps']
+        self.estimator = artifact['estimator']
+
+    def _matrix(self, X):
+        # DataFrame / Series / dict -> cột theo đúng thứ tự của lúc train
+        if hasattr(X, 'columns'):
+            return X[self.features].to_numpy(dtype=float)
+        if isinstance(X, dict) or (hasattr(X, 'index') and hasattr(X, 'to_numpy')):
+            return np.array([[float(X[f]) for f in self.features]])
+        return np.atleast_2d(np.asarray(X, dtype=float))
+
+    def transform(self, X):
+        Xt = self._matrix(X)
+        with warnings.catch_warnings():
+            # Transformer được fit trên DataFrame, ở đây nhận ndarray (cùng thứ tự cột)
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            for _, transformer in self.steps:
+                Xt = transformer.transform(Xt)
+        return Xt
+
+    def predict(self, X):
+        """Giá dự đoán (ndarray), giống predict_model(...)['prediction_label']"""
+        Xt = self.transform(X)
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', message='X does not have valid feature names')
+            return np.nan_to_num(self.estimator.predict(Xt))
+
+
+class PyCaretPredictor:
+    """Fallback khi chưa có artifact runtime: cùng interface, dùng PyCaret"""
+
+    def __init__(self, model_name):
+        from pycaret.regression import load_model
+        self.pipeline = load_model(model_name, verbose=False)
+        self.features = list(self.pipeline.feature_names_in_[:-1])
+        self.estimator = self.pipeline.steps[-1][1]
+
+    def predict(self, X):
+        import pandas as pd
+        from pycaret.regression import predict_model
+
+        if not hasattr(X, 'columns'):
+            X = pd.DataFrame(np.atleast_2d(np.asarray(X, dtype=float)), columns=self.features)
+        return predict_model(self.pipeline, data=X[self.features], verbose=False)['prediction_label'].to_numpy()
+
+
+def load_runtime(path):
+    return GoldModelRuntime(joblib.load(path))
+
+
+def load_predictor(model_name):
+    """
+    Runtime nhẹ nếu đã export, ngược lại fallback sang PyCaret.
+    model_name: tên model PyCaret, vd. 'best_model_price'
+    """
+    path = runtime_path(model_name)
+    if os.path.exists(path):
+        return load_runtime(path)
+    print(f"   ℹ Chưa có '{path}', dùng PyCaret (chạy: python3 gold_runtime.py --export {model_name})")
+    return PyCaretPredictor(model_name)
+
+
+# Mỗi snippet chạy trong process mới: import + load + predict 1 dòng, in "giây peak_rss_kb"
+_COLD_START_SNIPPETS = {
+    'runtime': (
+        "import time, resource; t = time.perf_counter()\n"
+        "import gold_runtime\n"
+        "r = gold_runtime.load_runtime({path!r}); r.predict([[0.0] * len(r.features)])\n"
+        "print(time.perf_counter() - t, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+    ),
+    'pycaret': (
+        "import time, resource; t = time.perf_counter()\n"
+        "import pandas as pd\n"
+        "from pycaret.regression import load_model, predict_model\n"
+        "m = load_model({name!r}, verbose=False); f = list(m.feature_names_in_[:-1])\n"
+        "predict_model(m, data=pd.DataFrame([[0.0] * len(f)], columns=f), verbose=False)\n"
+        "print(time.perf_counter() - t, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+    ),
+}
+
+
+def benchmark_cold_start(model_name):
+    """Latency và peak RSS của một prediction từ process mới, runtime vs PyCaret"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    for label, snippet in _COLD_START_SNIPPETS.items():
+        code = snippet.format(path=runtime_path(model_name), name=model_name)
+        result = subprocess.run([sys.executable, '-c', code], cwd=here, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"   {label:<8} lỗi: {result.stderr.strip().splitlines()[-1:]}")
+            continue
+        seconds, rss = result.stdout.split()[-2:]
+        # ru_maxrss: KB trên Linux, bytes trên macOS
+        rss_mb = float(rss) / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+        print(f"   {label:<8} {float(seconds):6.2f}s  peak RSS {rss_mb:7.1f} MB")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0] not in ('--export', '--bench'):
+        print("Usage: python3 gold_runtime.py --export|--bench [model_name]")
+        sys.exit(2)
+    model_name = args[1] if len(args) > 1 else 'best_model_price'
+
+    if args[0] == '--bench':
+        benchmark_cold_start(model_name)
+        sys.exit(0)
+
+    from pycaret.regression import load_model
+    import train_gold_model
+
+    pipeline = load_model(model_name, verbose=False)
+    df = train_gold_model.create_advanced_features(train_gold_model.load_data())
+    sys.exit(0 if export_verified_runtime(pipeline, model_name, df) else 1)
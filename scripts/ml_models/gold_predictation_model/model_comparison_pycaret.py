@@ -1,8 +1,14 @@
-import pandas as pd
 import numpy as np
 import warnings
 import os
 from pycaret.regression import *
+import gold_data
+import gold_features
+from gold_runtime import export_verified_runtime
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from training_cache import TrainingCache, estimator_name, experiment_pipeline, fingerprint
+import joblib
 import matplotlib.pyplot as plt
 import matplotlib
 matplotlib.use('Agg')
@@ -13,90 +19,26 @@ print("=" * 70)
 print("SO SÁNH MODELS BẰNG PYCARET - GOLD PRICE PREDICTION")
 print("=" * 70)
 
-DATA_FILE = 'gold_macro_data_full.csv'
-
 # ==========================================
 # 1. LOAD DATA
 # ==========================================
 def load_data():
     """Load and prepare data"""
-    if os.path.exists(DATA_FILE):
-        print(f"\n[1/5] Đang đọc dữ liệu từ '{DATA_FILE}'...")
-        df = pd.read_csv(DATA_FILE, index_col=0, parse_dates=True)
-        df_weekly = df.resample('W-FRI').last().ffill()
+    print(f"\n[1/5] Đang đọc kho dữ liệu...")
+    df_weekly = gold_data.load_data()
+    if not df_weekly.empty:
         print(f"   ✓ Đã load {len(df_weekly)} weeks of data")
-        return df_weekly
     else:
         print("❌ Không tìm thấy file dữ liệu.")
-        return pd.DataFrame()
+    return df_weekly
 
 # ==========================================
 # 2. CREATE FEATURES
 # ==========================================
 def create_features(df_input):
-    """Create features for modeling"""
+    """Create features for modeling (shared, cached pipeline in gold_features.py)"""
     print("\n[2/5] Đang tạo features...")
-    df = df_input.copy()
-    
-    # GEO SCORE (Historical Events)
-    df['Geo_Score'] = 1.0
-    df.loc['2022-02':'2022-04', 'Geo_Score'] = 9.0  # Russia-Ukraine
-    df.loc['2023-10':'2023-11', 'Geo_Score'] = 8.0  # Israel-Hamas
-    df.loc['2020-03':'2020-05', 'Geo_Score'] = 6.0  # COVID-19
-    
-    # BASIC RETURNS
-    df['Gold_Ret'] = df['Gold'].pct_change()
-    df['DXY_Ret'] = df['DXY'].pct_change()
-    df['SP500_Ret'] = df['SP500'].pct_change()
-    df['Oil_Ret'] = df['Oil'].pct_change()
-    df['Silver_Ret'] = df['Silver'].pct_change()
-    
-    # LAGGED FEATURES
-    for lag in [1, 2, 3, 4]:
-        df[f'Gold_Ret_Lag{lag}'] = df['Gold_Ret'].shift(lag)
-        df[f'DXY_Ret_Lag{lag}'] = df['DXY_Ret'].shift(lag)
-        df[f'VIX_Lag{lag}'] = df['VIX'].shift(lag)
-    
-    # ROLLING STATISTICS
-    for window in [4, 8, 12]:
-        df[f'Gold_MA{window}'] = df['Gold'].rolling(window).mean()
-        df[f'Gold_Deviation_MA{window}'] = (df['Gold'] - df[f'Gold_MA{window}']) / df[f'Gold_MA{window}']
-        df[f'Gold_Std{window}'] = df['Gold_Ret'].rolling(window).std()
-        df[f'VIX_MA{window}'] = df['VIX'].rolling(window).mean()
-        df[f'Gold_Price_Position{window}'] = df['Gold'] / df[f'Gold_MA{window}'] - 1
-    
-    # MOMENTUM INDICATORS
-    df['Gold_Momentum_4w'] = df['Gold'].pct_change(4)
-    df['Gold_Momentum_8w'] = df['Gold'].pct_change(8)
-    df['Gold_Momentum_12w'] = df['Gold'].pct_change(12)
-    df['Gold_Acceleration'] = df['Gold_Ret'] - df['Gold_Ret'].shift(1)
-    
-    # VOLATILITY INDICATORS
-    df['VIX_Change'] = df['VIX'].pct_change()
-    df['VIX_Spike'] = (df['VIX'] > df['VIX'].rolling(12).mean() * 1.5).astype(int)
-    
-    # REAL YIELD
-    df['Real_Yield_Proxy'] = df['US10Y'] / df['TIPS']
-    df['Real_Yield_Change'] = df['Real_Yield_Proxy'].pct_change()
-    df['Real_Yield_MA4'] = df['Real_Yield_Proxy'].rolling(4).mean()
-    
-    # FEAR FACTOR
-    df['Fear_Factor'] = df['VIX'] * df['Geo_Score']
-    df['Fear_Factor_Change'] = df['Fear_Factor'].pct_change()
-    
-    # CORRELATION FEATURES
-    df['Gold_Silver_Ratio'] = df['Gold'] / df['Silver']
-    df['Gold_Silver_Ratio_Change'] = df['Gold_Silver_Ratio'].pct_change()
-    df['Gold_DXY_Divergence'] = df['Gold_Ret'] + df['DXY_Ret']
-    
-    # MARKET REGIME
-    df['Risk_On'] = ((df['SP500_Ret'] > 0) & (df['VIX'] < 20)).astype(int)
-    df['Risk_Off'] = ((df['SP500_Ret'] < 0) & (df['VIX'] > 25)).astype(int)
-    
-    # TARGET: Direct price prediction
-    df['Target_Price'] = df['Gold'].shift(-1)
-    
-    df.dropna(inplace=True)
+    df = gold_features.training_rows(gold_features.build_features(df_input))
     
     print(f"   ✓ Tạo {len(df.columns)} features")
     print(f"   ✓ Data points: {len(df)}")
@@ -109,19 +51,38 @@ def create_features(df_input):
 def select_features(df):
     """Select features for modeling"""
     # Exclude targets and raw prices
-    exclude_cols = ['Gold', 'Silver', 'DXY', 'US10Y', 'TIPS', 'SP500', 
-                    'VIX', 'Miners', 'Oil', 'Target_Price']
-    
-    feature_cols = [col for col in df.columns if col not in exclude_cols]
+    feature_cols = [col for col in df.columns if col not in gold_features.EXCLUDE_COLUMNS]
     
     return feature_cols
 
 # ==========================================
 # 4. COMPARE MODELS
 # ==========================================
-def compare_all_models(df, feature_cols):
+SETUP_PARAMS = {
+    'train_size': 0.85,
+    'session_id': 42,
+    'fold': 5,
+    'normalize': True,
+    'transformation': False,
+    'remove_outliers': True,
+}
+COMPARE_PARAMS = {'sort': 'RMSE', 'n_select': 5}
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'training_cache')
+
+
+def run_comparison(train_data):
+    """setup + compare_models: (pipeline của model tốt nhất, bảng so sánh, tên top models)"""
+    setup(data=train_data, target='target', verbose=False, n_jobs=-1, **SETUP_PARAMS)
+    print("\n   Đang so sánh models (có thể mất vài phút)...")
+    top_models = compare_models(verbose=False, **COMPARE_PARAMS)
+    comparison_df = pull()
+    return experiment_pipeline(top_models[0]), comparison_df, [type(m).__name__ for m in top_models]
+
+
+def compare_all_models(df, feature_cols, cache=None):
     """Compare multiple models using PyCaret"""
     print("\n[3/5] Đang setup PyCaret và so sánh models...")
+    cache = cache or TrainingCache(CACHE_DIR)
     
     # Prepare data
     df_model = df[feature_cols + ['Target_Price']].copy()
@@ -135,38 +96,21 @@ def compare_all_models(df, feature_cols):
     print(f"   ✓ Train samples: {len(train_data)}")
     print(f"   ✓ Test samples: {len(test_data)}")
     
-    # Setup PyCaret
-    exp = setup(
-        data=train_data,
-        target='target',
-        train_size=0.85,
-        session_id=42,
-        verbose=False,
-        fold=5,
-        normalize=True,
-        transformation=False,
-        remove_outliers=True,
-        n_jobs=-1
-    )
-    
-    # Compare models
-    print("\n   Đang so sánh models (có thể mất vài phút)...")
-    top_models = compare_models(sort='RMSE', n_select=5, verbose=False)
-    
-    # Get comparison results
-    comparison_df = pull()
+    # Setup PyCaret + compare (bỏ qua nếu dữ liệu / feature / tham số không đổi)
+    key = fingerprint(train_data, SETUP_PARAMS, COMPARE_PARAMS)
+    best_model, comparison_df, model_names = cache.get_or_train(
+        'model_comparison', key, lambda: run_comparison(train_data))
     
     print("\n" + "="*70)
     print("TOP 5 MODELS:")
     print("="*70)
-    for i, model in enumerate(top_models[:5], 1):
-        model_name = type(model).__name__
+    for i, model_name in enumerate(model_names[:5], 1):
         mae = comparison_df.loc[comparison_df.index[i-1], 'MAE']
         rmse = comparison_df.loc[comparison_df.index[i-1], 'RMSE']
         r2 = comparison_df.loc[comparison_df.index[i-1], 'R2']
         print(f"{i}. {model_name:25s} - MAE: {mae:.4f}  RMSE: {rmse:.4f}  R²: {r2:.4f}")
     
-    return top_models[0], test_data, comparison_df, df
+    return best_model, test_data, comparison_df, df
 
 # ==========================================
 # 5. EVALUATE BEST MODEL
@@ -188,7 +132,7 @@ def evaluate_best_model(best_model, test_data, df):
     print(f"\n   {'='*60}")
     print(f"   PERFORMANCE METRICS")
     print(f"   {'='*60}")
-    print(f"   Model: {type(best_model).__name__}")
+    print(f"   Model: {estimator_name(best_model)}")
     print(f"   MAE:   ${mae:.2f}")
     print(f"   RMSE:  ${rmse:.2f}")
     print(f"   R²:    {r2:.4f}")
@@ -200,14 +144,18 @@ def evaluate_best_model(best_model, test_data, df):
 # ==========================================
 # 6. SAVE BEST MODEL
 # ==========================================
-def save_best_model(best_model):
+def save_best_model(best_model, test_data):
     """Save best model to file"""
     print("\n[5/5] Đang lưu best model...")
     
+    # best_model là pipeline hoàn chỉnh: ghi đúng định dạng của save_model / load_model
     model_filename = 'gold_price_best_model'
-    save_model(best_model, model_filename)
+    joblib.dump(best_model, f'{model_filename}.pkl')
     print(f"   ✓ Đã lưu model vào '{model_filename}.pkl'")
 
+    # Artifact nhẹ để predict không cần import PyCaret (xem gold_runtime.py), bị xoá nếu lệch predict_model
+    export_verified_runtime(best_model, model_filename, test_data.drop(columns='target'))
+
 # ==========================================
 # 7. MAKE PREDICTION WITH BEST MODEL
 # ==========================================
@@ -221,9 +169,7 @@ def make_prediction(best_model, df):
     latest_row = df.iloc[-1:].copy()
     
     # Prepare features
-    exclude_cols = ['Gold', 'Silver', 'DXY', 'US10Y', 'TIPS', 'SP500', 
-                    'VIX', 'Miners', 'Oil', 'Target_Price']
-    feature_cols = [col for col in latest_row.columns if col not in exclude_cols]
+    feature_cols = [col for col in latest_row.columns if col not in gold_features.EXCLUDE_COLUMNS]
     
     X_pred = latest_row[feature_cols]
     
@@ -260,14 +206,16 @@ if __name__ == "__main__":
         feature_cols = select_features(df)
         print(f"\n   Selected {len(feature_cols)} features for modeling")
         
-        # 4. Compare Models
-        best_model, test_data, comparison_df, df_full = compare_all_models(df, feature_cols)
+        # 4. Compare Models (--retrain: bỏ qua training cache)
+        cache = TrainingCache(CACHE_DIR, force='--retrain' in sys.argv)
+        best_model, test_data, comparison_df, df_full = compare_all_models(df, feature_cols, cache)
+        print(f"   ✓ {cache.summary()}")
         
         # 5. Evaluate Best Model
         predictions = evaluate_best_model(best_model, test_data, df_full)
         
         # 6. Save Best Model
-        save_best_model(best_model)
+        save_best_model(best_model, test_data)
         
         # 7. Make Prediction
         make_prediction(best_model, df_full)
@@ -4,7 +4,11 @@ import yfinance as yf
 import warnings
 import os
 import json
-from pycaret.regression import *
+import gold_data
+import gold_features
+from gold_features import apply_period_news_factors
+from gold_runtime import load_predictor, runtime_path
+from gold_direct import DIRECT_FILE, load_direct_forecaster
 import matplotlib.pyplot as plt
 import matplotlib
 matplotlib.use('Agg')
@@ -15,7 +19,6 @@ print("=" * 70)
 print("GOLD PRICE PREDICTION - NEXT WEEK FORECAST")
 print("=" * 70)
 
-DATA_FILE = 'gold_macro_data_full.csv'
 MODEL_FILE = 'best_model_price'
 NEWS_FILE = 'gold_price_model.json'
 
@@ -23,53 +26,21 @@ NEWS_FILE = 'gold_price_model.json'
 # 1. LOAD DATA AND UPDATE WITH LATEST
 # ==========================================
 def load_and_update_data():
-    """Load existing data and update with latest prices"""
+    """Load existing data and append the latest weeks (gold_data store)"""
     print("\n[1/5] Đang tải dữ liệu và cập nhật giá mới nhất...")
     
-    if not os.path.exists(DATA_FILE):
+    df_weekly = gold_data.load_data()
+    if df_weekly.empty:
         print("   ❌ Không tìm thấy file dữ liệu. Chạy train_gold_model.py trước.")
-        return pd.DataFrame()
-    
-    # Load existing data
-    df = pd.read_csv(DATA_FILE, index_col=0, parse_dates=True)
-    df_weekly = df.resample('W-FRI').last().ffill()
+        return df_weekly
     
     print(f"   ✓ Dữ liệu hiện tại: từ {df_weekly.index[0].date()} đến {df_weekly.index[-1].date()}")
     
-    # Try to fetch latest data (last 2 weeks)
+    # Only the new weeks are downloaded (one batched request) and written
     try:
         print("   ⟳ Đang cập nhật giá mới nhất từ Yahoo Finance...")
-        tickers = {
-            'Gold': 'GC=F',
-            'Silver': 'SI=F',
-            'DXY': 'DX-Y.NYB',
-            'US10Y': '^TNX',
-            'TIPS': 'TIP',
-            'SP500': '^GSPC',
-            'VIX': '^VIX',
-            'Miners': 'GDX',
-            'Oil': 'CL=F'
-        }
-        
-        latest_data = pd.DataFrame()
-        for name, ticker in tickers.items():
-            temp_df = yf.download(ticker, period='1mo', progress=False)
-            if isinstance(temp_df.columns, pd.MultiIndex):
-                latest_data[name] = temp_df['Close'].iloc[:, 0]
-            else:
-                latest_data[name] = temp_df['Close']
-        
-        latest_weekly = latest_data.resample('W-FRI').last().ffill()
-        
-        # Merge with existing data (only add new weeks)
-        df_combined = pd.concat([df_weekly, latest_weekly])
-        df_combined = df_combined[~df_combined.index.duplicated(keep='last')]
-        df_combined = df_combined.sort_index()
-        
-        # Save updated data
-        df_combined.to_csv(DATA_FILE)
+        df_combined = gold_data.update_data(df_weekly)
         print(f"   ✓ Cập nhật thành công! Dữ liệu mới nhất: {df_combined.index[-1].date()}")
-        
         return df_combined
         
     except Exception as e:
@@ -81,69 +52,9 @@ def load_and_update_data():
 # 2. CREATE FEATURES (SAME AS TRAINING)
 # ==========================================
 def create_advanced_features(df_input):
-    """Create same features as training"""
+    """Same features as training (shared, cached pipeline in gold_features.py)"""
     print("\n[2/5] Đang tạo features...")
-    df = df_input.copy()
-    
-    # GEO SCORE (Historical Events)
-    df['Geo_Score'] = 1.0
-    df.loc['2022-02':'2022-04', 'Geo_Score'] = 9.0
-    df.loc['2023-10':'2023-11', 'Geo_Score'] = 8.0
-    df.loc['2020-03':'2020-05', 'Geo_Score'] = 6.0
-    
-    # BASIC RETURNS
-    df['Gold_Ret'] = df['Gold'].pct_change()
-    df['DXY_Ret'] = df['DXY'].pct_change()
-    df['SP500_Ret'] = df['SP500'].pct_change()
-    df['Oil_Ret'] = df['Oil'].pct_change()
-    df['Silver_Ret'] = df['Silver'].pct_change()
-    
-    # LAGGED FEATURES
-    for lag in [1, 2, 3, 4]:
-        df[f'Gold_Ret_Lag{lag}'] = df['Gold_Ret'].shift(lag)
-        df[f'DXY_Ret_Lag{lag}'] = df['DXY_Ret'].shift(lag)
-        df[f'VIX_Lag{lag}'] = df['VIX'].shift(lag)
-    
-    # ROLLING STATISTICS
-    for window in [4, 8, 12]:
-        df[f'Gold_MA{window}'] = df['Gold'].rolling(window).mean()
-        df[f'Gold_Deviation_MA{window}'] = (df['Gold'] - df[f'Gold_MA{window}']) / df[f'Gold_MA{window}']
-        df[f'Gold_Std{window}'] = df['Gold_Ret'].rolling(window).std()
-        df[f'VIX_MA{window}'] = df['VIX'].rolling(window).mean()
-        df[f'Gold_Price_Position{window}'] = df['Gold'] / df[f'Gold_MA{window}'] - 1
-    
-    # MOMENTUM INDICATORS
-    df['Gold_Momentum_4w'] = df['Gold'].pct_change(4)
-    df['Gold_Momentum_8w'] = df['Gold'].pct_change(8)
-    df['Gold_Momentum_12w'] = df['Gold'].pct_change(12)
-    df['Gold_Acceleration'] = df['Gold_Ret'] - df['Gold_Ret'].shift(1)
-    
-    # VOLATILITY INDICATORS
-    df['VIX_Change'] = df['VIX'].pct_change()
-    df['VIX_Spike'] = (df['VIX'] > df['VIX'].rolling(12).mean() * 1.5).astype(int)
-    
-    # REAL YIELD
-    df['Real_Yield_Proxy'] = df['US10Y'] / df['TIPS']
-    df['Real_Yield_Change'] = df['Real_Yield_Proxy'].pct_change()
-    df['Real_Yield_MA4'] = df['Real_Yield_Proxy'].rolling(4).mean()
-    
-    # FEAR FACTOR
-    df['Fear_Factor'] = df['VIX'] * df['Geo_Score']
-    df['Fear_Factor_Change'] = df['Fear_Factor'].pct_change()
-    
-    # CORRELATION FEATURES
-    df['Gold_Silver_Ratio'] = df['Gold'] / df['Silver']
-    df['Gold_Silver_Ratio_Change'] = df['Gold_Silver_Ratio'].pct_change()
-    df['Gold_DXY_Divergence'] = df['Gold_Ret'] + df['DXY_Ret']
-    
-    # MARKET REGIME
-    df['Risk_On'] = ((df['SP500_Ret'] > 0) & (df['VIX'] < 20)).astype(int)
-    df['Risk_Off'] = ((df['SP500_Ret'] < 0) & (df['VIX'] > 25)).astype(int)
-    
-    # TARGET (not used for prediction, but needed for structure)
-    df['Target_Price'] = df['Gold'].shift(-1)
-    
-    df.dropna(inplace=True)
+    df = gold_features.build_features(df_input)
     
     print(f"   ✓ Tạo {len(df.columns)} features")
     return df
@@ -200,18 +111,22 @@ def load_news_factors():
 # ==========================================
 # 5. MAKE PREDICTION
 # ==========================================
+def model_available():
+    """Model runtime (export từ train_gold_model.py) hoặc file PyCaret .pkl"""
+    return os.path.exists(runtime_path(MODEL_FILE)) or os.path.exists(f'{MODEL_FILE}.pkl')
+
 def predict_next_week(df, news_factors=None, manual_current_price=None):
     """Make prediction for next week"""
     print("\n[4/5] Đang predict giá tuần tới...")
     
-    if not os.path.exists(f'{MODEL_FILE}.pkl'):
+    if not model_available():
         print(f"   ❌ Không tìm thấy model file '{MODEL_FILE}.pkl'")
         print("   → Chạy train_gold_model.py trước để train model")
         return None
     
-    # Load model
-    model = load_model(MODEL_FILE)
-    print(f"   ✓ Đã load model: {type(model).__name__}")
+    # Load model (runtime nhẹ, không import PyCaret)
+    model = load_predictor(MODEL_FILE)
+    print(f"   ✓ Đã load model: {type(model.estimator).__name__}")
     
     # Get latest row for prediction
     latest_row = df.iloc[-1:].copy()
@@ -245,17 +160,14 @@ def predict_next_week(df, news_factors=None, manual_current_price=None):
             latest_row['DXY_Ret_Lag1'] = df.iloc[-1]['DXY_Ret']
             print(f"      ✓ DXY projected change: {news_factors['dxy_pct']:.2f}%")
     
-    # Select features (exclude raw prices and target)
-    exclude_cols = ['Gold', 'Silver', 'DXY', 'US10Y', 'TIPS', 'SP500', 
-                    'VIX', 'Miners', 'Oil', 'Target_Price']
-    feature_cols = [col for col in latest_row.columns if col not in exclude_cols]
+    # Select features (exclude raw prices and targets)
+    feature_cols = [col for col in latest_row.columns if col not in EXCLUDE_COLS]
     
     # Prepare input
     X_pred = latest_row[feature_cols]
     
     # Make prediction
-    prediction = predict_model(model, data=X_pred, verbose=False)
-    predicted_price = prediction['prediction_label'].values[0]
+    predicted_price = model.predict(X_pred)[0]
     
     # Current price - use manual override if provided
     if manual_current_price:
@@ -292,56 +204,385 @@ def predict_next_week(df, news_factors=None, manual_current_price=None):
 # ==========================================
 # 5B. PREDICT UNTIL END OF PERIOD (MONTH/QUARTER/YEAR)
 # ==========================================
-def predict_until_end_of_period(df, news_factors=None, manual_current_price=None, period='year'):
+PERIOD_NAMES = {
+    'month': 'tháng',
+    'quarter': 'quý',
+    'year': 'năm'
+}
+
+# Raw price columns and targets are not model features
+EXCLUDE_COLS = gold_features.EXCLUDE_COLUMNS
+
+MA_WINDOWS = [4, 8, 12]
+MOMENTUM_WEEKS = 4
+
+
+def period_end_date(last_date, period):
+    """Last day of the month / quarter / year containing last_date"""
+    if period == 'month':
+        return last_date + pd.offsets.MonthEnd(0)
+    if period == 'quarter':
+        return last_date + pd.offsets.QuarterEnd(0)
+    return pd.Timestamp(f'{last_date.year}-12-31')
+
+
+def weeks_until(last_date, end_date):
+    return max(1, ((end_date - last_date).days // 7) + 1)
+
+
+class RecursiveGoldForecaster:
+    """
+    Week-by-week recursive forecast.
+    Each predicted price is fed back as the next week's Gold; the Gold-derived features
+    (return, MA4/8/12, price position, 4-week momentum) are updated from a fixed-size
+    buffer of the last prices, so a step costs O(1) instead of re-rolling the whole history.
+    Every other feature keeps its last observed value.
+    """
+
+    def __init__(self, model, df):
+        self.model = model
+        self.columns = [col for col in df.columns if col not in EXCLUDE_COLS]
+        self.last_row = df.iloc[-1]
+        self.features = self.last_row[self.columns].to_numpy(dtype=float, copy=True)
+        self.position = {col: i for i, col in enumerate(self.columns)}
+        # Last max(MA_WINDOWS) Gold prices, oldest first
+        self.prices = df['Gold'].to_numpy(dtype=float)[-max(MA_WINDOWS + [MOMENTUM_WEEKS + 1]):].copy()
+
+    def _predict(self, features):
+        X_pred = pd.DataFrame([features], columns=self.columns)
+        return float(self.model.predict(X_pred)[0])
+
+    def _push(self, price, values=None, prices=None):
+        """
+        Append `price` to the buffer and update the Gold features in place.
+        Also works on a batch: values (n, features), prices (n, buffer), price (n,)
+        """
+        values = self.features if values is None else values
+        prices = self.prices if prices is None else prices
+        prev_price = prices[..., -1].copy()
+        prices[..., :-1] = prices[..., 1:]
+        prices[..., -1] = price
+
+        pos = self.position
+        values[..., pos['Gold_Ret']] = (price - prev_price) / prev_price
+        for window in MA_WINDOWS:
+            ma = prices[..., -window:].mean(axis=-1)
+            values[..., pos[f'Gold_MA{window}']] = ma
+            values[..., pos[f'Gold_Price_Position{window}']] = price / ma - 1
+        values[..., pos['Gold_Momentum_4w']] = price / prices[..., -1 - MOMENTUM_WEEKS] - 1
+
+    def forecast(self, weeks, news_factors=None):
+        """Predicted Gold price for each of the next `weeks` weeks"""
+        path = []
+        for week in range(weeks):
+            if week == 0 and news_factors:
+                row = apply_period_news_factors(self.last_row, news_factors)
+                features = row[self.columns].to_numpy(dtype=float)
+            else:
+                features = self.features
+            price = self._predict(features)
+            path.append(price)
+            self._push(price)
+        return path
+
+    def forecast_batch(self, first_step, weeks):
+        """
+        Forecast many scenarios at once: one batched predict per week instead of one per
+        scenario and week.
+
+        Args:
+            first_step: (n_scenarios, n_features) feature matrix of week 1 (columns = self.columns)
+            weeks: Number of weeks
+
+        Returns:
+            (n_scenarios, weeks) array of predicted prices
+        """
+        n = len(first_step)
+        values = np.tile(self.features, (n, 1))
+        prices = np.tile(self.prices, (n, 1))
+        paths = np.empty((n, weeks))
+        X = np.asarray(first_step, dtype=float)
+        for week in range(weeks):
+            paths[:, week] = self.model.predict(pd.DataFrame(X, columns=self.columns))
+            self._push(paths[:, week], values, prices)
+            X = values
+        return paths
+
+
+def forecast_weekly_path(df, news_factors=None, weeks=52, model=None):
+    """Recursive weekly forecast path (list of prices), or None if there is no model"""
+    if model is None:
+        if not model_available():
+            print(f"   ❌ Không tìm thấy model file '{MODEL_FILE}.pkl'")
+            return None
+        model = load_predictor(MODEL_FILE)
+        print(f"   ✓ Đã load model: {type(model.estimator).__name__}")
+    return RecursiveGoldForecaster(model, df).forecast(weeks, news_factors)
+
+
+def forecast_direct_path(df, news_factors=None, weeks=52):
+    """
+    Weekly path from the direct multi-horizon models (gold_direct.py): every horizon is
+    predicted from the latest row at once and the weeks in between are interpolated.
+    None if the direct models are not trained.
+    """
+    forecaster = load_direct_forecaster()
+    if forecaster is None:
+        print(f"   ⚠ Không tìm thấy '{DIRECT_FILE}' (chạy gold_direct.py), dùng forecast recursive")
+        return None
+    print(f"   ✓ Direct models ({forecaster.model_name}): horizons {forecaster.horizons} tuần")
+    row = df.iloc[-1]
+    if news_factors:
+        row = apply_period_news_factors(row, news_factors)
+    return forecaster.weekly_path(row, df['Gold'].iloc[-1], weeks)
+
+
+def _forecast_weekly_path_reference(model, df, news_factors, weeks):
+    """Previous DataFrame-growing loop, kept only for benchmark_forecast"""
+    path = []
+    df_extended = df.copy()
+    last_date = df.index[-1]
+    for week in range(weeks):
+        latest_row = df_extended.iloc[-1:].copy()
+        if week == 0 and news_factors:
+            latest_row = apply_period_news_factors(latest_row.iloc[0], news_factors).to_frame().T
+        feature_cols = [col for col in latest_row.columns if col not in EXCLUDE_COLS]
+        predicted_price = model.predict(latest_row[feature_cols].astype(float))[0]
+        path.append(float(predicted_price))
+
+        new_row = df_extended.iloc[-1:].copy()
+        new_row.index = [last_date + pd.Timedelta(weeks=week + 1)]
+        new_row['Gold'] = predicted_price
+        prev_price = df_extended['Gold'].iloc[-1]
+        new_row['Gold_Ret'] = (predicted_price - prev_price) / prev_price
+        temp_df = pd.concat([df_extended, new_row])
+        for window in MA_WINDOWS:
+            new_row[f'Gold_MA{window}'] = temp_df['Gold'].rolling(window).mean().iloc[-1]
+            new_row[f'Gold_Price_Position{window}'] = (predicted_price / new_row[f'Gold_MA{window}'].values[0]) - 1
+        new_row['Gold_Momentum_4w'] = temp_df['Gold'].pct_change(4).iloc[-1] if len(temp_df) >= 4 else 0
+        df_extended = pd.concat([df_extended, new_row])
+    return path
+
+
+def benchmark_forecast(df, news_factors=None, weeks=52):
+    """Time the incremental forecaster against the previous loop on the same model"""
+    import time
+
+    model = load_predictor(MODEL_FILE)
+    started = time.perf_counter()
+    reference = _forecast_weekly_path_reference(model, df, news_factors, weeks)
+    reference_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    path = forecast_weekly_path(df, news_factors, weeks, model=model)
+    incremental_seconds = time.perf_counter() - started
+
+    max_diff = max(abs(a - b) for a, b in zip(reference, path))
+    print(f"\n   ⏱ {weeks} weeks - previous loop: {reference_seconds:.2f}s, "
+          f"incremental: {incremental_seconds:.2f}s ({reference_seconds / incremental_seconds:.1f}x), "
+          f"max price diff: ${max_diff:.6f}")
+    return reference_seconds, incremental_seconds, max_diff
+
+
+# ==========================================
+# 5C. SCENARIO ENGINE (GRID / MONTE CARLO)
+# ==========================================
+SCENARIO_FILE = 'scenario_prediction.json'
+SCENARIO_FACTORS = ['geo_score', 'vix', 'dxy_pct']
+SCENARIO_PERCENTILES = [5, 25, 50, 75, 95]
+DEFAULT_SCENARIOS = 2000
+
+# Default grid: geopolitical score 1-9, VIX from calm to panic, weekly DXY move -2%..+2%
+DEFAULT_GRID = {
+    'geo_score': [1.0, 3.0, 5.0, 7.0, 9.0],
+    'vix': [12.0, 15.0, 20.0, 25.0, 30.0, 40.0],
+    'dxy_pct': [-2.0, -1.0, -0.5, 0.0, 0.5, 1.0, 2.0],
+}
+GEO_SCORE_RANGE = (1.0, 10.0)
+GEO_SCORE_SD = 1.5   # Geo_Score is set by hand, not observed: sampled around the base value
+
+
+def scenario_grid(grid=None):
+    """Cartesian product of the factor levels, one scenario per row"""
+    import itertools
+
+    grid = grid or DEFAULT_GRID
+    names = [f for f in SCENARIO_FACTORS if f in grid]
+    return pd.DataFrame(list(itertools.product(*(grid[f] for f in names))), columns=names)
+
+
+def sample_scenarios(df, n=DEFAULT_SCENARIOS, news_factors=None, seed=None):
+    """
+    Monte Carlo scenarios around the news factors (or the latest values when a factor
+    is not given). VIX and DXY spreads are the historical weekly moves in `df`.
+    """
+    rng = np.random.default_rng(seed)
+    news_factors = news_factors or {}
+    last = df.iloc[-1]
+
+    geo = news_factors.get('geo_score', last['Geo_Score'])
+    vix = news_factors.get('vix', last['VIX'])
+    dxy = news_factors.get('dxy_pct', 0.0)
+    vix_sigma = np.log(df['VIX']).diff().std()
+    dxy_sigma = df['DXY_Ret'].std() * 100
+
+    return pd.DataFrame({
+        'geo_score': np.clip(rng.normal(geo, GEO_SCORE_SD, n), *GEO_SCORE_RANGE),
+        'vix': vix * np.exp(rng.normal(0.0, vix_sigma, n)),
+        'dxy_pct': rng.normal(dxy, dxy_sigma, n),
+    })
+
+
+def next_week_scenario_matrix(df, scenarios, columns):
+    """
+    Feature rows of predict_next_week with each scenario's news factors applied
+    (same rules, vectorized over the scenarios)
+    """
+    last, prev = df.iloc[-1], df.iloc[-2]
+    X = pd.DataFrame(np.tile(last[columns].to_numpy(dtype=float), (len(scenarios), 1)), columns=columns)
+    geo = np.full(len(scenarios), last['Geo_Score'], dtype=float)
+
+    if 'geo_score' in scenarios:
+        geo = scenarios['geo_score'].to_numpy(dtype=float)
+        X['Geo_Score'] = geo
+        X['Fear_Factor'] = last['VIX'] * geo
+        X['Fear_Factor_Change'] = (X['Fear_Factor'] - prev['Fear_Factor']) / prev['Fear_Factor']
+
+    if 'vix' in scenarios:
+        vix = scenarios['vix'].to_numpy(dtype=float)
+        X['VIX_Change'] = (vix - last['VIX']) / last['VIX']
+        X['VIX_Lag1'] = last['VIX']
+        X['Fear_Factor'] = vix * geo
+
+    if 'dxy_pct' in scenarios:
+        X['DXY_Ret'] = scenarios['dxy_pct'].to_numpy(dtype=float) / 100
+        X['DXY_Ret_Lag1'] = last['DXY_Ret']
+    return X
+
+
+def period_scenario_matrix(df, scenarios, columns):
+    """First forecast step of each scenario (rules of apply_period_news_factors)"""
+    last = df.iloc[-1]
+    X = pd.DataFrame(np.tile(last[columns].to_numpy(dtype=float), (len(scenarios), 1)), columns=columns)
+    geo = np.full(len(scenarios), last['Geo_Score'], dtype=float)
+
+    if 'geo_score' in scenarios:
+        geo = scenarios['geo_score'].to_numpy(dtype=float)
+        X['Geo_Score'] = geo
+        X['Fear_Factor'] = last['VIX'] * geo
+
+    if 'vix' in scenarios:
+        vix = scenarios['vix'].to_numpy(dtype=float)
+        X['VIX_Change'] = (vix - last['VIX']) / last['VIX']
+        X['Fear_Factor'] = vix * geo
+
+    if 'dxy_pct' in scenarios:
+        X['DXY_Ret'] = scenarios['dxy_pct'].to_numpy(dtype=float) / 100
+    return X
+
+
+def run_scenarios(df, scenarios, periods=('month', 'quarter', 'year'), model=None):
+    """
+    Score every scenario in one batched predict for the next week, and one batched
+    predict per forecast week for the period-end prices.
+
+    Returns:
+        `scenarios` with a 'next_week' column and an '<period>_end' column per period,
+        or None if there is no model
+    """
+    if model is None:
+        if not model_available():
+            print(f"   ❌ Không tìm thấy model file '{MODEL_FILE}.pkl'")
+            return None
+        model = load_predictor(MODEL_FILE)
+
+    forecaster = RecursiveGoldForecaster(model, df)
+    columns = forecaster.columns
+    results = scenarios.reset_index(drop=True).copy()
+    results['next_week'] = model.predict(next_week_scenario_matrix(df, results, columns))
+
+    if periods:
+        last_date = df.index[-1]
+        weeks = {p: weeks_until(last_date, period_end_date(last_date, p)) for p in periods}
+        paths = forecaster.forecast_batch(period_scenario_matrix(df, results, columns).to_numpy(), max(weeks.values()))
+        for period, n_weeks in weeks.items():
+            results[f'{period}_end'] = paths[:, n_weeks - 1]
+    return results
+
+
+def summarize_scenarios(results, current_price):
+    """Percentiles and probability of a gain for each predicted horizon"""
+    summary = {}
+    horizons = [c for c in results.columns if c == 'next_week' or c.endswith('_end')]
+    print(f"\n   {'='*60}")
+    print(f"   🎲 SCENARIO DISTRIBUTION ({len(results)} scenarios)")
+    print(f"   {'='*60}")
+    print(f"   {'Horizon':<12}" + "".join(f"{f'P{p}':>10}" for p in SCENARIO_PERCENTILES) + f"{'P(up)':>8}")
+    for horizon in horizons:
+        prices = results[horizon].to_numpy()
+        percentiles = np.percentile(prices, SCENARIO_PERCENTILES)
+        prob_up = float((prices > current_price).mean())
+        summary[horizon] = {
+            'mean': float(prices.mean()),
+            'std': float(prices.std()),
+            'percentiles': {f'p{p}': float(v) for p, v in zip(SCENARIO_PERCENTILES, percentiles)},
+            'prob_up': prob_up,
+        }
+        print(f"   {horizon:<12}" + "".join(f"{v:>10,.0f}" for v in percentiles) + f"{prob_up:>8.0%}")
+    print(f"   {'='*60}")
+    return summary
+
+
+def predict_scenarios(df, news_factors=None, manual_current_price=None, n=DEFAULT_SCENARIOS,
+                      grid=None, seed=None):
+    """
+    Distribution of next-week and period-end prices over a scenario grid (grid=True or a
+    {factor: levels} dict) or n Monte Carlo samples around the news factors
+    """
+    print("\n[4/5] Đang chạy scenario engine...")
+    if grid:
+        scenarios = scenario_grid(grid if isinstance(grid, dict) else None)
+        print(f"   ✓ Grid: {len(scenarios)} scenarios")
+    else:
+        scenarios = sample_scenarios(df, n, news_factors, seed)
+        print(f"   ✓ Monte Carlo: {len(scenarios)} scenarios")
+
+    results = run_scenarios(df, scenarios)
+    if results is None:
+        return None
+
+    current_price = manual_current_price or df['Gold'].iloc[-1]
+    return {
+        'current_price': float(current_price),
+        'data_date': df.index[-1].strftime('%Y-%m-%d'),
+        'method': 'grid' if grid else 'monte_carlo',
+        'scenarios': len(results),
+        'horizons': summarize_scenarios(results, current_price),
+    }
+
+
+def predict_until_end_of_period(df, news_factors=None, manual_current_price=None, period='year', path=None):
     """Make predictions from now until end of specified period
     
     Args:
         period: 'month', 'quarter', or 'year'
+        path: Weekly forecast path from forecast_weekly_path, at least as long as the period
+              (e.g. the year path, shared by the month and quarter forecasts); computed if None
     """
-    period_names = {
-        'month': 'tháng',
-        'quarter': 'quý',
-        'year': 'năm'
-    }
-    
-    print(f"\n[4/5] Đang predict giá đến hết {period_names[period]}...")
-    
-    if not os.path.exists(f'{MODEL_FILE}.pkl'):
-        print(f"   ❌ Không tìm thấy model file '{MODEL_FILE}.pkl'")
-        return None
-    
-    # Load model
-    model = load_model(MODEL_FILE)
-    print(f"   ✓ Đã load model: {type(model).__name__}")
+    print(f"\n[4/5] Đang predict giá đến hết {PERIOD_NAMES[period]}...")
     
     # Get current date and determine end date
     last_date = df.index[-1]
-    
-    if period == 'month':
-        # End of current month
-        if last_date.month == 12:
-            end_date = pd.Timestamp(f'{last_date.year + 1}-01-01') - pd.Timedelta(days=1)
-        else:
-            end_date = pd.Timestamp(f'{last_date.year}-{last_date.month + 1:02d}-01') - pd.Timedelta(days=1)
-    elif period == 'quarter':
-        # End of current quarter
-        current_quarter = (last_date.month - 1) // 3 + 1
-        quarter_end_months = {1: 3, 2: 6, 3: 9, 4: 12}
-        end_month = quarter_end_months[current_quarter]
-        if end_month == 12:
-            end_date = pd.Timestamp(f'{last_date.year}-12-31')
-        else:
-            end_date = pd.Timestamp(f'{last_date.year}-{end_month + 1:02d}-01') - pd.Timedelta(days=1)
-    else:  # year
-        end_date = pd.Timestamp(f'{last_date.year}-12-31')
+    end_date = period_end_date(last_date, period)
     
     # Calculate number of weeks until end date
-    weeks_remaining = max(1, ((end_date - last_date).days // 7) + 1)
+    weeks_remaining = weeks_until(last_date, end_date)
     print(f"   ✓ Predicting {weeks_remaining} weeks until {end_date.date()}")
-    
-    # Prepare prediction results
-    predictions = []
-    df_extended = df.copy()
+
+    if path is None or len(path) < weeks_remaining:
+        path = forecast_weekly_path(df, news_factors, weeks_remaining)
+        if path is None:
+            return None
     
     # Current price
     if manual_current_price:
@@ -352,35 +593,10 @@ def predict_until_end_of_period(df, news_factors=None, manual_current_price=None
     print(f"   ✓ Starting price: ${current_price:,.2f}")
     print(f"\n   Predicting week by week...")
     
-    for week in range(weeks_remaining):
-        # Get latest row for prediction
-        latest_row = df_extended.iloc[-1:].copy()
-        
-        # Apply news factors only to first prediction
-        if week == 0 and news_factors:
-            if 'geo_score' in news_factors:
-                latest_row['Geo_Score'] = news_factors['geo_score']
-                latest_row['Fear_Factor'] = latest_row['VIX'] * news_factors['geo_score']
-            
-            if 'vix' in news_factors:
-                vix_new = news_factors['vix']
-                vix_change = (vix_new - latest_row['VIX'].values[0]) / latest_row['VIX'].values[0]
-                latest_row['VIX_Change'] = vix_change
-                latest_row['Fear_Factor'] = vix_new * latest_row['Geo_Score'].values[0]
-            
-            if 'dxy_pct' in news_factors:
-                latest_row['DXY_Ret'] = news_factors['dxy_pct'] / 100
-        
-        # Select features
-        exclude_cols = ['Gold', 'Silver', 'DXY', 'US10Y', 'TIPS', 'SP500', 
-                        'VIX', 'Miners', 'Oil', 'Target_Price']
-        feature_cols = [col for col in latest_row.columns if col not in exclude_cols]
-        
-        # Make prediction
-        X_pred = latest_row[feature_cols]
-        prediction = predict_model(model, data=X_pred, verbose=False)
-        predicted_price = prediction['prediction_label'].values[0]
-        
+    # Progress is printed every N weeks
+    print_every = {'month': 2, 'quarter': 3, 'year': 5}[period]
+    predictions = []
+    for week, predicted_price in enumerate(path[:weeks_remaining]):
         # Calculate change
         base_price = current_price if week == 0 else predictions[-1]['price']
         price_change = predicted_price - base_price
@@ -396,37 +612,8 @@ def predict_until_end_of_period(df, news_factors=None, manual_current_price=None
             'change_pct': float(price_change_pct)
         })
         
-        # Print progress
-        if period == 'month':
-            if (week + 1) % 2 == 0 or week == 0 or week == weeks_remaining - 1:
-                print(f"      Week {week+1}: ${predicted_price:,.2f} ({price_change_pct:+.2f}%)")
-        elif period == 'quarter':
-            if (week + 1) % 3 == 0 or week == 0 or week == weeks_remaining - 1:
-                print(f"      Week {week+1}: ${predicted_price:,.2f} ({price_change_pct:+.2f}%)")
-        else:  # year
-            if (week + 1) % 5 == 0 or week == 0 or week == weeks_remaining - 1:
-                print(f"      Week {week+1}: ${predicted_price:,.2f} ({price_change_pct:+.2f}%)")
-        
-        # Update df_extended with predicted values for next iteration
-        new_row = df_extended.iloc[-1:].copy()
-        new_row.index = [pred_date]
-        new_row['Gold'] = predicted_price
-        
-        # Update features based on prediction
-        if len(df_extended) > 0:
-            prev_price = df_extended['Gold'].iloc[-1]
-            new_row['Gold_Ret'] = (predicted_price - prev_price) / prev_price
-            
-            # Update moving averages and other features
-            temp_df = pd.concat([df_extended, new_row])
-            
-            for window in [4, 8, 12]:
-                new_row[f'Gold_MA{window}'] = temp_df['Gold'].rolling(window).mean().iloc[-1]
-                new_row[f'Gold_Price_Position{window}'] = (predicted_price / new_row[f'Gold_MA{window}'].values[0]) - 1
-            
-            new_row['Gold_Momentum_4w'] = temp_df['Gold'].pct_change(4).iloc[-1] if len(temp_df) >= 4 else 0
-            
-        df_extended = pd.concat([df_extended, new_row])
+        if (week + 1) % print_every == 0 or week == 0 or week == weeks_remaining - 1:
+            print(f"      Week {week+1}: ${predicted_price:,.2f} ({price_change_pct:+.2f}%)")
     
     # Summary
     final_price = predictions[-1]['price']
@@ -437,19 +624,19 @@ def predict_until_end_of_period(df, news_factors=None, manual_current_price=None
     print(f"   📊 {period.upper()}-END FORECAST SUMMARY")
     print(f"   {'='*60}")
     print(f"   Current Price:              ${current_price:,.2f}")
-    print(f"   Predicted End of {period_names[period].title()}: ${final_price:,.2f}")
+    print(f"   Predicted End of {PERIOD_NAMES[period].title()}: ${final_price:,.2f}")
     print(f"   Total Change:               ${total_change:+,.2f} ({total_change_pct:+.2f}%)")
     print(f"   Weeks forecasted:           {weeks_remaining}")
     print(f"   {'='*60}")
     
     if total_change > 0:
-        print(f"   📈 {period_names[period].title()}-end Outlook: BULLISH")
+        print(f"   📈 {PERIOD_NAMES[period].title()}-end Outlook: BULLISH")
     else:
-        print(f"   📉 {period_names[period].title()}-end Outlook: BEARISH")
+        print(f"   📉 {PERIOD_NAMES[period].title()}-end Outlook: BEARISH")
     
     return {
         'period': period,
-        'period_name': period_names[period],
+        'period_name': PERIOD_NAMES[period],
         'current_price': float(current_price),
         'current_date': last_date.strftime('%Y-%m-%d'),
         'end_date': end_date.strftime('%Y-%m-%d'),
@@ -694,9 +881,14 @@ if __name__ == "__main__":
     run_month = '--month' in sys.argv or '-m' in sys.argv
     run_quarter = '--quarter' in sys.argv or '-q' in sys.argv
     run_year = '--year' in sys.argv or '-y' in sys.argv
+    run_benchmark = '--benchmark' in sys.argv
+    run_direct = '--direct' in sys.argv
+    run_grid = '--grid' in sys.argv
+    scenario_args = [arg for arg in sys.argv[1:] if arg.startswith('--scenarios')]
+    run_scenario_engine = run_grid or bool(scenario_args)
     
     # If no specific flags, run all predictions
-    if not any([run_week, run_month, run_quarter, run_year]):
+    if not any([run_week, run_month, run_quarter, run_year, run_scenario_engine]):
         run_week = run_month = run_quarter = run_year = True
     
     # 1. Load and update data
@@ -711,7 +903,7 @@ if __name__ == "__main__":
         
         # Allow manual override via command line argument
         for arg in sys.argv[1:]:
-            if arg not in ['--week', '-w', '--month', '-m', '--quarter', '-q', '--year', '-y']:
+            if arg not in ['--week', '-w', '--month', '-m', '--quarter', '-q', '--year', '-y', '--benchmark', '--grid', '--direct'] + scenario_args:
                 try:
                     current_gold_price = float(arg)
                     print(f"\n💡 Manual price override: ${current_gold_price:,.2f}")
@@ -729,6 +921,28 @@ if __name__ == "__main__":
         prediction_count = sum([run_week, run_month, run_quarter, run_year])
         current_step = 0
         
+        # The path is computed once for the longest requested period;
+        # month and quarter results are slices of it
+        periods = [p for p, run in (('month', run_month), ('quarter', run_quarter), ('year', run_year)) if run]
+        forecast_path = None
+        if periods:
+            longest = max(weeks_until(df.index[-1], period_end_date(df.index[-1], p)) for p in periods)
+            if run_direct:
+                forecast_path = forecast_direct_path(df, news_factors, longest)
+            if forecast_path is None:
+                forecast_path = forecast_weekly_path(df, news_factors, longest)
+        if run_benchmark:
+            benchmark_forecast(df, news_factors)
+        if run_scenario_engine:
+            n_scenarios = DEFAULT_SCENARIOS
+            if scenario_args and '=' in scenario_args[0]:
+                n_scenarios = int(scenario_args[0].split('=', 1)[1])
+            scenario_result = predict_scenarios(df, news_factors, current_gold_price, n=n_scenarios, grid=run_grid)
+            if scenario_result:
+                with open(SCENARIO_FILE, 'w') as f:
+                    json.dump(scenario_result, f, indent=2)
+                print(f"   ✅ Đã lưu scenario distribution vào '{SCENARIO_FILE}'")
+        
         # 5a. NEXT WEEK
         if run_week:
             current_step += 1
@@ -749,7 +963,7 @@ if __name__ == "__main__":
             print("\n" + "="*70)
             print(f"📅 [{current_step}/{prediction_count}] PREDICTING MONTH-END")
             print("="*70)
-            month_result = predict_until_end_of_period(df, news_factors, current_gold_price, period='month')
+            month_result = predict_until_end_of_period(df, news_factors, current_gold_price, period='month', path=forecast_path)
             if month_result:
                 visualize_prediction(df, None, news_factors, period_forecast=month_result)
                 with open('month_end_prediction.json', 'w') as f:
@@ -763,7 +977,7 @@ if __name__ == "__main__":
             print("\n" + "="*70)
             print(f"📅 [{current_step}/{prediction_count}] PREDICTING QUARTER-END")
             print("="*70)
-            quarter_result = predict_until_end_of_period(df, news_factors, current_gold_price, period='quarter')
+            quarter_result = predict_until_end_of_period(df, news_factors, current_gold_price, period='quarter', path=forecast_path)
             if quarter_result:
                 visualize_prediction(df, None, news_factors, period_forecast=quarter_result)
                 with open('quarter_end_prediction.json', 'w') as f:
@@ -777,7 +991,7 @@ if __name__ == "__main__":
             print("\n" + "="*70)
             print(f"📅 [{current_step}/{prediction_count}] PREDICTING YEAR-END")
             print("="*70)
-            year_result = predict_until_end_of_period(df, news_factors, current_gold_price, period='year')
+            year_result = predict_until_end_of_period(df, news_factors, current_gold_price, period='year', path=forecast_path)
             if year_result:
                 visualize_prediction(df, None, news_factors, period_forecast=year_result)
                 with open('year_end_prediction.json', 'w') as f:
@@ -818,7 +1032,7 @@ if __name__ == "__main__":
             print("="*70)
             print("✅ HOÀN TẤT! Đã lưu tất cả predictions")
             print("="*70)
-            print("\n💡 Usage: python3 predict_gold_price.py [--week|-w] [--month|-m] [--quarter|-q] [--year|-y] [price]")
+            print("\n💡 Usage: python3 predict_gold_price.py [--week|-w] [--month|-m] [--quarter|-q] [--year|-y] [--benchmark] [--direct] [--scenarios[=N]|--grid] [price]")
             print("   Không có arg = chạy tất cả predictions")
     else:
         print("\n❌ Không thể thực hiện prediction do lỗi dữ liệu.")
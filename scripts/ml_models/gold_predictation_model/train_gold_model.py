@@ -3,6 +3,13 @@ import numpy as np
 import warnings
 import os
 from pycaret.regression import *
+import gold_data
+import gold_features
+from gold_runtime import export_verified_runtime
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from training_cache import TrainingCache, estimator_name, experiment_pipeline, fingerprint
+import joblib
 import matplotlib.pyplot as plt
 import matplotlib
 matplotlib.use('Agg')
@@ -13,110 +20,24 @@ print("=" * 70)
 print("Training GOLD Price Prediction Model")
 print("=" * 70)
 
-DATA_FILE = 'gold_macro_data_full.csv'
-
 # ==========================================
 # 1. LOAD DATA
 # ==========================================
 def load_data():
-    if os.path.exists(DATA_FILE):
-        print(f"[1/6] Tìm thấy file dữ liệu '{DATA_FILE}'. Đang đọc...")
-        df = pd.read_csv(DATA_FILE, index_col=0, parse_dates=True)
-        df_weekly = df.resample('W-FRI').last().ffill()
-        return df_weekly
+    df_weekly = gold_data.load_data()
+    if not df_weekly.empty:
+        print(f"[1/6] Đã đọc kho dữ liệu ({len(df_weekly)} tuần, tới {df_weekly.index[-1].date()})")
     else:
         print("❌ Không tìm thấy file dữ liệu.")
-        return pd.DataFrame()
+    return df_weekly
 
 # ==========================================
 # 2. ADVANCED FEATURE ENGINEERING
 # ==========================================
 def create_advanced_features(df_input):
     print("[2/6] Đang tạo Advanced Features...")
-    df = df_input.copy()
-    
-    # ===== GEO SCORE (Historical Events) =====
-    df['Geo_Score'] = 1.0
-    df.loc['2022-02':'2022-04', 'Geo_Score'] = 9.0  # Russia-Ukraine
-    df.loc['2023-10':'2023-11', 'Geo_Score'] = 8.0  # Israel-Hamas
-    df.loc['2020-03':'2020-05', 'Geo_Score'] = 6.0  # COVID-19
-    
-    # ===== BASIC RETURNS =====
-    df['Gold_Ret'] = df['Gold'].pct_change()
-    df['DXY_Ret'] = df['DXY'].pct_change()
-    df['SP500_Ret'] = df['SP500'].pct_change()
-    df['Oil_Ret'] = df['Oil'].pct_change()
-    df['Silver_Ret'] = df['Silver'].pct_change()
-    
-    # ===== LAGGED FEATURES (1-4 weeks ago) =====
-    for lag in [1, 2, 3, 4]:
-        df[f'Gold_Ret_Lag{lag}'] = df['Gold_Ret'].shift(lag)
-        df[f'DXY_Ret_Lag{lag}'] = df['DXY_Ret'].shift(lag)
-        df[f'VIX_Lag{lag}'] = df['VIX'].shift(lag)
-    
-    # ===== ROLLING STATISTICS (4, 8, 12 weeks) =====
-    for window in [4, 8, 12]:
-        # Rolling Mean
-        df[f'Gold_MA{window}'] = df['Gold'].rolling(window).mean()
-        df[f'Gold_Deviation_MA{window}'] = (df['Gold'] - df[f'Gold_MA{window}']) / df[f'Gold_MA{window}']
-        
-        # Rolling Std (Volatility)
-        df[f'Gold_Std{window}'] = df['Gold_Ret'].rolling(window).std()
-        df[f'VIX_MA{window}'] = df['VIX'].rolling(window).mean()
-        
-        # Price relative to moving average
-        df[f'Gold_Price_Position{window}'] = df['Gold'] / df[f'Gold_MA{window}'] - 1
-    
-    # ===== MOMENTUM INDICATORS =====
-    # RSI-like indicator
-    df['Gold_Momentum_4w'] = df['Gold'].pct_change(4)
-    df['Gold_Momentum_8w'] = df['Gold'].pct_change(8)
-    df['Gold_Momentum_12w'] = df['Gold'].pct_change(12)
-    
-    # Price acceleration
-    df['Gold_Acceleration'] = df['Gold_Ret'] - df['Gold_Ret'].shift(1)
-    
-    # ===== VOLATILITY INDICATORS =====
-    df['VIX_Change'] = df['VIX'].pct_change()
-    df['VIX_Spike'] = (df['VIX'] > df['VIX'].rolling(12).mean() * 1.5).astype(int)
-    
-    # ===== REAL YIELD =====
-    df['Real_Yield_Proxy'] = df['US10Y'] / df['TIPS']
-    df['Real_Yield_Change'] = df['Real_Yield_Proxy'].pct_change()
-    df['Real_Yield_MA4'] = df['Real_Yield_Proxy'].rolling(4).mean()
-    
-    # ===== FEAR FACTOR =====
-    df['Fear_Factor'] = df['VIX'] * df['Geo_Score']
-    df['Fear_Factor_Change'] = df['Fear_Factor'].pct_change()
-    
-    # ===== CORRELATION FEATURES =====
-    # Gold vs Silver ratio (historical relationship)
-    df['Gold_Silver_Ratio'] = df['Gold'] / df['Silver']
-    df['Gold_Silver_Ratio_Change'] = df['Gold_Silver_Ratio'].pct_change()
-    
-    # Gold vs DXY inverse relationship
-    df['Gold_DXY_Divergence'] = df['Gold_Ret'] + df['DXY_Ret']  # Should be negative
-    
-    # ===== MARKET REGIME INDICATORS =====
-    # Risk-On vs Risk-Off
-    df['Risk_On'] = ((df['SP500_Ret'] > 0) & (df['VIX'] < 20)).astype(int)
-    df['Risk_Off'] = ((df['SP500_Ret'] < 0) & (df['VIX'] > 25)).astype(int)
-    
-    # ===== TARGET: Try multiple options =====
-    # Option 1: Simple return (original)
-    df['Target_Return'] = df['Gold'].pct_change().shift(-1)
-    
-    # Option 2: Log return (better for percentages)
-    df['Target_LogReturn'] = np.log(df['Gold'] / df['Gold'].shift(1)).shift(-1)
-    
-    # Option 3: Price direction (classification-style)
-    df['Target_Direction'] = np.sign(df['Target_Return'])
-    
-    # Option 4: Direct price prediction
-    df['Target_Price'] = df['Gold'].shift(-1)
-    
-    # ===== CLEAN DATA =====
-    df.dropna(inplace=True)
+    # Shared, cached feature pipeline (gold_features.py); training needs the target
+    df = gold_features.training_rows(gold_features.build_features(df_input))
     
     print(f"   ✓ Created {len(df.columns)} features")
     print(f"   ✓ Data points: {len(df)}")
@@ -128,97 +49,57 @@ def create_advanced_features(df_input):
 # ==========================================
 def select_features(df):
     """Select most important features"""
-    # Exclude targets and raw prices
-    exclude_cols = ['Gold', 'Silver', 'DXY', 'US10Y', 'TIPS', 'SP500', 
-                    'VIX', 'Miners', 'Oil', 'Target_Return', 'Target_LogReturn',
-                    'Target_Direction', 'Target_Price', 'Geo_Score']
-    
-    feature_cols = [col for col in df.columns if col not in exclude_cols]
-    
-    # Include Geo_Score but remove raw prices
-    feature_cols.append('Geo_Score')
-    
-    return feature_cols
+    # Exclude targets and raw prices, Geo_Score last
+    return gold_features.feature_columns(df)
 
 # ==========================================
 # 4. COMPARE MODELS WITH DIFFERENT TARGETS
 # ==========================================
-def compare_models_multiple_targets(df, feature_cols):
+# Experiment: (cột target, tham số setup riêng); setup / compare chung ở SETUP_PARAMS
+EXPERIMENTS = {
+    'Return': ('Target_Return', {'transformation': True}),        # Predict Return (pct_change)
+    'LogReturn': ('Target_LogReturn', {'transformation': True}),  # Predict Log Return
+    'Price': ('Target_Price', {'transformation': False}),         # Predict Price Directly (don't transform prices)
+}
+SETUP_PARAMS = {
+    'train_size': 0.85,
+    'session_id': 42,
+    'fold': 5,
+    'normalize': True,
+    'remove_outliers': True,
+}
+COMPARE_PARAMS = {'sort': 'RMSE', 'n_select': 3}
+TRAIN_SPLIT = 0.85
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'training_cache')
+
+
+def run_experiment(train_data, params):
+    """setup + compare_models; trả về pipeline (preprocessing + model tốt nhất)"""
+    setup(data=train_data, target='target', verbose=False, n_jobs=-1, **params)
+    top_models = compare_models(verbose=False, **COMPARE_PARAMS)
+    return experiment_pipeline(top_models[0])
+
+
+def compare_models_multiple_targets(df, feature_cols, cache=None):
     print("[3/6] Đang thử nghiệm với 3 loại target khác nhau...")
+    cache = cache or TrainingCache(CACHE_DIR)
     
     results = {}
+    split_idx = int(len(df) * TRAIN_SPLIT)
     
-    # ===== EXPERIMENT 1: Predict Return (Original) =====
-    print("\n   [1] Experiment: Predict Return (pct_change)")
-    df_exp1 = df[feature_cols + ['Target_Return']].copy()
-    df_exp1.rename(columns={'Target_Return': 'target'}, inplace=True)
-    
-    split_idx = int(len(df_exp1) * 0.85)
-    train_data = df_exp1.iloc[:split_idx]
-    test_data = df_exp1.iloc[split_idx:]
-    
-    exp1 = setup(
-        data=train_data,
-        target='target',
-        train_size=0.85,
-        session_id=42,
-        verbose=False,
-        fold=5,
-        normalize=True,
-        transformation=True,  # Try transformation
-        remove_outliers=True,  # Remove outliers
-        n_jobs=-1
-    )
-    
-    top_models_exp1 = compare_models(sort='RMSE', n_select=3, verbose=False)
-    results['Return'] = (top_models_exp1[0], test_data, split_idx)
-    
-    # ===== EXPERIMENT 2: Predict Log Return =====
-    print("\n   [2] Experiment: Predict Log Return")
-    df_exp2 = df[feature_cols + ['Target_LogReturn']].copy()
-    df_exp2.rename(columns={'Target_LogReturn': 'target'}, inplace=True)
-    
-    train_data = df_exp2.iloc[:split_idx]
-    test_data = df_exp2.iloc[split_idx:]
-    
-    exp2 = setup(
-        data=train_data,
-        target='target',
-        train_size=0.85,
-        session_id=42,
-        verbose=False,
-        fold=5,
-        normalize=True,
-        transformation=True,
-        remove_outliers=True
-    )
-    
-    top_models_exp2 = compare_models(sort='RMSE', n_select=3, verbose=False)
-    results['LogReturn'] = (top_models_exp2[0], test_data, split_idx)
-    
-    # ===== EXPERIMENT 3: Predict Price Directly =====
-    print("\n   [3] Experiment: Predict Price Directly")
-    df_exp3 = df[feature_cols + ['Target_Price']].copy()
-    df_exp3.rename(columns={'Target_Price': 'target'}, inplace=True)
-    
-    train_data = df_exp3.iloc[:split_idx]
-    test_data = df_exp3.iloc[split_idx:]
-    
-    exp3 = setup(
-        data=train_data,
-        target='target',
-        train_size=0.85,
-        session_id=42,
-        verbose=False,
-        fold=5,
-        normalize=True,
-        transformation=False,  # Don't transform prices
-        remove_outliers=True
-    )
-    
-    top_models_exp3 = compare_models(sort='RMSE', n_select=3, verbose=False)
-    results['Price'] = (top_models_exp3[0], test_data, split_idx)
+    for i, (name, (target_col, exp_params)) in enumerate(EXPERIMENTS.items(), 1):
+        print(f"\n   [{i}] Experiment: Predict {name}")
+        df_exp = df[feature_cols + [target_col]].rename(columns={target_col: 'target'})
+        train_data = df_exp.iloc[:split_idx]
+        test_data = df_exp.iloc[split_idx:]
+        
+        # Chỉ train lại experiment có dữ liệu / feature / tham số thay đổi
+        params = {**SETUP_PARAMS, **exp_params}
+        key = fingerprint(train_data, params, COMPARE_PARAMS)
+        model = cache.get_or_train(f'train_gold_{name}', key, lambda: run_experiment(train_data, params))
+        results[name] = (model, test_data, split_idx)
     
+    print(f"\n   ✓ {cache.summary()}")
     return results, df
 
 # ==========================================
@@ -241,13 +122,13 @@ def evaluate_results(results, raw_df):
         
         comparison.append({
             'Experiment': exp_name,
-            'Model': type(model).__name__,
+            'Model': estimator_name(model),
             'MAE': mae,
             'RMSE': rmse,
             'R²': r2
         })
         
-        print(f"\n{exp_name} - {type(model).__name__}")
+        print(f"\n{exp_name} - {estimator_name(model)}")
         print(f"   MAE:  {mae:.6f}")
         print(f"   RMSE: {rmse:.6f}")
         print(f"   R²:   {r2:.6f}")
@@ -345,8 +226,9 @@ def visualize_best_model(results, best_exp, raw_df, df):
     ax5 = plt.subplot(2, 3, 5)
     try:
         # Get feature importance from model
-        if hasattr(model, 'feature_importances_'):
-            importances = model.feature_importances_
+        estimator = model.steps[-1][1] if hasattr(model, 'steps') else model
+        if hasattr(estimator, 'feature_importances_'):
+            importances = estimator.feature_importances_
             feature_names = test_data.drop('target', axis=1).columns
             indices = np.argsort(importances)[-15:]  # Top 15
             
@@ -377,7 +259,7 @@ def visualize_best_model(results, best_exp, raw_df, df):
     MODEL PERFORMANCE SUMMARY
     {'='*40}
     
-    Model: {type(model).__name__}
+    Model: {estimator_name(model)}
     Target Type: {best_exp}
     
     Mean Absolute Error (MAE): ${mae:.2f}
@@ -405,12 +287,17 @@ def visualize_best_model(results, best_exp, raw_df, df):
 # ==========================================
 def save_best_model(results, best_exp):
     print("\n[6/6] Lưu best model...")
-    model, _, _ = results[best_exp]
+    pipeline, _, _ = results[best_exp]
     
+    # Experiment trả về pipeline hoàn chỉnh: ghi đúng định dạng của save_model / load_model
     model_filename = f'best_model_{best_exp.lower()}'
-    save_model(model, model_filename)
+    joblib.dump(pipeline, f'{model_filename}.pkl')
     print(f"   ✓ Đã lưu model vào '{model_filename}.pkl'")
 
+    # Artifact nhẹ để predict không cần import PyCaret (xem gold_runtime.py), bị xoá nếu lệch predict_model
+    _, test_data, _ = results[best_exp]
+    export_verified_runtime(pipeline, model_filename, test_data.drop(columns='target'))
+
 # ==========================================
 # MAIN EXECUTION
 # ==========================================
@@ -426,8 +313,9 @@ if __name__ == "__main__":
         feature_cols = select_features(df)
         print(f"\n   Selected {len(feature_cols)} features for modeling")
         
-        # 4. Compare Models with Different Targets
-        results, df = compare_models_multiple_targets(df, feature_cols)
+        # 4. Compare Models with Different Targets (--retrain: bỏ qua training cache)
+        cache = TrainingCache(CACHE_DIR, force='--retrain' in sys.argv)
+        results, df = compare_models_multiple_targets(df, feature_cols, cache)
         
         # 5. Evaluate Results
         comparison_df, best_exp = evaluate_results(results, raw_df)
@@ -5,6 +5,7 @@ import matplotlib
 matplotlib.use('Agg')
 import warnings
 import os
+import gold_data
 from pycaret.regression import *
 
 warnings.filterwarnings('ignore')
@@ -47,12 +48,10 @@ def load_comparison_data():
 # ==========================================
 def load_gold_data():
     """Load gold data for making predictions"""
-    if not os.path.exists('gold_macro_data_full.csv'):
+    df_weekly = gold_data.load_data()
+    if df_weekly.empty:
         return None
     
-    df = pd.read_csv('gold_macro_data_full.csv', index_col=0, parse_dates=True)
-    df_weekly = df.resample('W-FRI').last().ffill()
-    
     # Create features (simplified version)
     df_weekly['Geo_Score'] = 1.0
     df_weekly['Gold_Ret'] = df_weekly['Gold'].pct_change()
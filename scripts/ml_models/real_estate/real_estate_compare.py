@@ -1,7 +1,17 @@
 import json
+import os
+import sys
+import joblib
 import pandas as pd
 from pycaret.regression import *
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from training_cache import TrainingCache, estimator_name, experiment_pipeline, fingerprint
+
+SETUP_PARAMS = {'target': 'apt_price_avg_m2', 'session_id': 123}
+COMPARE_PARAMS = {'sort': 'R2', 'n_select': 1}
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'training_cache')
+
 # 1. Load và Chuẩn bị dữ liệu
 def get_data():
     try:
@@ -21,22 +31,32 @@ def get_data():
         print("Không tìm thấy file json!")
         return None
 
-# 2. Chạy mô hình và Dự đoán
-def run_prediction():
-    # --- BƯỚC 1: HUẤN LUYỆN ---
-    train_data = get_data()
-    if train_data is None: return
-
+# 2. Huấn luyện: (pipeline đã finalize, bảng so sánh models)
+def train_model(train_data):
     print("Dang setup PyCaret...")
-    s = setup(data=train_data, target='apt_price_avg_m2', session_id=123, verbose=False)
+    s = setup(data=train_data, verbose=False, **SETUP_PARAMS)
     
     # Lấy mô hình tốt nhất (ví dụ: Linear Regression, Random Forest...)
-    best_model = compare_models(sort='R2', n_select=1)
+    best_model = compare_models(**COMPARE_PARAMS)
+    comparison = pull()
     
     # "Finalize" là bước quan trọng để chốt mô hình sau khi train xong
     final_model = finalize_model(best_model)
+    return experiment_pipeline(final_model), comparison
+
+# 3. Chạy mô hình và Dự đoán
+def run_prediction():
+    # --- BƯỚC 1: HUẤN LUYỆN ---
+    train_data = get_data()
+    if train_data is None: return
+
+    # Dữ liệu và tham số không đổi thì dùng lại model + bảng so sánh đã lưu (--retrain: train lại)
+    cache = TrainingCache(CACHE_DIR, force='--retrain' in sys.argv)
+    key = fingerprint(train_data, SETUP_PARAMS, COMPARE_PARAMS)
+    final_model, comparison = cache.get_or_train('real_estate_compare', key, lambda: train_model(train_data))
     
-    print(f"\nModel được chọn: {best_model}")
+    print(comparison)
+    print(f"\nModel được chọn: {estimator_name(final_model)}")
 
     # --- BƯỚC 2: DỰ ĐOÁN NĂM 2026 ---
     print("\n--- ĐANG DỰ ĐOÁN GIÁ NĂM 2026 ---")
@@ -65,8 +85,8 @@ def run_prediction():
     print("\nKẾT QUẢ DỰ BÁO (Dựa trên giả định CPI):")
     print(results[['year', 'quarter', 'cpi_index', 'Gia_Du_Doan_VND']])
 
-    # Save model
-    save_model(final_model, 'hcmc_real_estate_price_model')
+    # Save model (final_model đã là pipeline hoàn chỉnh, cùng định dạng với save_model)
+    joblib.dump(final_model, 'hcmc_real_estate_price_model.pkl')
 
 if __name__ == "__main__":
     run_prediction()
\ No newline at end of file
@@ -0,0 +1,166 @@
+"""
+Dự báo giá căn hộ TP.HCM từ model đã lưu (hcmc_real_estate_price_model.pkl)
+
+Model (pipeline của real_estate_compare.py) được load một lần mỗi process bằng
+joblib.load(mmap_mode='r'), không train lại. Mọi dự báo đi qua một lần predict cho cả
+batch: lưới (năm, quý, kịch bản CPI) được tạo bằng numpy broadcasting, nên OSINT thesis /
+web UI có thể hỏi hàng nghìn dự phóng trong vài mili giây.
+
+Kịch bản CPI = mức thay đổi CPI mỗi quý (điểm chỉ số) tính từ quý cuối có CPI thực tế;
+None = xu hướng trung bình CPI_TREND_QUARTERS quý gần nhất.
+
+Giá rao bán thực tế theo quý từ housing index (scripts/housing_index.py) được ghép vào
+kết quả khi có (cột listing_price_m2) để đối chiếu với dự báo.
+
+Usage:
+    python3 real_estate_model.py             # các quý chưa có dữ liệu x DEFAULT_SCENARIOS
+    python3 real_estate_model.py --json      # in kết quả dạng JSON
+    python3 real_estate_model.py --index     # kèm giá rao bán theo quý từ housing index (DB)
+"""
+import json
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH = os.path.join(BASE_DIR, 'hcmc_real_estate_price_model.pkl')
+DATA_PATH = os.path.join(BASE_DIR, 'hcm_real_estate_cpi_2018_2026.json')
+SCRIPTS_DIR = os.path.abspath(os.path.join(BASE_DIR, '..', '..'))
+
+FEATURES = ['year', 'quarter', 'cpi_index']
+TARGET = 'apt_price_avg_m2'
+CPI_TREND_QUARTERS = 4
+
+# Tên kịch bản -> thay đổi CPI mỗi quý (None = xu hướng gần nhất)
+DEFAULT_SCENARIOS = {
+    'trend': None,
+    'flat': 0.0,
+    'low': 0.4,
+    'high': 1.2,
+}
+
+_MODELS = {}
+
+
+def load_model(path=MODEL_PATH):
+    """Pipeline đã lưu, load một lần mỗi process (mảng numpy được memory-map)"""
+    if path not in _MODELS:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Không tìm thấy '{path}'. Chạy real_estate_compare.py để train model.")
+        _MODELS[path] = joblib.load(path, mmap_mode='r')
+    return _MODELS[path]
+
+
+def load_history(path=DATA_PATH):
+    """Dữ liệu quý (year, quarter, cpi_index, apt_price_avg_m2), sắp xếp theo thời gian"""
+    with open(path, 'r', encoding='utf-8') as f:
+        df = pd.DataFrame(json.load(f))
+    return df[FEATURES + [TARGET]].sort_values(['year', 'quarter']).reset_index(drop=True)
+
+
+def cpi_trend(history, quarters=CPI_TREND_QUARTERS):
+    """Thay đổi CPI trung bình mỗi quý của `quarters` quý gần nhất có CPI"""
+    cpi = history['cpi_index'].dropna().to_numpy()
+    return float(np.mean(np.diff(cpi[-quarters:])))
+
+
+def future_periods(history):
+    """[(year, quarter), ...] chưa có CPI thực tế (vd. các quý năm 2026)"""
+    missing = history[history['cpi_index'].isna()]
+    return list(zip(missing['year'].astype(int), missing['quarter'].astype(int)))
+
+
+def scenario_grid(history, periods, scenarios=None):
+    """
+    Lưới dự phóng: mỗi (kịch bản, quý) một dòng.
+
+    Args:
+        history: DataFrame của load_history()
+        periods: [(year, quarter), ...]
+        scenarios: {tên: thay đổi CPI mỗi quý hoặc None}, mặc định DEFAULT_SCENARIOS
+
+    Returns:
+        DataFrame cột scenario, year, quarter, cpi_index
+    """
+    scenarios = DEFAULT_SCENARIOS if scenarios is None else scenarios
+    known = history.dropna(subset=['cpi_index'])
+    last = known.iloc[-1]
+    trend = cpi_trend(history)
+
+    periods = np.asarray(periods, dtype=int).reshape(-1, 2)
+    steps = (periods[:, 0] - int(last['year'])) * 4 + (periods[:, 1] - int(last['quarter']))
+    changes = np.array([trend if c is None else c for c in scenarios.values()], dtype=float)
+
+    # (kịch bản, quý): CPI = CPI cuối + thay đổi mỗi quý * số quý
+    cpi = np.round(last['cpi_index'] + changes[:, None] * steps[None, :], 1)
+    n_scenarios, n_periods = cpi.shape
+    return pd.DataFrame({
+        'scenario': np.repeat(list(scenarios), n_periods),
+        'year': np.tile(periods[:, 0], n_scenarios),
+        'quarter': np.tile(periods[:, 1], n_scenarios),
+        'cpi_index': cpi.ravel(),
+    })
+
+
+def load_listing_index():
+    """
+    Giá rao bán trung vị VND/m2 theo quý của TP.HCM từ housing index (bảng housing_price_index).
+
+    Returns:
+        DataFrame cột year, quarter, price_avg_m2 (rỗng nếu DB không truy cập được)
+    """
+    import asyncio
+    from dotenv import load_dotenv
+
+    sys.path.insert(0, SCRIPTS_DIR)
+    from housing_index import load_index_series, quarterly_index
+
+    load_dotenv(os.path.join(SCRIPTS_DIR, '.env'))
+    return quarterly_index(asyncio.run(load_index_series()))
+
+
+def with_listing_index(frame, listing_index):
+    """Ghép giá rao bán theo quý (cột listing_price_m2, NaN nếu quý đó chưa có dữ liệu)"""
+    listing = listing_index.rename(columns={'price_avg_m2': 'listing_price_m2'})
+    return frame.merge(listing, on=['year', 'quarter'], how='left')
+
+
+def predict_batch(rows, model=None):
+    """Giá dự báo (VND/m2) cho mọi dòng (cột year, quarter, cpi_index) trong một lần predict"""
+    model = load_model() if model is None else model
+    return np.asarray(model.predict(rows[FEATURES]), dtype=float)
+
+
+def predict_grid(periods=None, scenarios=None, history=None, model=None):
+    """
+    Dự phóng giá trên lưới (quý x kịch bản CPI).
+
+    Returns:
+        DataFrame cột scenario, year, quarter, cpi_index, predicted_price
+    """
+    history = load_history() if history is None else history
+    periods = future_periods(history) if periods is None else periods
+    grid = scenario_grid(history, periods, scenarios)
+    grid['predicted_price'] = predict_batch(grid, model)
+    return grid
+
+
+if __name__ == "__main__":
+    result = predict_grid()
+    if '--index' in sys.argv:
+        result = with_listing_index(result, load_listing_index())
+    if '--json' in sys.argv:
+        print(json.dumps(result.to_dict(orient='records'), ensure_ascii=False, indent=2))
+    else:
+        pd.options.display.float_format = '{:,.0f}'.format
+        table = result.pivot_table(index=['year', 'quarter'], columns='scenario',
+                                   values='predicted_price', sort=False)
+        print("Dự báo giá căn hộ (VND/m2) theo kịch bản CPI:")
+        print(table)
+        if 'listing_price_m2' in result:
+            listing = result.drop_duplicates(['year', 'quarter']).set_index(['year', 'quarter'])['listing_price_m2']
+            print("\nGiá rao bán thực tế (housing index, VND/m2):")
+            print(listing)
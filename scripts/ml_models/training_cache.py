@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Training Cache
+Skips retraining a PyCaret experiment when its training data, features and setup /
+compare parameters did not change since the last run.
+
+Each experiment is stored as training_cache/<name>.joblib (next to the calling script)
+together with the fingerprint it was trained from. A run with the same fingerprint loads
+the stored artifacts (fitted pipeline, comparison table, ...); any change retrains only
+that experiment.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import joblib
+import pandas as pd
+
+CACHE_VERSION = 1   # Bump to invalidate every stored experiment
+
+
+def _library_versions():
+    # A cached pipeline is only reusable with the libraries that pickled it
+    versions = {}
+    for module in ('pycaret', 'sklearn', 'pandas', 'numpy'):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            versions[module] = None
+    return versions
+
+
+def fingerprint(*parts):
+    """
+    Stable hash of DataFrames / Series (values, index, columns, dtypes), dicts, lists and
+    scalars, plus CACHE_VERSION and the library versions.
+    """
+    digest = hashlib.sha256()
+    for part in (CACHE_VERSION, _library_versions()) + parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+            columns = part.columns if isinstance(part, pd.DataFrame) else [part.name]
+            dtypes = part.dtypes if isinstance(part, pd.DataFrame) else [part.dtype]
+            digest.update(json.dumps([str(c) for c in columns] + [str(d) for d in dtypes]).encode('utf-8'))
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()[:16]
+
+
+def experiment_pipeline(model):
+    """
+    Preprocessing of the current PyCaret setup + `model` as one fitted pipeline, the same
+    object save_model writes (predict_model accepts it without the setup being active).
+    finalize_model already returns such a pipeline: it is kept as is.
+    """
+    if hasattr(model, 'steps'):
+        return model
+
+    from pycaret.regression import save_model
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pipeline, _ = save_model(model, os.path.join(tmp, 'model'), verbose=False)
+    return pipeline
+
+
+def estimator_name(model):
+    """Estimator class name of a bare estimator or of a pipeline's last step"""
+    if hasattr(model, 'steps'):
+        model = model.steps[-1][1]
+    return type(model).__name__
+
+
+class TrainingCache:
+    """
+    Args:
+        cache_dir: Directory of the stored experiments
+        force: Retrain (and overwrite) even when the fingerprint matches
+    """
+
+    def __init__(self, cache_dir, force=False):
+        self.cache_dir = cache_dir
+        self.force = force
+        self.hits = []
+        self.misses = []
+
+    def _paths(self, name):
+        safe = "".join(c if c.isalnum() or c in '-_.' else '_' for c in name)
+        base = os.path.join(self.cache_dir, safe)
+        return f"{base}.joblib", f"{base}.key"
+
+    def load(self, name, key):
+        """Stored value of `name` if it was trained from `key`, else None"""
+        path, key_path = self._paths(name)
+        if self.force or not os.path.exists(path) or not os.path.exists(key_path):
+            return None
+        with open(key_path, 'r') as f:
+            if f.read().strip() != key:
+                return None
+        try:
+            return joblib.load(path)
+        except Exception as e:
+            print(f"   ⚠ Không đọc được cache '{name}': {e}")
+            return None
+
+    def store(self, name, key, value):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path, key_path = self._paths(name)
+        tmp_path = f"{path}.tmp"
+        joblib.dump(value, tmp_path)
+        os.replace(tmp_path, path)
+        # Key last: an interrupted write never pairs a new key with an old artifact
+        with open(key_path, 'w') as f:
+            f.write(key)
+
+    def get_or_train(self, name, key, train):
+        """Stored value on a hit, otherwise `train()` (stored for the next run)"""
+        value = self.load(name, key)
+        if value is not None:
+            print(f"   ♻️  {name}: dữ liệu và cấu hình không đổi ({key}), dùng kết quả đã train")
+            self.hits.append(name)
+            return value
+        value = train()
+        self.store(name, key, value)
+        self.misses.append(name)
+        return value
+
+    def summary(self):
+        return f"training cache: {len(self.hits)} hit, {len(self.misses)} retrained"
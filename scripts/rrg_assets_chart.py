@@ -1,16 +1,15 @@
-import pandas as pd
-import yfinance as yf
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-import matplotlib.patheffects as PathEffects
-import numpy as np
 from datetime import datetime, timedelta
 import os
-import asyncio
 import asyncpg
 import io
 import urllib.request
 from dotenv import load_dotenv
+from rrg_publish import publish
+from source_cache import Source, load_sources, HOUR, DAY, WEEK
+from housing_index import load_index_series
+
+# Heavy libraries (pandas, numpy, yfinance, matplotlib) are imported inside the functions
+# that need them, so importing this module is cheap and run_rrg_charts.py can reuse one process.
 
 # Load .env từ cùng thư mục với script (scripts/.env)
 load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
@@ -51,8 +50,35 @@ TREASURY_YIELDS = {
     'US10Y (Growth & Inflation)': 'DGS10'
 }
 
+# Fallback Yahoo tickers when FRED is unavailable
+TREASURY_FALLBACKS = {
+    'US02Y (FED Policy & Liquidity)': '^IRX',
+    'US10Y (Growth & Inflation)': '^TNX'
+}
+
+# Source cache TTLs and timeout budgets (seconds)
+YAHOO_TTL = HOUR
+FRED_TTL = DAY          # FRED publishes daily
+BANK_RATE_TTL = WEEK    # Bank deposit rates change rarely
+HOUSING_TTL = 6 * HOUR  # The listings crawler runs a few times a day
+YAHOO_TIMEOUT = 20      # Per-request timeout inside yf.download
+YAHOO_BUDGET = 60
+FRED_BUDGET = 15
+DB_BUDGET = 10
+
 # Special Asset
 HOUSING_LABEL = 'HCMC Housing'
+HOUSING_SMOOTH_DAYS = 7  # Rolling median over the daily listing medians (each day sees different listings)
+
+TAIL_LENGTH = 7
+
+# RRG timeframes, all derived from the same daily data (no extra downloads).
+# Timeframes without enough bars for their windows (e.g. monthly over 200 days) are skipped.
+TIMEFRAMES = {
+    'D': {'window_ratio': 100, 'window_mom': 10, 'smooth_window': 3},
+    'W': {'window_ratio': 12, 'window_mom': 4, 'smooth_window': 2},
+    'M': {'window_ratio': 6, 'window_mom': 3, 'smooth_window': 1},
+}
 
 # --- HELPER FUNCTIONS ---
 
@@ -94,6 +120,8 @@ def create_synthetic_bank_rate_data(index_dates, annual_rate_pct):
     """Tạo chuỗi giá tổng hợp cho lãi suất ngân hàng.
     annual_rate_pct: lãi suất %/năm (ví dụ 7.3).
     Mô phỏng tài sản tích lũy theo lãi suất cố định (tương tự housing)."""
+    import pandas as pd
+
     days = len(index_dates)
     daily_rate = (1 + annual_rate_pct / 100) ** (1 / 365) - 1
     prices = [100 * ((1 + daily_rate) ** i) for i in range(days)]
@@ -102,7 +130,9 @@ def create_synthetic_bank_rate_data(index_dates, annual_rate_pct):
 
 
 def fetch_fred_yield(series_id, start_date):
-    """Fetches constant maturity Treasury yields directly from FRED CSV."""
+    """Fetches constant maturity Treasury yields directly from FRED CSV (start_date=None: full history)."""
+    import pandas as pd
+
     url = f"https://fred.stlouisfed.org/graph/fredgraph.csv?id={series_id}"
     try:
         req = urllib.request.Request(
@@ -116,7 +146,8 @@ def fetch_fred_yield(series_id, start_date):
         df['observation_date'] = pd.to_datetime(df['observation_date'])
         df.set_index('observation_date', inplace=True)
         df[series_id] = pd.to_numeric(df[series_id], errors='coerce')
-        df = df.loc[start_date:]
+        if start_date is not None:
+            df = df.loc[start_date:]
         df = df.ffill().bfill()
         return df[series_id]
     except Exception as e:
@@ -124,88 +155,119 @@ def fetch_fred_yield(series_id, start_date):
         return None
 
 
+def _align_tz(series, index):
+    """Handle tz-naive and tz-aware index compatibility"""
+    if index.tz is not None and series.index.tz is None:
+        series.index = series.index.tz_localize(index.tz)
+    elif index.tz is None and series.index.tz is not None:
+        series.index = series.index.tz_localize(None)
+    return series
+
+
+def download_yahoo(tickers, start_date):
+    """One batched yf.download for every Yahoo ticker (yfinance is not safe to call concurrently)."""
+    import yfinance as yf
+
+    data = yf.download(tickers, start=start_date, progress=False, timeout=YAHOO_TIMEOUT)['Close']
+    return data if not data.empty else None
+
+
 def fetch_data(lookback_days=200):
-    """Fetches data for all assets and benchmark."""
+    """
+    Fetches data for all assets and benchmark, plus the bank rate.
+    Yahoo, FRED and the DB are loaded concurrently through source_cache with per-source TTLs
+    and timeouts; a slow or failing source falls back to its last cached value.
+
+    Returns:
+        (data_raw, bench_df, bank_info, housing) - housing is the daily HCMC median price/m² in VND
+        from housing_index (None if unavailable)
+    """
     start_date = (datetime.now() - timedelta(days=lookback_days)).strftime('%Y-%m-%d')
     print(f"Fetching data starting from {start_date}...")
 
-    # 1. Fetch Benchmark
-    bench_df = yf.download(BENCHMARK_TICKER, start=start_date, progress=False)['Close']
-    if isinstance(bench_df, pd.DataFrame): bench_df = bench_df.iloc[:, 0] # Handle if multi-col
-    bench_df.name = 'Benchmark'
-
-    # 2. Fetch Assets (Batch where possible)
+    # Benchmark, assets and the Treasury fallbacks go into a single batched download
     tickers_map = {**COMMODITIES, **CRYPTO, **VN_INDEX, **US_INDEX}
-    all_tickers = list(tickers_map.values()) + [CURRENCY_PAIR]
-    
+    all_tickers = [BENCHMARK_TICKER] + list(tickers_map.values()) + [CURRENCY_PAIR] + list(TREASURY_FALLBACKS.values())
     print(f"Downloading {len(all_tickers)} tickers...")
-    data_raw = yf.download(all_tickers, start=start_date, progress=False)['Close']
-    
-    # Handle Data Structure
-    # yfinance might return MultiIndex columns if multiple tickers
-    if isinstance(data_raw.columns, pd.MultiIndex):
-        # Flatten if needed, but usually we just access by column name
-        pass
-        
-    # Fetch US Treasury yields from FRED
+
+    yahoo_key = f"yahoo_assets_{lookback_days}d"
+    sources = [
+        Source(yahoo_key, lambda: download_yahoo(all_tickers, start_date), ttl=YAHOO_TTL, timeout=YAHOO_BUDGET),
+        Source("bank_rate", fetch_bank_rate, ttl=BANK_RATE_TTL, timeout=DB_BUDGET),
+        Source("housing_index_hcmc", load_index_series, ttl=HOUSING_TTL, timeout=DB_BUDGET),
+    ]
+    for series_id in TREASURY_YIELDS.values():
+        # FRED returns the full history, so the cached series serves any lookback
+        sources.append(Source(f"fred_{series_id}", lambda sid=series_id: fetch_fred_yield(sid, None),
+                              ttl=FRED_TTL, timeout=FRED_BUDGET))
+    loaded = load_sources(sources)
+
+    yahoo = loaded[yahoo_key]
+    if yahoo is None:
+        raise RuntimeError("No Yahoo Finance data (and nothing cached)")
+
+    # 1. Benchmark
+    bench_df = yahoo[BENCHMARK_TICKER].dropna()
+    bench_df.name = 'Benchmark'
+
+    # 2. Assets
+    data_raw = yahoo.drop(columns=[BENCHMARK_TICKER, *TREASURY_FALLBACKS.values()], errors='ignore')
+    data_raw = data_raw.dropna(how='all')
+
+    # US Treasury yields from FRED, falling back to the Yahoo yield indices
     for name, series_id in TREASURY_YIELDS.items():
-        print(f"Fetching {name} ({series_id}) from FRED...")
-        yield_series = fetch_fred_yield(series_id, start_date)
+        yield_series = loaded[f"fred_{series_id}"]
         if yield_series is not None:
-            # Handle tz-naive and tz-aware index compatibility
-            if data_raw.index.tz is not None and yield_series.index.tz is None:
-                yield_series.index = yield_series.index.tz_localize(data_raw.index.tz)
-            elif data_raw.index.tz is None and yield_series.index.tz is not None:
-                yield_series.index = yield_series.index.tz_localize(None)
-                
+            yield_series = _align_tz(yield_series.loc[start_date:].copy(), data_raw.index)
             # Reindex to align exactly with the other financial assets
             data_raw[name] = yield_series.reindex(data_raw.index, method='ffill')
         else:
-            fallback_ticker = '^IRX' if 'US02Y' in name else '^TNX'
+            fallback_ticker = TREASURY_FALLBACKS[name]
             print(f"⚠️ FRED failed for {name}. Falling back to yfinance ticker {fallback_ticker}...")
-            try:
-                fallback_df = yf.download(fallback_ticker, start=start_date, progress=False)['Close']
-                if isinstance(fallback_df, pd.DataFrame):
-                    fallback_df = fallback_df.iloc[:, 0]
-                
-                if data_raw.index.tz is not None and fallback_df.index.tz is None:
-                    fallback_df.index = fallback_df.index.tz_localize(data_raw.index.tz)
-                elif data_raw.index.tz is None and fallback_df.index.tz is not None:
-                    fallback_df.index = fallback_df.index.tz_localize(None)
-                
-                s_data = fallback_df.reindex(data_raw.index, method='ffill')
+            if fallback_ticker in yahoo.columns:
+                s_data = yahoo[fallback_ticker].reindex(data_raw.index, method='ffill')
                 if fallback_ticker == '^TNX' and s_data.mean() > 10:
                     s_data = s_data / 10.0
-                
                 data_raw[name] = s_data
                 print(f"✅ Fallback successful for {name} using {fallback_ticker}")
-            except Exception as fe:
-                print(f"❌ Fallback failed for {name}: {fe}")
-        
-    return data_raw, bench_df
+            else:
+                print(f"❌ Fallback failed for {name}: {fallback_ticker} not downloaded")
 
-def create_synthetic_housing_data(index_dates):
-    """Creates a synthetic data series for HCMC Housing."""
-    # Assumption: Slow, steady growth with low volatility, slightly unconnected to DXY
-    # localized trend.
-    days = len(index_dates)
-    # Start at arbitrary 100, grow 5-10% a year with some random noise
-    base_price = 100
-    daily_growth = 1.0002 # approx 7% a year
-    
-    prices = [base_price * (daily_growth ** i) for i in range(days)]
-    # Add minimal noise
-    noise = np.random.normal(0, 0.2, days)
-    prices = prices + noise
-    
-    return pd.Series(prices, index=index_dates, name=HOUSING_LABEL)
+    return data_raw, bench_df, loaded["bank_rate"], loaded["housing_index_hcmc"]
+
+def build_housing_series(index_dates, housing_vnd, usd_vnd):
+    """
+    HCMC Housing in USD from the real housing index (median price/m²).
+
+    The RRG panel drops every date where an asset has no price, so the asset is only
+    included once the index covers the whole chart window; until then it is left out
+    (None) rather than padded with made-up prices.
+    """
+    if housing_vnd is None or housing_vnd.dropna().empty:
+        print(f"ℹ️  No housing index data yet, {HOUSING_LABEL} is not charted.")
+        return None
+
+    housing_vnd = housing_vnd.dropna().sort_index()
+    housing_vnd = housing_vnd.rolling(HOUSING_SMOOTH_DAYS, min_periods=1).median()
+    housing_vnd = _align_tz(housing_vnd, index_dates)
+    real = (housing_vnd.reindex(index_dates, method='ffill') / usd_vnd.reindex(index_dates).ffill())
+    first = real.first_valid_index()
+    if first is None or first > index_dates[0]:
+        covered = 0 if first is None else int(real.notna().sum())
+        print(f"ℹ️  Housing index covers {covered}/{len(index_dates)} chart days, "
+              f"{HOUSING_LABEL} is not charted until it covers the whole window.")
+        return None
+    real.name = HOUSING_LABEL
+    return real
 
 def calculate_rrg(prices_df, benchmark_series):
     """
-    Calculates RRG indicators (RS-Ratio, RS-Momentum).
+    Calculates RRG indicators (RS-Ratio, RS-Momentum) for every timeframe in TIMEFRAMES.
     prices_df: DataFrame of asset prices in USD.
     benchmark_series: Series of benchmark prices (DXY).
+    Returns {timeframe: {asset: DataFrame(RSR, RSM)}}.
     """
+    from rrg_engine import compute_rrg_timeframes, rrg_to_frames, MOMENTUM_LEVEL
     
     # Align Data
     common_index = prices_df.index.intersection(benchmark_series.index)
@@ -217,146 +279,35 @@ def calculate_rrg(prices_df, benchmark_series):
     prices = prices.loc[valid_idx]
     bench = bench.loc[valid_idx]
     
-    rrg_results = {}
-    
-    # Parameters provided by JdK RRG standard
-    window_rs = 100
-    window_mom = 10 
-    
     print("Calculating RRG metrics...")
     
-    for col in prices.columns:
-        # Relative Strength (Price / Benchmark)
-        rs = 100 * (prices[col] / bench)
-        
-        # RRG Logic (JdK RRG uses a specific normalization, here we use a simplified robust approximation)
-        # 1. RS-Ratio = (RS / MA(RS, window)) * 100 -> Standard logic is slightly more complex involving std dev
-        
-        # Standard JdK Approximation:
-        # RS-Ratio is a normalized measure of trend
-        # We use a moving average to smooth trends
-        
-        # Method A: Simple Ratio
-        # ma_rs = rs.rolling(window=window_rs).mean()
-        # rs_ratio = 100 * (rs / ma_rs)
-        
-        # Method B: JdK-like Normalization (More commonly cited in Python implementations)
-        # RS-Ratio = 100 + ((RS - MA(RS)) / StdDev(RS)) -- standardized Z-score shifted to 100
-        mean_rs = rs.rolling(window=window_rs).mean()
-        std_rs = rs.rolling(window=window_rs).std()
-        
-        if len(std_rs) == 0: continue
-        # Avoid division by zero
-        if std_rs.iloc[-1] == 0: continue
-            
-        rs_ratio = 100 + ((rs - mean_rs) / std_rs)
-        
-        # RS-Momentum = ROC(RS-Ratio)
-        # Momentum is the rate of change of the ratio
-        # JdK uses 10-day momentum usually, normalized similarly
-        mom_raw = 100 * (rs_ratio / rs_ratio.shift(1)) # Simple 1-day momentum of ratio? Or 10-day?
-        # Let's use 10-day Rate of Change of RS-Ratio centered around 100
-        # No, standard is: Momentum is calculated on Ratio
-        
-        # Improved approximation:
-        # RS-Momentum = 100 + ((RS-Ratio - MA(RS-Ratio)) / StdDev(RS-Ratio))
-        # Usually faster window
-        
-        mean_mom = rs_ratio.rolling(window=window_mom).mean()
-        std_mom = rs_ratio.rolling(window=window_mom).std()
-        
-        rs_momentum = 100 + ((rs_ratio - mean_mom) / std_mom)
-
-        # Smooth to reduce noise
-        rs_ratio_smooth = rs_ratio.rolling(window=3).mean()
-        rs_momentum_smooth = rs_momentum.rolling(window=3).mean()
-        
-        res = pd.DataFrame({'RSR': rs_ratio_smooth, 'RSM': rs_momentum_smooth}).dropna()
-        if not res.empty:
-            rrg_results[col] = res
-
-    return rrg_results
-
-def main():
-    # Lấy bank rate từ DB (chạy async trong sync context)
-    bank_info = asyncio.run(fetch_bank_rate())
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    
-    # 1. Data Fetching
-    data_raw, bench_df = fetch_data()
-    
-    # 2. Data Processing & Conversion
-    # We need everything in USD terms
-    
-    processed_data = pd.DataFrame(index=data_raw.index)
-    
-    # Get USDVND Rate
-    usdvnd_col = None
-    if 'VND=X' in data_raw.columns:
-        usdvnd_col = data_raw['VND=X']
-    elif isinstance(data_raw.columns, pd.MultiIndex) and 'VND=X' in data_raw.columns.get_level_values(0):
-         pass # Handle multi-index if needed
-         
-    # Flatten MultiIndex if necessary (Yahoo sometimes returns Price -> Ticker)
-    if isinstance(data_raw.columns, pd.MultiIndex):
-        # Assuming level 1 is ticker
-        # Often it comes as (PriceType, Ticker) e.g. ('Close', 'AAPL')
-        # We fetched only 'Close' so it might be just Ticker columns if we did ['Close']
-        pass
-
-    # Quick helper to safely get column
-    def get_col(df, ticker):
-        if ticker in df.columns:
-            return df[ticker]
-        return None
-
-    usd_vnd = get_col(data_raw, 'VND=X')
-    if usd_vnd is None:
-        print("Error: Could not fetch USD/VND rate. Aborting VN30 conversion.")
-        return
-
-    # Process Commodities, Crypto & US Index (Already in USD)
-    for name, ticker in {**COMMODITIES, **CRYPTO, **US_INDEX}.items():
-        s = get_col(data_raw, ticker)
-        if s is not None:
-            processed_data[name] = s
-            
-    # Process VNIndex (Convert VND to USD)
-    for name, ticker in VN_INDEX.items():
-        s = get_col(data_raw, ticker)
-        if s is not None:
-             # Convert to USD. 
-            # Note: Checking if VN stock data is scaled. Usually it's integer VND.
-            try:
-                processed_data[name] = s / usd_vnd
-            except:
-                pass
-
-    # Process Treasury Yields
-    for name in TREASURY_YIELDS.keys():
-        s = get_col(data_raw, name)
-        if s is not None:
-            processed_data[name] = s
+    # JdK-like normalization, computed for all assets in one vectorized pass:
+    # RS-Ratio = 100 + ((RS - MA(RS, 100)) / StdDev(RS, 100))
+    # RS-Momentum = 100 + ((RS-Ratio - MA(RS-Ratio, 10)) / StdDev(RS-Ratio, 10)), both smoothed with a 3-bar SMA
+    # (daily windows; weekly/monthly use the shorter windows from TIMEFRAMES)
+    results = compute_rrg_timeframes(prices, bench, timeframes=TIMEFRAMES, momentum=MOMENTUM_LEVEL, ddof=1)
+    return {tf: rrg_to_frames(rsr, rsm) for tf, (rsr, rsm) in results.items()}
+
+def asset_color(name, bank_label=None):
+    """Màu cố định cho từng nhóm tài sản"""
+    if name == 'PreciousMetals': return '#FFD700' # Gold
+    elif name == 'IndustrialMetals': return '#FF4500' # Orange Red
+    elif name == 'WTI Crude Oil': return '#228B22' # Forest Green
+    elif name in CRYPTO: return '#9370db' # Purple
+    elif name == HOUSING_LABEL: return '#8b4513' # Brown
+    elif bank_label and name == bank_label: return '#00ced1' # Dark Turquoise for Bank Rate
+    elif name.startswith('US02Y'): return '#008080' # Teal
+    elif name.startswith('US10Y'): return '#4682B4' # Steel Blue
+    elif name == 'S&P 500': return '#4169E1' # Royal Blue
+    return '#2f4f4f' # Dark Slate Gray for Stocks
+
+def plot(rrg_map, bank_label, out_path):
+    """Vẽ RRG và lưu PNG"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import matplotlib.patheffects as PathEffects
 
-    # Process Housing
-    housing_data = create_synthetic_housing_data(processed_data.index)
-    processed_data[HOUSING_LABEL] = housing_data
-
-    # Process Bank Interest Rate (synthetic series anchored to annual rate)
-    bank_label = None
-    if bank_info:
-        bank_label = f"{bank_info['bank']} {bank_info['rate']}%({bank_info['term']}-{bank_info['channel']})"
-        bank_series = create_synthetic_bank_rate_data(processed_data.index, bank_info['rate'])
-        bank_series.name = bank_label
-        processed_data[bank_label] = bank_series
-        print(f"✅ Bank rate loaded: {bank_label}")
-    else:
-        print("ℹ️  Không có dữ liệu bank rate, bỏ qua.")
-    
-    # 3. Calculate RRG
-    rrg_map = calculate_rrg(processed_data, bench_df)
-    
-    # 4. Plotting
     fig, ax = plt.subplots(figsize=(14, 14))
     
     # Crosshairs
@@ -408,7 +359,7 @@ def main():
     ax.text(x_lims[0], y_lims[1], 'IMPROVING', ha='left', va='top', color='blue', fontweight='bold', fontsize=14, alpha=0.5)
 
     # Plot Tails and Heads
-    tail_len = 7
+    tail_len = TAIL_LENGTH
     
     # Color mapping categories
     colors_map = {
@@ -423,17 +374,7 @@ def main():
         recent = df.tail(tail_len)
         
         # Determine Color
-        color = 'gray'
-        if name == 'PreciousMetals': color = '#FFD700' # Gold
-        elif name == 'IndustrialMetals': color = '#FF4500' # Orange Red
-        elif name == 'WTI Crude Oil': color = '#228B22' # Forest Green
-        elif name in CRYPTO: color = '#9370db' # Purple
-        elif name == HOUSING_LABEL: color = '#8b4513' # Brown
-        elif bank_label and name == bank_label: color = '#00ced1' # Dark Turquoise for Bank Rate
-        elif name.startswith('US02Y'): color = '#008080' # Teal
-        elif name.startswith('US10Y'): color = '#4682B4' # Steel Blue
-        elif name == 'S&P 500': color = '#4169E1' # Royal Blue
-        else: color = '#2f4f4f' # Dark Slate Gray for Stocks
+        color = asset_color(name, bank_label)
         
         # Special highlight for Major Indices & Treasury Yields
         lw = 1.0
@@ -465,10 +406,98 @@ def main():
     ax.set_ylabel('RS-Momentum (Momentum)', fontsize=12)
     ax.grid(True, linestyle='--', alpha=0.5)
     
-    out_path = os.path.join(OUTPUT_DIR, OUTPUT_FILENAME)
     plt.tight_layout()
     plt.savefig(out_path, dpi=150)
+    plt.close(fig)
     print(f"Chart saved to {out_path}")
 
+def main(render=True):
+    import pandas as pd
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    
+    # 1. Data Fetching (Yahoo, FRED và bank rate từ DB chạy song song, có cache)
+    data_raw, bench_df, bank_info, housing_vnd = fetch_data()
+    
+    # 2. Data Processing & Conversion
+    # We need everything in USD terms
+    
+    processed_data = pd.DataFrame(index=data_raw.index)
+    
+    # Get USDVND Rate
+    usdvnd_col = None
+    if 'VND=X' in data_raw.columns:
+        usdvnd_col = data_raw['VND=X']
+    elif isinstance(data_raw.columns, pd.MultiIndex) and 'VND=X' in data_raw.columns.get_level_values(0):
+         pass # Handle multi-index if needed
+         
+    # Flatten MultiIndex if necessary (Yahoo sometimes returns Price -> Ticker)
+    if isinstance(data_raw.columns, pd.MultiIndex):
+        # Assuming level 1 is ticker
+        # Often it comes as (PriceType, Ticker) e.g. ('Close', 'AAPL')
+        # We fetched only 'Close' so it might be just Ticker columns if we did ['Close']
+        pass
+
+    # Quick helper to safely get column
+    def get_col(df, ticker):
+        if ticker in df.columns:
+            return df[ticker]
+        return None
+
+    usd_vnd = get_col(data_raw, 'VND=X')
+    if usd_vnd is None:
+        print("Error: Could not fetch USD/VND rate. Aborting VN30 conversion.")
+        return
+
+    # Process Commodities, Crypto & US Index (Already in USD)
+    for name, ticker in {**COMMODITIES, **CRYPTO, **US_INDEX}.items():
+        s = get_col(data_raw, ticker)
+        if s is not None:
+            processed_data[name] = s
+            
+    # Process VNIndex (Convert VND to USD)
+    for name, ticker in VN_INDEX.items():
+        s = get_col(data_raw, ticker)
+        if s is not None:
+             # Convert to USD. 
+            # Note: Checking if VN stock data is scaled. Usually it's integer VND.
+            try:
+                processed_data[name] = s / usd_vnd
+            except:
+                pass
+
+    # Process Treasury Yields
+    for name in TREASURY_YIELDS.keys():
+        s = get_col(data_raw, name)
+        if s is not None:
+            processed_data[name] = s
+
+    # Process Housing (real HCMC index from housing_index, VND -> USD; skipped while too short)
+    housing_data = build_housing_series(processed_data.index, housing_vnd, usd_vnd)
+    if housing_data is not None:
+        processed_data[HOUSING_LABEL] = housing_data
+
+    # Process Bank Interest Rate (synthetic series anchored to annual rate)
+    bank_label = None
+    if bank_info:
+        bank_label = f"{bank_info['bank']} {bank_info['rate']}%({bank_info['term']}-{bank_info['channel']})"
+        bank_series = create_synthetic_bank_rate_data(processed_data.index, bank_info['rate'])
+        bank_series.name = bank_label
+        processed_data[bank_label] = bank_series
+        print(f"✅ Bank rate loaded: {bank_label}")
+    else:
+        print("ℹ️  Không có dữ liệu bank rate, bỏ qua.")
+    
+    # 3. Calculate RRG
+    rrg_by_tf = calculate_rrg(processed_data, bench_df)
+    rrg_map = rrg_by_tf.get('D', {})
+    
+    # 4. Publish JSON + Plotting (chỉ vẽ lại PNG khi dữ liệu thay đổi)
+    publish('assets', rrg_map, timeframes=rrg_by_tf,
+            render=(lambda path: plot(rrg_map, bank_label, path)) if render else None,
+            image_filename=OUTPUT_FILENAME, output_dir=OUTPUT_DIR,
+            colors={name: asset_color(name, bank_label) for name in rrg_map},
+            tail_length=TAIL_LENGTH)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+RRG Engine
+Vectorized Relative Rotation Graph (RS-Ratio / RS-Momentum) over a whole
+(dates x symbols) price panel, weekly/monthly RRGs resampled from the same daily
+panel, plus an incremental stream that appends new bars without recomputing history.
+
+Usage (benchmark):
+    python3 rrg_engine.py [n_symbols] [n_days]
+"""
+
+import sys
+import time
+import warnings
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# Methods
+METHOD_ZSCORE = 'zscore'   # RSR = 100 + (RS - MA) / StdDev  (JdK-like normalization)
+METHOD_RATIO = 'ratio'     # RSR = 100 * RS / MA(RS)         (simple JdK ratio approximation)
+
+# What RS-Momentum is measured on (zscore method)
+MOMENTUM_ROC = 'roc'       # 1-bar rate of change of RS-Ratio
+MOMENTUM_LEVEL = 'level'   # RS-Ratio itself, normalized over the momentum window
+
+# Timeframes derived from a daily panel
+TIMEFRAME_DAILY = 'D'
+TIMEFRAME_WEEKLY = 'W'
+TIMEFRAME_MONTHLY = 'M'
+DEFAULT_TIMEFRAMES = {TIMEFRAME_DAILY: {}, TIMEFRAME_WEEKLY: {}, TIMEFRAME_MONTHLY: {}}
+
+# Period-end resample rules; weeks end on Sunday so 7-day (crypto) and exchange calendars both work
+_RESAMPLE_RULES = {TIMEFRAME_WEEKLY: 'W-SUN', TIMEFRAME_MONTHLY: 'ME'}
+
+# Relative variance below which a window is treated as constant (pandas returns std=0 there)
+_ZERO_VAR_EPS = 1e-12
+
+
+# ================================
+#  VECTORIZED ROLLING MOMENTS
+# ================================
+def _rolling_sums(values, window):
+    """Rolling sum and count of valid values along axis 0 via cumulative sums (O(1) per step)."""
+    valid = ~np.isnan(values)
+    filled = np.where(valid, values, 0.0)
+    zeros = np.zeros((1, values.shape[1]))
+    csum = np.vstack([zeros, np.cumsum(filled, axis=0)])
+    ccount = np.vstack([zeros, np.cumsum(valid, axis=0)])
+    sums = np.full(values.shape, np.nan)
+    counts = np.zeros(values.shape)
+    if values.shape[0] >= window:
+        sums[window - 1:] = csum[window:] - csum[:-window]
+        counts[window - 1:] = ccount[window:] - ccount[:-window]
+    return sums, counts
+
+
+def _column_center(values):
+    """Per-column mean of valid values (0 for all-NaN columns), used to center before summing."""
+    if not values.size:
+        return 0.0
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        center = np.nanmean(values, axis=0)
+    return np.where(np.isnan(center), 0.0, center)
+
+
+def rolling_mean(values, window):
+    """Rolling mean with pandas `min_periods=window` semantics (NaN unless the window is full)."""
+    values = np.asarray(values, dtype=float)
+    if window <= 1:
+        return values.copy()
+    center = _column_center(values)
+    sums, counts = _rolling_sums(values - center, window)
+    return np.where(counts == window, sums / window + center, np.nan)
+
+
+def rolling_mean_std(values, window, ddof=0):
+    """Rolling mean and standard deviation along axis 0 for every column at once."""
+    values = np.asarray(values, dtype=float)
+    center = _column_center(values)
+    shifted = values - center  # Centering keeps the sum-of-squares cancellation small
+    s1, counts = _rolling_sums(shifted, window)
+    s2, _ = _rolling_sums(shifted * shifted, window)
+    full = counts == window
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(full, s1 / window + center, np.nan)
+        var = (s2 - s1 * s1 / window) / (window - ddof)
+        var = np.where(var <= _ZERO_VAR_EPS * (s2 / window), 0.0, var)
+        std = np.where(full, np.sqrt(var), np.nan)
+    return mean, std
+
+
+def _shift1(values):
+    out = np.full(values.shape, np.nan)
+    out[1:] = values[:-1]
+    return out
+
+
+# ================================
+#  BATCH ENGINE
+# ================================
+def relative_strength(prices, benchmark=None):
+    """
+    Relative strength panel.
+
+    Args:
+        prices: DataFrame (dates x symbols)
+        benchmark: None (prices are already relative), a Series aligned on dates,
+                   or the name of a column in `prices` to use as benchmark
+    """
+    if benchmark is None:
+        return prices
+    if isinstance(benchmark, str):
+        return prices.drop(columns=[benchmark]).div(prices[benchmark], axis=0)
+    return prices.div(benchmark.reindex(prices.index), axis=0)
+
+
+def compute_rrg(prices, benchmark=None, window_ratio=100, window_mom=25, smooth_window=3,
+                method=METHOD_ZSCORE, momentum=MOMENTUM_ROC, ddof=0, scale=100.0):
+    """
+    Compute RS-Ratio and RS-Momentum for every symbol of a price panel in one pass.
+
+    Args:
+        prices: DataFrame (dates x symbols)
+        benchmark: see `relative_strength`
+        window_ratio: Window of the RS-Ratio normalization
+        window_mom: Window of the RS-Momentum normalization
+        smooth_window: SMA applied to both outputs (1 = no smoothing)
+        method: METHOD_ZSCORE or METHOD_RATIO
+        momentum: MOMENTUM_ROC or MOMENTUM_LEVEL (zscore method only)
+        ddof: Degrees of freedom of the standard deviation (0 = population, 1 = pandas default)
+        scale: Multiplier applied to RS before normalizing
+
+    Returns:
+        (rsr, rsm) DataFrames with the same index/columns as the RS panel
+    """
+    rs_df = relative_strength(prices, benchmark)
+    rs = scale * rs_df.to_numpy(dtype=float)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if method == METHOD_ZSCORE:
+            mean_r, std_r = rolling_mean_std(rs, window_ratio, ddof)
+            rsr = 100 + (rs - mean_r) / std_r
+            if momentum == MOMENTUM_ROC:
+                mom_src = 100 * (rsr / _shift1(rsr) - 1)
+            else:
+                mom_src = rsr
+            mom_src = np.where(np.isfinite(mom_src), mom_src, np.nan)
+            mean_m, std_m = rolling_mean_std(mom_src, window_mom, ddof)
+            rsm = 100 + (mom_src - mean_m) / std_m
+        elif method == METHOD_RATIO:
+            rsr = 100 * (rs / rolling_mean(rs, window_ratio))
+            rsr = np.where(np.isfinite(rsr), rsr, np.nan)
+            rsm = 100 * (rsr / rolling_mean(rsr, window_mom))
+        else:
+            raise ValueError(f"Unknown RRG method: {method}")
+
+    rsr = np.where(np.isfinite(rsr), rsr, np.nan)
+    rsm = np.where(np.isfinite(rsm), rsm, np.nan)
+    if smooth_window > 1:
+        rsr = rolling_mean(rsr, smooth_window)
+        rsm = rolling_mean(rsm, smooth_window)
+
+    return (pd.DataFrame(rsr, index=rs_df.index, columns=rs_df.columns),
+            pd.DataFrame(rsm, index=rs_df.index, columns=rs_df.columns))
+
+
+def rrg_to_frames(rsr, rsm):
+    """Split panels into {symbol: DataFrame(RSR, RSM)} with NaN rows dropped (legacy per-symbol format)."""
+    frames = {}
+    for col in rsr.columns:
+        df = pd.DataFrame({'RSR': rsr[col], 'RSM': rsm[col]}).dropna()
+        if not df.empty:
+            frames[col] = df
+    return frames
+
+
+# ================================
+#  MULTI-TIMEFRAME
+# ================================
+def resample_panel(prices, timeframe):
+    """
+    Resample a daily panel (or Series) to the last close of each week/month.
+    The current, still-forming period is kept so the RRG head is up to date.
+    """
+    if timeframe == TIMEFRAME_DAILY:
+        return prices
+    rule = _RESAMPLE_RULES.get(timeframe)
+    if rule is None:
+        raise ValueError(f"Unknown RRG timeframe: {timeframe}")
+    try:
+        resampled = prices.resample(rule).last()
+    except ValueError:
+        # pandas < 2.2 only knows the old month-end alias
+        resampled = prices.resample(rule.replace('ME', 'M')).last()
+    return resampled.dropna(how='all')
+
+
+def min_bars(window_ratio=100, window_mom=25, smooth_window=3, method=METHOD_ZSCORE,
+             momentum=MOMENTUM_ROC, **_):
+    """Number of bars needed before compute_rrg produces its first RSM value."""
+    extra = 1 if method == METHOD_ZSCORE and momentum == MOMENTUM_ROC else 0
+    return window_ratio + window_mom + max(smooth_window, 1) - 2 + extra
+
+
+def compute_rrg_timeframes(prices, benchmark=None, timeframes=DEFAULT_TIMEFRAMES, **params):
+    """
+    RRG for several timeframes from one daily panel (no extra downloads).
+
+    Args:
+        prices: Daily DataFrame (dates x symbols) with a DatetimeIndex
+        benchmark: see `relative_strength`; a Series is resampled like the panel
+        timeframes: {timeframe: compute_rrg parameter overrides}, e.g.
+                    {'D': {}, 'W': {'window_ratio': 10, 'window_mom': 4}}
+        params: compute_rrg parameters shared by every timeframe
+
+    Returns:
+        {timeframe: (rsr, rsm)}; timeframes without enough bars are skipped
+    """
+    results = {}
+    for timeframe, overrides in timeframes.items():
+        tf_params = {**params, **overrides}
+        tf_prices = resample_panel(prices, timeframe)
+        tf_benchmark = resample_panel(benchmark, timeframe) if isinstance(benchmark, pd.Series) else benchmark
+        needed = min_bars(**tf_params)
+        if len(tf_prices) < needed:
+            print(f"ℹ️  RRG {timeframe}: {len(tf_prices)} bars < {needed} needed, skipped")
+            continue
+        results[timeframe] = compute_rrg(tf_prices, tf_benchmark, **tf_params)
+    return results
+
+
+# ================================
+#  INCREMENTAL ENGINE
+# ================================
+class _RollingWindow:
+    """Ring buffer of the last `window` rows with running sums, O(n_symbols) per push."""
+
+    def __init__(self, window, n, ddof=0):
+        self.window = window
+        self.ddof = ddof
+        self.buf = np.full((window, n), np.nan)
+        self.pos = 0
+        self.pushes = 0
+        self.anchor = np.full(n, np.nan)   # First valid value per column, used for centering
+        self.s1 = np.zeros(n)
+        self.s2 = np.zeros(n)
+        self.valid = np.zeros(n)
+
+    def _resum(self):
+        shifted = self.buf - self.anchor
+        ok = ~np.isnan(shifted)
+        filled = np.where(ok, shifted, 0.0)
+        self.s1 = filled.sum(axis=0)
+        self.s2 = (filled * filled).sum(axis=0)
+        self.valid = ok.sum(axis=0).astype(float)
+
+    def push(self, x):
+        x = np.asarray(x, dtype=float)
+        self.anchor = np.where(np.isnan(self.anchor), x, self.anchor)
+        old = self.buf[self.pos] - self.anchor
+        new = x - self.anchor
+        old_ok, new_ok = ~np.isnan(old), ~np.isnan(new)
+        self.s1 += np.where(new_ok, new, 0.0) - np.where(old_ok, old, 0.0)
+        self.s2 += np.where(new_ok, new * new, 0.0) - np.where(old_ok, old * old, 0.0)
+        self.valid += new_ok.astype(float) - old_ok.astype(float)
+        self.buf[self.pos] = x
+        self.pos = (self.pos + 1) % self.window
+        self.pushes += 1
+        if self.pushes % self.window == 0:
+            self._resum()  # Amortized O(1): bounds floating-point drift of the running sums
+
+    def mean(self):
+        full = self.valid == self.window
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(full, self.s1 / self.window + self.anchor, np.nan)
+
+    def mean_std(self):
+        full = self.valid == self.window
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(full, self.s1 / self.window + self.anchor, np.nan)
+            var = (self.s2 - self.s1 * self.s1 / self.window) / (self.window - self.ddof)
+            var = np.where(var <= _ZERO_VAR_EPS * (self.s2 / self.window), 0.0, var)
+            return mean, np.where(full, np.sqrt(var), np.nan)
+
+
+class RRGStream:
+    """
+    Incremental RRG: `append()` one bar for all symbols and get the new RSR/RSM row
+    in O(n_symbols), with results matching `compute_rrg` on the full history.
+    """
+
+    def __init__(self, symbols, window_ratio=100, window_mom=25, smooth_window=3,
+                 method=METHOD_ZSCORE, momentum=MOMENTUM_ROC, ddof=0, scale=100.0, tail_length=7):
+        self.symbols = list(symbols)
+        n = len(self.symbols)
+        self.method = method
+        self.momentum = momentum
+        self.scale = scale
+        self.smooth_window = smooth_window
+        self.ratio_window = _RollingWindow(window_ratio, n, ddof)
+        self.mom_window = _RollingWindow(window_mom, n, ddof)
+        self.smooth_rsr = _RollingWindow(smooth_window, n)
+        self.smooth_rsm = _RollingWindow(smooth_window, n)
+        self.prev_rsr = np.full(n, np.nan)
+        self.tail = deque(maxlen=tail_length)  # (date, rsr_row, rsm_row)
+
+    @classmethod
+    def from_history(cls, prices, benchmark=None, **kwargs):
+        rs = relative_strength(prices, benchmark)
+        stream = cls(rs.columns, **kwargs)
+        for date, row in zip(rs.index, rs.to_numpy(dtype=float)):
+            stream._append_rs(date, row)
+        return stream
+
+    def append(self, date, prices, benchmark_value=None):
+        """
+        Append one bar.
+
+        Args:
+            date: Bar date
+            prices: Mapping/Series {symbol: price} or array ordered like `symbols`
+            benchmark_value: Benchmark price for this bar (None if prices are already relative)
+        """
+        if isinstance(prices, (dict, pd.Series)):
+            row = np.array([float(prices.get(s, np.nan)) for s in self.symbols])
+        else:
+            row = np.asarray(prices, dtype=float)
+        if benchmark_value is not None:
+            row = row / float(benchmark_value)
+        return self._append_rs(date, row)
+
+    def _append_rs(self, date, rs_row):
+        rs = self.scale * rs_row
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if self.method == METHOD_ZSCORE:
+                self.ratio_window.push(rs)
+                mean_r, std_r = self.ratio_window.mean_std()
+                rsr = 100 + (rs - mean_r) / std_r
+                if self.momentum == MOMENTUM_ROC:
+                    mom_src = 100 * (rsr / self.prev_rsr - 1)
+                else:
+                    mom_src = rsr
+                self.prev_rsr = rsr
+                mom_src = np.where(np.isfinite(mom_src), mom_src, np.nan)
+                self.mom_window.push(mom_src)
+                mean_m, std_m = self.mom_window.mean_std()
+                rsm = 100 + (mom_src - mean_m) / std_m
+            else:
+                self.ratio_window.push(rs)
+                rsr = 100 * (rs / self.ratio_window.mean())
+                rsr = np.where(np.isfinite(rsr), rsr, np.nan)
+                self.mom_window.push(rsr)
+                rsm = 100 * (rsr / self.mom_window.mean())
+
+        rsr = np.where(np.isfinite(rsr), rsr, np.nan)
+        rsm = np.where(np.isfinite(rsm), rsm, np.nan)
+        if self.smooth_window > 1:
+            self.smooth_rsr.push(rsr)
+            self.smooth_rsm.push(rsm)
+            rsr, rsm = self.smooth_rsr.mean(), self.smooth_rsm.mean()
+        self.tail.append((date, rsr, rsm))
+        return rsr, rsm
+
+    def tail_frames(self):
+        """{symbol: DataFrame(RSR, RSM)} of the retained tail, NaN rows dropped."""
+        if not self.tail:
+            return {}
+        dates = [d for d, _, _ in self.tail]
+        rsr = pd.DataFrame([r for _, r, _ in self.tail], index=dates, columns=self.symbols)
+        rsm = pd.DataFrame([m for _, _, m in self.tail], index=dates, columns=self.symbols)
+        return rrg_to_frames(rsr, rsm)
+
+
+# ================================
+#  BENCHMARK
+# ================================
+def _legacy_calculate_rrg_smoothed(series, window_ratio=100, window_mom=25, smooth_window=3):
+    """Per-symbol pandas implementation previously copy-pasted in the RRG chart scripts."""
+    rs_scaled = 100 * series
+    mean_r = rs_scaled.rolling(window=window_ratio).mean()
+    std_r = rs_scaled.rolling(window=window_ratio).std(ddof=0)
+    rsr_raw = 100 + ((rs_scaled - mean_r) / std_r)
+    roc = 100 * ((rsr_raw / rsr_raw.shift(1)) - 1)
+    mean_m = roc.rolling(window=window_mom).mean()
+    std_m = roc.rolling(window=window_mom).std(ddof=0)
+    rsm_raw = 100 + ((roc - mean_m) / std_m)
+    rsr_smoothed = rsr_raw.rolling(window=smooth_window).mean()
+    rsm_smoothed = rsm_raw.rolling(window=smooth_window).mean()
+    return pd.DataFrame({'RSR': rsr_smoothed, 'RSM': rsm_smoothed}).dropna()
+
+
+def benchmark(n_symbols=1000, n_days=400, n_appends=20, seed=0):
+    """Compare vectorized, per-symbol pandas and incremental throughput on synthetic random walks."""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range('2020-01-01', periods=n_days, freq='D')
+    returns = rng.normal(0, 0.02, size=(n_days, n_symbols))
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=dates,
+                          columns=[f"S{i:04d}" for i in range(n_symbols)])
+    bench = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_days))), index=dates)
+    rs = prices.div(bench, axis=0)
+    bars = n_symbols * n_days
+
+    started = time.perf_counter()
+    rsr, rsm = compute_rrg(prices, bench)
+    t_vec = time.perf_counter() - started
+
+    started = time.perf_counter()
+    legacy = {col: _legacy_calculate_rrg_smoothed(rs[col]) for col in rs.columns}
+    t_loop = time.perf_counter() - started
+
+    max_diff = 0.0
+    for col, df in legacy.items():
+        max_diff = max(max_diff,
+                       float(np.nanmax(np.abs(rsr[col].loc[df.index] - df['RSR']))),
+                       float(np.nanmax(np.abs(rsm[col].loc[df.index] - df['RSM']))))
+
+    stream = RRGStream.from_history(prices.iloc[:-n_appends], bench.iloc[:-n_appends])
+    started = time.perf_counter()
+    for date in dates[-n_appends:]:
+        last_rsr, last_rsm = stream.append(date, prices.loc[date].to_numpy(), bench.loc[date])
+    t_inc = time.perf_counter() - started
+    stream_diff = max(float(np.nanmax(np.abs(last_rsr - rsr.iloc[-1].to_numpy()))),
+                      float(np.nanmax(np.abs(last_rsm - rsm.iloc[-1].to_numpy()))))
+
+    print(f"RRG benchmark: {n_symbols} symbols x {n_days} days")
+    print(f"  vectorized panel : {t_vec:8.3f}s  {bars / t_vec:12,.0f} symbol-bars/s")
+    print(f"  per-symbol pandas: {t_loop:8.3f}s  {bars / t_loop:12,.0f} symbol-bars/s  ({t_loop / t_vec:.1f}x slower)")
+    print(f"  incremental      : {t_inc / n_appends * 1000:8.3f}ms per appended bar for all symbols")
+    print(f"  max |diff| vs per-symbol pandas: {max_diff:.2e}, incremental vs batch: {stream_diff:.2e}")
+
+
+if __name__ == "__main__":
+    n_symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_days = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    benchmark(n_symbols, n_days)
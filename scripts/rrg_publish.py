@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+RRG Publish
+Writes a compact JSON artifact (per-symbol RSR/RSM tails, quadrant, color) for every
+RRG chart and only re-renders the PNG when the underlying data changed.
+"""
+
+import hashlib
+import json
+import math
+import os
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = os.path.join(BASE_DIR, '../www')
+
+DEFAULT_TAIL_LENGTH = 7
+DEFAULT_CENTER = 100.0
+VALUE_DECIMALS = 4   # RSR/RSM precision in the JSON (well below what a chart can show)
+
+QUADRANT_LEADING = 'leading'
+QUADRANT_WEAKENING = 'weakening'
+QUADRANT_LAGGING = 'lagging'
+QUADRANT_IMPROVING = 'improving'
+
+
+def quadrant(rsr, rsm, center=DEFAULT_CENTER):
+    """RRG quadrant of a point"""
+    if rsr >= center:
+        return QUADRANT_LEADING if rsm >= center else QUADRANT_WEAKENING
+    return QUADRANT_IMPROVING if rsm >= center else QUADRANT_LAGGING
+
+
+def _format_index(value):
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%d')
+    return int(value)
+
+
+def _round_values(values):
+    return [None if math.isnan(v) else round(float(v), VALUE_DECIMALS) for v in values]
+
+
+def _symbols_payload(rrg_data, colors, labels, tail_length, center):
+    symbols = []
+    for symbol, df in rrg_data.items():
+        tail = df.tail(tail_length)
+        if tail.empty:
+            continue
+        rsr = _round_values(tail['RSR'].values)
+        rsm = _round_values(tail['RSM'].values)
+        symbols.append({
+            "symbol": symbol,
+            "label": labels.get(symbol, symbol),
+            "color": colors.get(symbol),
+            "quadrant": quadrant(rsr[-1], rsm[-1], center),
+            "dates": [_format_index(i) for i in tail.index],
+            "rsr": rsr,
+            "rsm": rsm,
+        })
+    return symbols
+
+
+def build_payload(chart, rrg_data, colors=None, labels=None, tail_length=DEFAULT_TAIL_LENGTH,
+                  center=DEFAULT_CENTER, timeframes=None):
+    """
+    Data-only RRG payload a client can plot.
+
+    Args:
+        chart: Chart name (e.g. 'crypto')
+        rrg_data: {symbol: DataFrame(RSR, RSM)} as returned by rrg_engine.rrg_to_frames
+        colors: Optional {symbol: color}
+        labels: Optional {symbol: display label}
+        tail_length: Number of most recent points kept per symbol
+        center: Quadrant center (100 for every chart in this repo)
+        timeframes: Optional {timeframe: rrg_data} published under "timeframes"
+                    ("symbols" keeps the main/daily view)
+    """
+    colors = colors or {}
+    labels = labels or {}
+    payload = {"chart": chart, "center": center, "tail": tail_length,
+               "symbols": _symbols_payload(rrg_data, colors, labels, tail_length, center)}
+    if timeframes:
+        payload["timeframes"] = {tf: _symbols_payload(data, colors, labels, tail_length, center)
+                                 for tf, data in timeframes.items()}
+    return payload
+
+
+def content_hash(payload):
+    """Hash of the plotted data only (no timestamps), used to decide whether to re-render"""
+    raw = json.dumps(payload, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:16]
+
+
+def _read_json(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"⚠️ Could not read {path}: {e}")
+        return {}
+
+
+def publish(chart, rrg_data, render=None, image_filename=None, colors=None, labels=None,
+            tail_length=DEFAULT_TAIL_LENGTH, center=DEFAULT_CENTER, output_dir=OUTPUT_DIR, force=False,
+            timeframes=None):
+    """
+    Write `<chart>_rrg.json` and (optionally) re-render the PNG.
+
+    Args:
+        render: Callable taking the image path, or None to skip rendering
+        image_filename: PNG name inside `output_dir`
+        force: Re-render even if the data did not change
+        timeframes: Optional {timeframe: rrg_data}, see `build_payload`
+
+    Returns:
+        The published payload (with "hash", "image_hash" and "updated")
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    payload = build_payload(chart, rrg_data, colors, labels, tail_length, center, timeframes)
+    # The PNG only shows the main view, so only that decides whether to re-render
+    digest = content_hash({key: payload[key] for key in ("chart", "center", "tail", "symbols")})
+
+    json_path = os.path.join(output_dir, f"{chart}_rrg.json")
+    previous = _read_json(json_path)
+    # Hash of the data the current PNG was rendered from (survives runs without rendering)
+    image_hash = previous.get("image_hash")
+
+    if render is not None and image_filename:
+        image_path = os.path.join(output_dir, image_filename)
+        if force or image_hash != digest or not os.path.exists(image_path):
+            render(image_path)
+            image_hash = digest
+        else:
+            print(f"⏭️  {chart}: data unchanged ({digest}), keeping {image_filename}")
+
+    payload.update({
+        "hash": digest,
+        "image": image_filename,
+        "image_hash": image_hash,
+        "updated": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+    })
+    tmp_path = f"{json_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, json_path)
+    print(f"📄 RRG data saved to {json_path} ({len(payload['symbols'])} symbols)")
+    return payload
@@ -1,15 +1,15 @@
-import requests
+import asyncio
+import json
 import os
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-from datetime import datetime, timedelta
-import psycopg2
+import time
+from datetime import date, datetime, timedelta
 from dotenv import load_dotenv
 import random
 import colorsys
 
+# Heavy libraries (pandas, matplotlib, httpx, psycopg2) are imported inside the functions
+# that need them, so importing this module is cheap and run_rrg_charts.py can reuse one process.
+
 # Load environment variables
 # Try loading from current directory first (for server), then parent directory (for local dev)
 current_dir_env = os.path.join(os.path.dirname(__file__), '.env')
@@ -26,6 +26,8 @@ else:
 
 # --- CẤU HÌNH ---
 def get_symbols_from_db():
+    import psycopg2
+
     try:
         conn = psycopg2.connect(
             host=os.getenv('DB_HOST'),
@@ -59,50 +61,92 @@ def get_symbols_from_db():
         # Fallback list if DB fails
         return ['PNJ', 'VCB', 'BVH', 'VNM', 'FPT', 'MSN', 'SSI', 'HPG', 'VIC', 'BCM', 'PLX', 'MWG']
 
-SYMBOLS = get_symbols_from_db()
 BENCHMARK = 'VNINDEX'
 DAYS_BACK = 150
+RRG_WINDOW = 14  # Window chuẩn thường là 10-14
 TAIL_LENGTH = 7  # Độ dài đuôi
+# RRG theo nhiều khung thời gian, tất cả tính từ cùng một panel ngày (không tải thêm dữ liệu).
+# Khung không đủ số nến (vd. tháng với ~180 ngày) sẽ được bỏ qua.
+TIMEFRAMES = {
+    'D': {'window_ratio': RRG_WINDOW, 'window_mom': RRG_WINDOW},
+    'W': {'window_ratio': 10, 'window_mom': 10},
+    'M': {'window_ratio': 6, 'window_mom': 6},
+}
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 OUTPUT_DIR = os.path.join(BASE_DIR, '../www')
 OUTPUT_FILENAME = 'vnstock_rrgchart.png'
-
-# Ensure output directory exists
-os.makedirs(OUTPUT_DIR, exist_ok=True)
-
 FULL_OUTPUT_PATH = os.path.join(OUTPUT_DIR, OUTPUT_FILENAME)
 
 # Cấu hình API KBSec
 KBSEC_BASE_URL = "https://kbbuddywts.kbsec.com.vn/iis-server/investment"
+FETCH_CONCURRENCY = 8     # Số request song song tới KBSec
+REQUEST_TIMEOUT = 15
+BARS_CACHE_FILE = os.path.join(BASE_DIR, 'vnstock_daily_bars_cache.json')
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 }
 
-def get_date_range_strings(days=150):
+def get_date_range(days=150):
     end_date = datetime.now()
     start_date = end_date - timedelta(days=days)
     start_date_buffer = start_date - timedelta(days=30) # Buffer dài hơn chút để an toàn
-    
-    # Format: dd-mm-yyyy
-    return start_date_buffer.strftime("%d-%m-%Y"), end_date.strftime("%d-%m-%Y")
+    return start_date_buffer.date(), end_date.date()
+
+def load_bars_cache():
+    """Đọc cache nến ngày: {symbol: {"from": "YYYY-MM-DD", "dates": [...], "closes": [...]}}"""
+    if not os.path.exists(BARS_CACHE_FILE):
+        return {}
+    try:
+        with open(BARS_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if isinstance(cache, dict):
+            return cache
+    except Exception as e:
+        print(f"⚠️ Không đọc được cache nến ngày: {e}")
+    return {}
+
+def save_bars_cache(cache):
+    """Lưu cache nến ngày cho lần chạy sau"""
+    try:
+        tmp_path = f"{BARS_CACHE_FILE}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, separators=(',', ':'))
+        os.replace(tmp_path, BARS_CACHE_FILE)
+    except Exception as e:
+        print(f"⚠️ Không lưu được cache nến ngày: {e}")
 
-def fetch_data(symbol, start_date_str, end_date_str):
+def merge_bars(cached, bars, start_date):
+    """Gộp nến mới vào cache (nến mới ghi đè cùng ngày), bỏ các ngày trước start_date"""
+    merged = dict(zip(cached.get("dates", []), cached.get("closes", []))) if cached else {}
+    merged.update(bars)
+    start_str = start_date.isoformat()
+    dates = sorted(d for d in merged if d >= start_str)
+    # "from": cache đã đầy đủ kể từ ngày này (kể cả khi ngày đó không có phiên giao dịch)
+    return {"from": start_str, "dates": dates, "closes": [merged[d] for d in dates]}
+
+async def fetch_data(client, symbol, start_date, end_date):
+    """
+    Tải nến ngày từ KBSec trong khoảng [start_date, end_date].
+
+    Returns:
+        Dictionary {"YYYY-MM-DD": close}, hoặc None nếu lỗi
+    """
     try:
         if symbol == 'VNINDEX':
             url = f"{KBSEC_BASE_URL}/index/VNINDEX/data_day"
         else:
             url = f"{KBSEC_BASE_URL}/stocks/{symbol}/data_day"
-            
+
         params = {
-            'sdate': start_date_str,
-            'edate': end_date_str
+            # Format: dd-mm-yyyy
+            'sdate': start_date.strftime("%d-%m-%Y"),
+            'edate': end_date.strftime("%d-%m-%Y")
         }
-        
-        response = requests.get(url, params=params, headers=HEADERS)
-        
+
+        response = await client.get(url, params=params)
+
         if response.status_code != 200:
-            print(f"Error fetching {symbol}: HTTP {response.status_code} - {response.reason}")
-            # print(f"Response content: {response.text[:200]}")
+            print(f"Error fetching {symbol}: HTTP {response.status_code} - {response.reason_phrase}")
             return None
 
         try:
@@ -111,55 +155,85 @@ def fetch_data(symbol, start_date_str, end_date_str):
             print(f"Error parsing JSON for {symbol}: {json_err}")
             return None
 
-        if 'data_day' in data and data['data_day']:
-            df = pd.DataFrame(data['data_day'])
-            
-            # KBSec returns data with keys: t (time), o, h, l, c (close), v (volume)
-            # 't' format: "2026-01-28 07:00"
-            df['date'] = pd.to_datetime(df['t'])
-            
-            # Convert close price to numeric (sometimes it is string)
-            df['close'] = pd.to_numeric(df['c'])
-            
-            df.set_index('date', inplace=True)
-            df = df[['close']] # Keep only close price
-            return df
-
-        return None
+        # KBSec returns data with keys: t (time), o, h, l, c (close), v (volume)
+        # 't' format: "2026-01-28 07:00"; close price is sometimes a string
+        return {row['t'][:10]: float(row['c']) for row in data.get('data_day') or []}
     except Exception as e:
         print(f"Error fetching {symbol}: {e}")
         return None
 
-def calculate_rrg_components(stock_df, benchmark_df, window=14): # Window chuẩn thường là 10-14
-    # Merge dữ liệu
-    df = pd.merge(stock_df, benchmark_df, left_index=True, right_index=True, suffixes=('_stock', '_index'))
-    
-    # 1. RS = Stock / Index
-    df['rs'] = df['close_stock'] / df['close_index']
-    
-    # 2. RSR = 100 + ((RS - Mean(RS)) / Std(RS)) -> Cách tính chuẩn hóa (Normalized)
-    # Hoặc cách JdK xấp xỉ đơn giản: 100 * (RS / MA(RS))
-    # Ở đây dùng cách xấp xỉ JdK ratio để ra số quanh 100
-    df['rs_mean'] = df['rs'].rolling(window=window).mean()
-    df['RSR'] = 100 * (df['rs'] / df['rs_mean'])
-    
-    # 3. RSM = Động lượng của RSR
-    # RSM đo tốc độ thay đổi của RSR
-    df['rsr_mean'] = df['RSR'].rolling(window=window).mean()
-    df['RSM'] = 100 * (df['RSR'] / df['rsr_mean'])
-    
-    df.dropna(inplace=True)
-    return df[['RSR', 'RSM']]
-
-def get_random_dark_color():
-    """Generates a random dark/bold color."""
-    h = random.random()
-    s = 0.8 + (random.random() * 0.2)  # High saturation (0.8 - 1.0)
-    v = 0.3 + (random.random() * 0.4)  # Low-Medium brightness (0.3 - 0.7) for distinct dark colors
+async def fetch_symbol(client, semaphore, symbol, cache, start_date, end_date, stats):
+    """
+    Lấy chuỗi giá đóng cửa của một mã, chỉ tải các ngày kể từ nến cuối trong cache
+    (tải lại cả nến cuối để cập nhật phiên đang chạy). Cập nhật cache tại chỗ.
+    """
+    cached = cache.get(symbol)
+    if cached and cached.get("dates") and cached.get("from", "9999") <= start_date.isoformat():
+        fetch_from = max(date.fromisoformat(cached["dates"][-1]), start_date)
+        stats["hits"] += 1
+    else:
+        cached = None
+        fetch_from = start_date
+        stats["misses"] += 1
+
+    async with semaphore:
+        started = time.perf_counter()
+        bars = await fetch_data(client, symbol, fetch_from, end_date)
+        stats["latencies"].append(time.perf_counter() - started)
+
+    if bars is None and cached is None:
+        return None
+    entry = merge_bars(cached, bars or {}, start_date)
+    cache[symbol] = entry
+    if not entry["dates"]:
+        return None
+    import pandas as pd
+    return pd.Series(entry["closes"], index=pd.to_datetime(entry["dates"]), name='close')
+
+async def fetch_all(symbols, start_date, end_date):
+    """
+    Tải song song (giới hạn FETCH_CONCURRENCY) benchmark và các mã qua một client keep-alive.
+
+    Returns:
+        Dictionary {symbol: Series giá đóng cửa} cho các mã lấy được dữ liệu
+    """
+    import httpx
+
+    cache = load_bars_cache()
+    stats = {"hits": 0, "misses": 0, "latencies": []}
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+    limits = httpx.Limits(max_connections=FETCH_CONCURRENCY, max_keepalive_connections=FETCH_CONCURRENCY)
+    all_symbols = list(dict.fromkeys([BENCHMARK, *symbols]))
+
+    async with httpx.AsyncClient(headers=HEADERS, timeout=REQUEST_TIMEOUT, limits=limits) as client:
+        series = await asyncio.gather(*(
+            fetch_symbol(client, semaphore, s, cache, start_date, end_date, stats) for s in all_symbols
+        ))
+
+    save_bars_cache(cache)
+
+    latencies = sorted(stats["latencies"])
+    if latencies:
+        total = stats["hits"] + stats["misses"]
+        print(f"📊 KBSec: {len(latencies)} requests, latency avg {sum(latencies) / len(latencies) * 1000:.0f}ms, "
+              f"p50 {latencies[len(latencies) // 2] * 1000:.0f}ms, max {latencies[-1] * 1000:.0f}ms; "
+              f"cache hit rate {stats['hits']}/{total} ({stats['hits'] / total:.0%})")
+    return {s: sr for s, sr in zip(all_symbols, series) if sr is not None}
+
+def get_random_dark_color(seed=None):
+    """Generates a random dark/bold color (seeded by symbol so it stays the same between runs)."""
+    rng = random.Random(seed)
+    h = rng.random()
+    s = 0.8 + (rng.random() * 0.2)  # High saturation (0.8 - 1.0)
+    v = 0.3 + (rng.random() * 0.4)  # Low-Medium brightness (0.3 - 0.7) for distinct dark colors
     r, g, b = colorsys.hsv_to_rgb(h, s, v)
     return '#{:02x}{:02x}{:02x}'.format(int(r*255), int(g*255), int(b*255))
 
-def plot_rrg_and_save(rrg_data):
+def plot_rrg_and_save(rrg_data, output_path=FULL_OUTPUT_PATH):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
     fig, ax = plt.subplots(figsize=(12, 10))
     
     # --- TÍNH TOÁN GIỚI HẠN TRỤC TỰ ĐỘNG (AUTO SCALING) ---
@@ -202,7 +276,7 @@ def plot_rrg_and_save(rrg_data):
         tail = df.tail(TAIL_LENGTH)
         if tail.empty: continue
             
-        c = get_random_dark_color()
+        c = get_random_dark_color(symbol)
         
         # Vẽ đuôi
         # ax.plot(tail['RSR'], tail['RSM'], color=c, linewidth=2, alpha=0.6, label=symbol)
@@ -234,33 +308,51 @@ def plot_rrg_and_save(rrg_data):
     ax.set_ylim(min_lim, max_lim)
     
     plt.tight_layout()
-    print(f"Đang lưu file: {FULL_OUTPUT_PATH}...")
-    plt.savefig(FULL_OUTPUT_PATH, dpi=150) # DPI 150 cho nhẹ và nhanh
+    print(f"Đang lưu file: {output_path}...")
+    plt.savefig(output_path, dpi=150) # DPI 150 cho nhẹ và nhanh
     plt.close(fig)
 
-def main():
+def main(render=True):
+    """Chạy toàn bộ: watchlist -> giá KBSec -> RRG (D/W/M) -> JSON (+ PNG ngày, chỉ vẽ lại khi dữ liệu thay đổi)."""
+    import pandas as pd
+    from rrg_engine import compute_rrg_timeframes, rrg_to_frames, METHOD_RATIO
+    from rrg_publish import publish
+
     print("--- Bắt đầu xử lý ---")
-    start_date_str, end_date_str = get_date_range_strings(DAYS_BACK)
-    print(f"Time range: {start_date_str} to {end_date_str}")
-    
+    # Danh sách mã lấy từ DB khi chạy (không phải lúc import) để run_rrg_charts.py import được module
+    symbols = get_symbols_from_db()
+    start_date, end_date = get_date_range(DAYS_BACK)
+    print(f"Time range: {start_date} to {end_date}")
+
+    fetched = asyncio.run(fetch_all(symbols, start_date, end_date))
+
     # Lấy Benchmark
-    bench_df = fetch_data(BENCHMARK, start_date_str, end_date_str)
-    if bench_df is None: return
+    bench = fetched.pop(BENCHMARK, None)
+    if bench is None: return
+
+    closes = {symbol: sr for symbol, sr in fetched.items() if len(sr) > 20}
 
     rrg_results = {}
-    
-    for symbol in SYMBOLS:
-        print(f"Đang lấy dữ liệu: {symbol}")
-        stock_df = fetch_data(symbol, start_date_str, end_date_str)
-        if stock_df is not None and len(stock_df) > 20:
-            rrg_df = calculate_rrg_components(stock_df, bench_df)
-            rrg_results[symbol] = rrg_df
+    rrg_by_tf = {}
+    if closes:
+        # Panel (ngày x mã) theo lịch giao dịch của VNINDEX; phiên thiếu dữ liệu lấy giá gần nhất
+        panel = pd.DataFrame(closes).reindex(bench.index).ffill()
+        # RSR = 100 * RS / MA(RS), RSM = 100 * RSR / MA(RSR) (xấp xỉ JdK ratio)
+        results = compute_rrg_timeframes(panel, bench, timeframes=TIMEFRAMES,
+                                         smooth_window=1, method=METHOD_RATIO, scale=1.0)
+        rrg_by_tf = {tf: rrg_to_frames(rsr, rsm) for tf, (rsr, rsm) in results.items()}
+        rrg_results = rrg_by_tf.get('D', {})
+        for symbol, rrg_df in rrg_results.items():
             # In ra để kiểm tra
             curr = rrg_df.iloc[-1]
             print(f" -> {symbol}: RSR={curr['RSR']:.2f}, RSM={curr['RSM']:.2f}")
 
     if rrg_results:
-        plot_rrg_and_save(rrg_results)
+        publish('vnstock', rrg_results, timeframes=rrg_by_tf,
+                render=(lambda path: plot_rrg_and_save(rrg_results, path)) if render else None,
+                image_filename=OUTPUT_FILENAME, output_dir=OUTPUT_DIR,
+                colors={symbol: get_random_dark_color(symbol) for symbol in rrg_results},
+                tail_length=TAIL_LENGTH)
         print("Xong!")
     else:
         print("Không có dữ liệu.")
@@ -1,3 +1,3 @@
 #!/bin/bash
 python3.13 /home/thehaohcm/scripts/fetch_potential_forex_pairs.py
-python3.13 /home/thehaohcm/scripts/rrg_forex_chart.py
\ No newline at end of file
+python3.13 /home/thehaohcm/scripts/run_rrg_charts.py forex
\ No newline at end of file
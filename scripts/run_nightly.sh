@@ -0,0 +1,7 @@
+#!/bin/bash
+# Single nightly entry point (replaces run_crypto/forex/vnstock.sh in crontab, do not schedule both):
+# refresh the watchlists, then build every RRG chart in one warm process
+python3.13 /home/thehaohcm/scripts/fetch_potential_cryptos.py
+python3.13 /home/thehaohcm/scripts/fetch_potential_forex_pairs.py
+python3.13 /home/thehaohcm/scripts/fetch_potential_stocks.py
+python3.13 /home/thehaohcm/scripts/run_rrg_charts.py
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+RRG Chart Runner
+Builds every RRG chart (or the ones named on the command line) in a single
+warm process, so pandas / matplotlib / yfinance are imported only once.
+
+Usage:
+    python3 run_rrg_charts.py                 # all charts
+    python3 run_rrg_charts.py crypto forex    # selected charts
+    python3 run_rrg_charts.py --no-render     # JSON data only, skip PNG rendering
+
+Each chart writes <chart>_rrg.json and only re-renders its PNG when the data changed.
+"""
+
+import importlib
+import os
+import resource
+import sys
+import time
+
+# Make the chart modules importable regardless of the current working directory
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Chart name -> module exposing main()
+CHARTS = {
+    'crypto': 'rrg_crypto_chart',
+    'futures': 'rrg_cryptofutures_chart',
+    'forex': 'rrg_forex_chart',
+    'vnstock': 'rrg_vnstock_chart',
+    'assets': 'rrg_assets_chart',
+}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_chart(name, render=True):
+    """Import and run one chart; returns (ok, seconds)"""
+    started = time.perf_counter()
+    try:
+        module = importlib.import_module(CHARTS[name])
+        module.main(render=render)
+        ok = True
+    except Exception as e:
+        print(f"❌ Chart '{name}' failed: {e}")
+        ok = False
+    return ok, time.perf_counter() - started
+
+
+def main(argv=None):
+    args = list(argv if argv is not None else sys.argv[1:])
+    render = '--no-render' not in args
+    names = [a for a in args if a != '--no-render'] or list(CHARTS)
+    unknown = [n for n in names if n not in CHARTS]
+    if unknown:
+        print(f"Unknown chart(s): {', '.join(unknown)}. Available: {', '.join(CHARTS)}")
+        return 2
+
+    results = []
+    total_started = time.perf_counter()
+    for name in names:
+        print(f"\n===== RRG chart: {name} =====")
+        ok, seconds = run_chart(name, render)
+        results.append((name, ok, seconds, peak_rss_mb()))
+
+    print("\n===== RRG chart summary =====")
+    for name, ok, seconds, rss in results:
+        status = "✅" if ok else "❌"
+        print(f"{status} {name:<8} {seconds:7.2f}s  peak RSS {rss:7.1f} MB")
+    print(f"Total: {time.perf_counter() - total_started:.2f}s, peak RSS {peak_rss_mb():.1f} MB")
+
+    return 0 if all(ok for _, ok, _, _ in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,3 @@
 #!/bin/bash
 python3.13 /home/thehaohcm/scripts/fetch_potential_stocks.py
-python3.13 /home/thehaohcm/scripts/rrg_vnstock_chart.py
\ No newline at end of file
+python3.13 /home/thehaohcm/scripts/run_rrg_charts.py vnstock
\ No newline at end of file
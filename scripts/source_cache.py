@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Source Cache
+Loads slow data sources (Yahoo Finance, FRED, DB queries) concurrently through an
+on-disk cache with a TTL and a timeout budget per source. A source that is slow or
+failing falls back to its last cached value instead of holding up the whole job.
+"""
+
+import asyncio
+import inspect
+import os
+import pickle
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(BASE_DIR, 'source_cache')
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+
+DEFAULT_TIMEOUT = 30.0   # Seconds a single source may take before its cached value is used
+
+
+class Source:
+    """
+    One cached data source.
+
+    Args:
+        name: Cache key (also the file name under CACHE_DIR)
+        fetch: Callable returning the value (None = failure); may be a coroutine function
+        ttl: Seconds a cached value is served without refetching
+        timeout: Seconds the fetch may take before falling back to the cache
+    """
+
+    def __init__(self, name, fetch, ttl=DAY, timeout=DEFAULT_TIMEOUT):
+        self.name = name
+        self.fetch = fetch
+        self.ttl = ttl
+        self.timeout = timeout
+
+
+def _cache_path(name):
+    safe = "".join(c if c.isalnum() or c in '-_.' else '_' for c in name)
+    return os.path.join(CACHE_DIR, f"{safe}.pkl")
+
+
+def read_cache(name):
+    """(value, age_seconds) of a cached source, or (None, None)"""
+    path = _cache_path(name)
+    if not os.path.exists(path):
+        return None, None
+    try:
+        with open(path, 'rb') as f:
+            value = pickle.load(f)
+        return value, time.time() - os.path.getmtime(path)
+    except Exception as e:
+        print(f"⚠️ Could not read cache for {name}: {e}")
+        return None, None
+
+
+def write_cache(name, value):
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        path = _cache_path(name)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"⚠️ Could not write cache for {name}: {e}")
+
+
+def _run_in_daemon_thread(fetch, name):
+    """
+    Future resolved with fetch() from a daemon thread. A fetch that overruns its timeout
+    is abandoned: daemon threads are not joined at interpreter exit, so a hung download
+    cannot block the job from finishing (unlike executor workers).
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def resolve(setter, value):
+        if not future.done():   # Cancelled by wait_for after a timeout
+            setter(value)
+
+    def run():
+        try:
+            result = (future.set_result, fetch())
+        except Exception as e:
+            result = (future.set_exception, e)
+        try:
+            loop.call_soon_threadsafe(resolve, *result)
+        except RuntimeError:
+            pass    # Loop already closed: nobody is waiting for this value any more
+
+    threading.Thread(target=run, name=f"source-{name}", daemon=True).start()
+    return future
+
+
+def prune_cache(prefix, keep):
+    """Delete cached sources whose name starts with `prefix`, except `keep`"""
+    if not os.path.isdir(CACHE_DIR):
+        return
+    keep_file = os.path.basename(_cache_path(keep))
+    safe_prefix = os.path.basename(_cache_path(prefix))[:-len('.pkl')]
+    for file_name in os.listdir(CACHE_DIR):
+        if file_name.startswith(safe_prefix) and file_name.endswith('.pkl') and file_name != keep_file:
+            try:
+                os.remove(os.path.join(CACHE_DIR, file_name))
+            except OSError as e:
+                print(f"⚠️ Could not remove cache {file_name}: {e}")
+
+
+async def _load(source, report):
+    started = time.perf_counter()
+    cached, age = read_cache(source.name)
+    if cached is not None and age < source.ttl:
+        report[source.name] = ('cache', time.perf_counter() - started)
+        return cached
+
+    fresh = None
+    try:
+        if inspect.iscoroutinefunction(source.fetch):
+            pending = source.fetch()
+        else:
+            pending = _run_in_daemon_thread(source.fetch, source.name)
+        fresh = await asyncio.wait_for(pending, source.timeout)
+    except asyncio.TimeoutError:
+        print(f"⏱️ {source.name}: no answer within {source.timeout:g}s")
+    except Exception as e:
+        print(f"⚠️ {source.name}: {e}")
+
+    elapsed = time.perf_counter() - started
+    if fresh is not None:
+        write_cache(source.name, fresh)
+        report[source.name] = ('fresh', elapsed)
+        return fresh
+    if cached is not None:
+        print(f"ℹ️  {source.name}: using cached value from {age / HOUR:.1f}h ago")
+        report[source.name] = ('stale', elapsed)
+        return cached
+    report[source.name] = ('missing', elapsed)
+    return None
+
+
+async def load_sources_async(sources):
+    """
+    Load all sources concurrently.
+
+    Returns:
+        Dictionary of {source name: value or None}
+    """
+    report = {}
+    values = await asyncio.gather(*(_load(s, report) for s in sources))
+
+    print("📊 Sources: " + ", ".join(
+        f"{name} {status} {seconds:.1f}s" for name, (status, seconds) in report.items()))
+    return {s.name: v for s, v in zip(sources, values)}
+
+
+def load_sources(sources):
+    """Synchronous wrapper around load_sources_async"""
+    return asyncio.run(load_sources_async(sources))
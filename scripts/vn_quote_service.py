@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+VN Quote Service
+Shared DNSE Entrade price fetcher for the VN stock bots: bounded concurrency,
+coalescing of concurrent requests for the same symbol and a short TTL cache.
+"""
+
+import asyncio
+import time
+import httpx
+
+DNSE_SECURITY_URL = "https://services.entrade.com.vn/dnse-financial-product/securities/{symbol}"
+
+DEFAULT_CONCURRENCY = 8     # Parallel requests to DNSE
+DEFAULT_TTL = 5.0           # Seconds a fetched price is served from cache
+REQUEST_TIMEOUT = 10.0
+
+
+class VNQuoteService:
+    """
+    Fetches `basicPrice` for VN stocks from DNSE.
+
+    Callers asking for the same symbol while a request is in flight share that
+    request, and prices fetched within `ttl` seconds are served from memory.
+    Works with any async client exposing `await client.get(url, timeout=...)`
+    (httpx.AsyncClient or curl_cffi AsyncSession).
+    """
+
+    def __init__(self, client=None, concurrency=DEFAULT_CONCURRENCY, ttl=DEFAULT_TTL):
+        self._own_client = client is None
+        self.client = client or httpx.AsyncClient(
+            timeout=REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            headers={"User-Agent": "VN-Quote-Service/1.0"}
+        )
+        self.ttl = ttl
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._cache = {}       # symbol -> (price, fetched_at)
+        self._in_flight = {}   # symbol -> asyncio.Task
+        self.stats = {"requests": 0, "cache_hits": 0, "coalesced": 0, "errors": 0}
+
+    async def _fetch(self, symbol):
+        async with self._semaphore:
+            self.stats["requests"] += 1
+            try:
+                url = DNSE_SECURITY_URL.format(symbol=symbol)
+                res = await self.client.get(url, timeout=REQUEST_TIMEOUT)
+                if res.status_code == 200:
+                    basic_price = res.json().get('basicPrice')
+                    if basic_price is not None:
+                        price = float(basic_price)
+                        self._cache[symbol] = (price, time.monotonic())
+                        return price
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"⚠️ Error fetching price for VN stock {symbol}: {e}")
+            return None
+
+    async def get_price(self, symbol):
+        """Current price of `symbol`, or None if DNSE did not return one."""
+        cached = self._cache.get(symbol)
+        if cached and time.monotonic() - cached[1] <= self.ttl:
+            self.stats["cache_hits"] += 1
+            return cached[0]
+
+        task = self._in_flight.get(symbol)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            task = asyncio.ensure_future(self._fetch(symbol))
+            self._in_flight[symbol] = task
+            task.add_done_callback(lambda _, s=symbol: self._in_flight.pop(s, None))
+        return await asyncio.shield(task)
+
+    async def get_prices(self, symbols):
+        """
+        Fetch many symbols concurrently.
+
+        Returns:
+            Dictionary of {symbol: price} for symbols that returned a price
+        """
+        unique = list(dict.fromkeys(symbols))
+        prices = await asyncio.gather(*(self.get_price(s) for s in unique))
+        return {s: p for s, p in zip(unique, prices) if p is not None}
+
+    def summary(self):
+        """One-line report of the counters (cache hits and coalesced calls saved a request each)"""
+        stats = self.stats
+        served = stats["requests"] + stats["cache_hits"] + stats["coalesced"]
+        return (f"VN quotes: {served} served, {stats['requests']} DNSE requests, "
+                f"{stats['cache_hits']} cache hits, {stats['coalesced']} coalesced, {stats['errors']} errors")
+
+    async def aclose(self):
+        if self._own_client:
+            await self.client.aclose()
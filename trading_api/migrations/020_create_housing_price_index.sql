@@ -0,0 +1,16 @@
+-- Migration 020: Daily housing price index (robust median price/m²) built incrementally from real_estate_prices
+CREATE TABLE IF NOT EXISTS public.housing_price_index (
+    index_date date NOT NULL,
+    region text NOT NULL,
+    district text NOT NULL,                 -- 'ALL' = whole region
+    property_type text NOT NULL,            -- 'ALL' = every property type
+    median_price_m2 double precision NOT NULL, -- VND/m², after outlier rejection
+    listing_count integer NOT NULL,         -- Listings kept after outlier rejection
+    samples double precision[] NOT NULL,    -- Every price/m² of the day, so later batches can recompute the median
+    updated_at timestamptz DEFAULT CURRENT_TIMESTAMP NOT NULL,
+    CONSTRAINT housing_price_index_pkey PRIMARY KEY (region, district, property_type, index_date)
+);
+
+-- Last real_estate_prices.id folded into the index
+INSERT INTO public.system_settings (key, value) VALUES ('housing_index_last_id', '0')
+ON CONFLICT (key) DO NOTHING;